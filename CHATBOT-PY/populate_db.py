@@ -25,17 +25,16 @@ if os.path.basename(os.getcwd()) != "CHATBOT-PY":
 try:
     sys.path.append('.')
     from src.fetch_posts import get_latest_posts, process_and_embed_posts
-    from src.retriever import retriever  # This will initialize the DB
+    from src.retriever import get_vectorstore
+    from src.ingestion import IncrementalIndexer, file_digest
+    from src.pdf_extraction import iter_pdf_pages, iter_pdf_files
+    from langchain.schema.document import Document
     from langchain.text_splitter import RecursiveCharacterTextSplitter
-    from PyPDF2 import PdfReader
     import chromadb
     
-    # Access the vectorstore directly from the retriever
-    if hasattr(retriever, 'vectorstore'):
-        vectorstore = retriever.vectorstore
-    elif hasattr(retriever, '_vectorstore'):
-        vectorstore = retriever._vectorstore
-    else:
+    # Open the vector store (this will initialize the DB)
+    vectorstore = get_vectorstore()
+    if vectorstore is None:
         raise ValueError("Could not access vectorstore from retriever")
         
     logger.info("Imported required modules")
@@ -43,24 +42,32 @@ except Exception as e:
     logger.error(f"Error importing modules: {e}")
     sys.exit(1)
 
-def process_pdf(pdf_path):
-    """Process a PDF file and return its chunks for embedding."""
+# Bump when the chunking in process_pdf changes, so every PDF is re-indexed once
+CHUNKING_VERSION = "populate-2"
+
+# Prefix of the source names of the docs/ PDFs. src/split_document.py indexes
+# dataset/ under bare file names; sharing those names would make each script
+# replace (and remove) the other one's chunks.
+DOCS_SOURCE_PREFIX = "docs/"
+
+def docs_source(pdf_path):
+    """Source name of a PDF from the docs directory, e.g. docs/Kurikulum.pdf"""
+    return DOCS_SOURCE_PREFIX + os.path.basename(pdf_path)
+
+def process_pdf(pdf_path, records=None):
+    """Process a PDF file (or its already extracted pages) and return its chunks for embedding."""
     logger.info(f"Processing PDF: {pdf_path}")
     
     try:
-        # Read PDF
-        pdf_reader = PdfReader(pdf_path)
-        text = ""
+        if records is None:
+            records = iter_pdf_pages([pdf_path])
         
-        # Extract text from each page
-        for page in pdf_reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n\n"
+        # Join the text of every page
+        text = "".join(record.text + "\n\n" for record in records if record.text)
         
         if not text.strip():
             logger.warning(f"No text extracted from {pdf_path}")
-            return []
+            return [], None
             
         # Split text into chunks
         text_splitter = RecursiveCharacterTextSplitter(
@@ -73,7 +80,7 @@ def process_pdf(pdf_path):
         logger.info(f"Split {pdf_path} into {len(chunks)} chunks")
         
         # Return chunks with source information
-        return chunks, os.path.basename(pdf_path)
+        return chunks, docs_source(pdf_path)
     except Exception as e:
         logger.error(f"Error processing PDF {pdf_path}: {e}")
         return [], None
@@ -91,37 +98,42 @@ def add_pdf_documents(docs_dir="./docs"):
     
     logger.info(f"Found {len(pdf_files)} PDF files")
     
-    # Process each PDF and add to the vectorstore
-    total_chunks = 0
+    # Sync each PDF with the vectorstore; unchanged files are skipped
+    indexer = IncrementalIndexer(vectorstore)
+    total_added = 0
     
+    changed = {}
     for pdf_file in pdf_files:
-        chunks, source = process_pdf(pdf_file)
+        source = docs_source(pdf_file)
+        fingerprint = f"{file_digest(pdf_file)}:{CHUNKING_VERSION}"
+        if indexer.is_current(source, fingerprint):
+            logger.info(f"Skipping unchanged PDF: {source}")
+        else:
+            changed[pdf_file] = fingerprint
+    
+    # Extract the changed PDFs in parallel, page records are grouped per file
+    for pdf_file, records in iter_pdf_files(list(changed)):
+        fingerprint = changed[pdf_file]
+        chunks, source = process_pdf(pdf_file, records)
         if chunks and source:
             try:
-                # Add text chunks to the vectorstore using the add_texts method
-                metadata = [{"source": source} for _ in chunks]
-                vectorstore.add_texts(
-                    texts=chunks,
-                    metadatas=metadata
-                )
-                total_chunks += len(chunks)
-                logger.info(f"Added {len(chunks)} chunks from {source} to the vectorstore")
+                documents = [
+                    Document(page_content=chunk, metadata={"source": source})
+                    for chunk in chunks
+                ]
+                stats = indexer.sync_source(source, fingerprint, documents)
+                total_added += stats["added"]
+                logger.info(f"Added {stats['added']} and deleted {stats['deleted']} chunks of {source}")
             except Exception as e:
                 logger.error(f"Error adding {pdf_file} to vectorstore: {e}")
-                # Try an alternative approach for error cases
-                try:
-                    # Create Document objects and try add_documents
-                    from langchain.schema.document import Document
-                    documents = [
-                        Document(page_content=chunk, metadata={"source": source})
-                        for chunk in chunks
-                    ]
-                    vectorstore.add_documents(documents)
-                    logger.info(f"Added {len(chunks)} chunks from {source} using alternative method")
-                except Exception as e2:
-                    logger.error(f"Alternative method also failed: {e2}")
     
-    logger.info(f"Added a total of {total_chunks} chunks from {len(pdf_files)} PDF files")
+    # Delete the chunks of PDFs that are no longer in the directory; dataset/ sources are left alone
+    indexer.remove_missing(
+        [docs_source(pdf_file) for pdf_file in pdf_files],
+        candidates=[source for source in indexer.sources if source.startswith(DOCS_SOURCE_PREFIX)]
+    )
+    
+    logger.info(f"Added a total of {total_added} chunks from {len(pdf_files)} PDF files")
 
 if __name__ == "__main__":
     load_dotenv()
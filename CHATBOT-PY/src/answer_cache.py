@@ -0,0 +1,178 @@
+"""
+Semantic answer cache in front of the RAG chain.
+
+Stores final answers keyed by the embedding of the normalized question.
+A new question is answered from the cache when its nearest stored question
+is similar enough, was asked in the same language, has not expired and was
+answered against the current version of the vector store.
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Cosine similarity needed to treat two questions as the same question
+DEFAULT_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+# How long a cached answer stays valid, in seconds (default 1 day)
+DEFAULT_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL", "86400"))
+DEFAULT_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+
+
+def normalize_question(question):
+    """Lowercase, drop punctuation and collapse whitespace."""
+    question = re.sub(r'[^\w\s-]', ' ', question.lower())
+    return " ".join(question.split())
+
+
+class SemanticAnswerCache:
+    """
+    Nearest-neighbour cache of answers to past questions.
+
+    Args:
+        encoder: Object with an encode() method, defaults to the shared cached encoder
+        threshold (float): Minimum cosine similarity for a hit
+        ttl_seconds (int): Age after which an entry is ignored
+        max_entries (int): Oldest entries are dropped beyond this size
+        version_fn (callable, optional): Returns the current vector store version;
+            entries stored under another version are ignored
+    """
+
+    def __init__(self, encoder=None, threshold=DEFAULT_THRESHOLD, ttl_seconds=DEFAULT_TTL_SECONDS,
+                 max_entries=DEFAULT_MAX_ENTRIES, version_fn=None):
+        self._encoder = encoder
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.version_fn = version_fn
+        self._lock = threading.Lock()
+        self._entries = []
+        self._matrix = None
+        self._generation = 0
+
+    @property
+    def encoder(self):
+        if self._encoder is None:
+            try:
+                from src.model_registry import get_encoder
+            except ImportError:
+                from model_registry import get_encoder
+            self._encoder = get_encoder()
+        return self._encoder
+
+    def _current_version(self):
+        version = self.version_fn() if self.version_fn else None
+        return (self._generation, version)
+
+    def _embed(self, question):
+        vector = np.asarray(self.encoder.encode(normalize_question(question)), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def lookup(self, question, language):
+        """
+        Find a cached answer for the question.
+
+        Args:
+            question (str): The user's question
+            language (str): Detected language of the question ('en' or 'id')
+
+        Returns:
+            dict: The cached entry (answer, sources, question, similarity), or None
+        """
+        query_vector = self._embed(question)
+        version = self._current_version()
+        now = time.time()
+
+        with self._lock:
+            if self._matrix is None or not self._entries:
+                return None
+
+            similarities = self._matrix @ query_vector
+            for i in np.argsort(-similarities):
+                similarity = float(similarities[i])
+                if similarity < self.threshold:
+                    break
+                entry = self._entries[i]
+                if entry["language"] != language or entry["version"] != version:
+                    continue
+                if now - entry["created_at"] > self.ttl_seconds:
+                    continue
+                logger.info(f"Answer cache hit ({similarity:.3f}) for: {question[:80]}")
+                return dict(entry, similarity=similarity)
+
+        return None
+
+    def store(self, question, language, answer, sources=None):
+        """
+        Cache the final answer to a question.
+
+        Args:
+            question (str): The user's question
+            language (str): Detected language of the question
+            answer (str): The final, post-processed answer
+            sources (list, optional): Source names of the documents used
+        """
+        vector = self._embed(question)
+        entry = {
+            "question": question,
+            "language": language,
+            "answer": answer,
+            "sources": list(sources or []),
+            "created_at": time.time(),
+            "version": self._current_version(),
+        }
+
+        with self._lock:
+            # Drop expired and stale entries before adding the new one
+            keep = [
+                i for i, existing in enumerate(self._entries)
+                if existing["version"] == entry["version"]
+                and entry["created_at"] - existing["created_at"] <= self.ttl_seconds
+            ]
+            keep = keep[-(self.max_entries - 1):] if self.max_entries > 1 else []
+            self._entries = [self._entries[i] for i in keep] + [entry]
+            rows = [self._matrix[i] for i in keep] if self._matrix is not None else []
+            self._matrix = np.vstack(rows + [vector])
+
+    def invalidate(self):
+        """Forget every cached answer, e.g. after the vector store was updated."""
+        with self._lock:
+            self._generation += 1
+            self._entries = []
+            self._matrix = None
+        logger.info("Answer cache invalidated")
+
+
+_answer_cache = None
+_answer_cache_lock = threading.Lock()
+
+
+def get_answer_cache(version_fn=None):
+    """
+    Return the process-wide answer cache, creating it on first use.
+
+    Args:
+        version_fn (callable, optional): Vector store version function used when creating the cache
+
+    Returns:
+        SemanticAnswerCache: The shared cache
+    """
+    global _answer_cache
+    if _answer_cache is None:
+        with _answer_cache_lock:
+            if _answer_cache is None:
+                _answer_cache = SemanticAnswerCache(version_fn=version_fn)
+    return _answer_cache
+
+
+def invalidate_answer_cache():
+    """Invalidate the shared answer cache if it has been created."""
+    if _answer_cache is not None:
+        _answer_cache.invalidate()
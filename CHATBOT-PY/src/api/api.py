@@ -1,9 +1,11 @@
+import uuid
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from .models import QueryRequest
-from .chat_history import convert_to_chat_message_history
-from langchain_core.runnables.history import RunnableWithMessageHistory
-from ..main import rag_chain
-from ..retriever import debug_retrieved_documents
+from .chat_history import session_store
+from .chain import get_conversational_chain, llm_slots
+from ..progress import stage_listener, StageCallbackHandler
+from ..streaming import TokenCallbackHandler, astream_events
 
 router = APIRouter()
 
@@ -11,31 +13,61 @@ router = APIRouter()
 def read_root():
     return {"message": "Welcome to the RAG Chatbot API"}
 
+def _start_session(request: QueryRequest) -> str:
+    """Resolve the session id of a request and seed its history from the client if it is new."""
+    session_id = request.session_id or uuid.uuid4().hex
+    session_store.seed(session_id, request.chat_history)
+    return session_id
+
 @router.post("/query/")
-def answer_query(request: QueryRequest):
+async def answer_query(request: QueryRequest):
     try:
-        # Convert session state chat history to ChatMessageHistory
-        chat_history = convert_to_chat_message_history(request.chat_history)
-        
-        # Create conversational RAG chain
-        conversational_rag_chain = RunnableWithMessageHistory(
-            rag_chain,
-            lambda _: chat_history,
-            input_messages_key="input",
-            history_messages_key="chat_history", 
-            output_messages_key="answer",
-        )
+        session_id = _start_session(request)
         
-        response = conversational_rag_chain.invoke(
-            {"input": request.query},
-            config={"configurable": {"session_id": "abc123"}}
-        )
+        # Record the real pipeline stages with their timings for the client
+        stages = []
+        with stage_listener(stages.append):
+            async with llm_slots:
+                response = await get_conversational_chain().ainvoke(
+                    {"input": request.query},
+                    config={"configurable": {"session_id": session_id}, "callbacks": [StageCallbackHandler()]}
+                )
         
         if "answer" in response:
-            return {"answer": response["answer"]}
+            return {"answer": response["answer"], "session_id": session_id, "stages": stages}
         else:
             raise ValueError("RAG chain did not return an answer")
             
     except Exception as e:
         print(f"An error occurred while answering the query: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/query/stream")
+async def stream_query(request: QueryRequest):
+    """
+    Streaming variant of /query/ as Server-Sent Events.
+    
+    Sends 'stage' events as the pipeline advances, 'token' events while the
+    answer is generated and a final 'answer' event with the complete text
+    and the session id.
+    """
+    session_id = _start_session(request)
+    
+    async def run(on_token):
+        async with llm_slots:
+            response = await get_conversational_chain().ainvoke(
+                {"input": request.query},
+                config={
+                    "configurable": {"session_id": session_id},
+                    "callbacks": [StageCallbackHandler(), TokenCallbackHandler(on_token)]
+                }
+            )
+        if "answer" not in response:
+            raise ValueError("RAG chain did not return an answer")
+        return {"answer": response["answer"], "session_id": session_id}
+    
+    return StreamingResponse(
+        astream_events(run),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
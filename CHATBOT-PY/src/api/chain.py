@@ -0,0 +1,73 @@
+#src/api/chain.py
+import os
+import asyncio
+import logging
+import threading
+from operator import itemgetter
+from langchain_openai import ChatOpenAI
+from langchain.chains import create_history_aware_retriever, create_retrieval_chain
+from langchain.chains.combine_documents import create_stuff_documents_chain
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder, PromptTemplate
+from langchain_core.runnables import RunnablePassthrough
+from langchain_core.runnables.history import RunnableWithMessageHistory
+from ..context_retriever import ContextInjectionRetriever
+from ..prompts import RAG_PROMPT_TEMPLATE, CONDENSE_QUESTION_SYSTEM_PROMPT
+from ..progress import CONDENSE_QUESTION_TAG
+from .chat_history import session_store
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on chain runs (and so LLM calls) in flight per worker
+MAX_CONCURRENT_LLM_CALLS = int(os.getenv("API_MAX_CONCURRENT_LLM_CALLS", "16"))
+
+# Requests wait here instead of piling up calls on the OpenAI client
+llm_slots = asyncio.Semaphore(MAX_CONCURRENT_LLM_CALLS)
+
+_conversational_chain = None
+_chain_lock = threading.Lock()
+
+def build_rag_chain():
+    """Build the retrieval chain: condense follow-ups, retrieve, answer with the shared prompt."""
+    llm = ChatOpenAI(model_name="gpt-4-turbo", streaming=True)
+    condense_question_llm = ChatOpenAI(model_name="gpt-4-turbo", tags=[CONDENSE_QUESTION_TAG])
+
+    condense_prompt = ChatPromptTemplate.from_messages([
+        ("system", CONDENSE_QUESTION_SYSTEM_PROMPT),
+        MessagesPlaceholder("chat_history"),
+        ("human", "{input}"),
+    ])
+    history_aware_retriever = create_history_aware_retriever(
+        condense_question_llm,
+        # Resolves the live retriever per call, so a re-indexed collection is used right away
+        ContextInjectionRetriever(),
+        condense_prompt
+    )
+
+    answer_prompt = PromptTemplate(template=RAG_PROMPT_TEMPLATE, input_variables=["context", "question"])
+    answer_chain = (
+        RunnablePassthrough.assign(question=itemgetter("input"))
+        | create_stuff_documents_chain(llm, answer_prompt)
+    )
+
+    return create_retrieval_chain(history_aware_retriever, answer_chain)
+
+def get_conversational_chain():
+    """
+    Return the shared chain with per-session message history, building it on first use.
+
+    The chain is stateless apart from the session store, so every request
+    reuses the same runnable and only passes its session id.
+    """
+    global _conversational_chain
+    if _conversational_chain is None:
+        with _chain_lock:
+            if _conversational_chain is None:
+                logger.info("Building the API RAG chain")
+                _conversational_chain = RunnableWithMessageHistory(
+                    build_rag_chain(),
+                    session_store.get,
+                    input_messages_key="input",
+                    history_messages_key="chat_history",
+                    output_messages_key="answer",
+                )
+    return _conversational_chain
\ No newline at end of file
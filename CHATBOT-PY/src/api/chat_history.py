@@ -1,9 +1,17 @@
 #src/api/chat_history.py
+import os
+import time
+import threading
+from collections import OrderedDict
 from typing import List
 from langchain_community.chat_message_histories import ChatMessageHistory
 from langchain_core.chat_history import BaseChatMessageHistory
 from .models import ChatMessage
 
+# Sessions kept in memory and how long an idle session is kept, in seconds
+MAX_SESSIONS = int(os.getenv("API_MAX_SESSIONS", "1000"))
+SESSION_TTL_SECONDS = int(os.getenv("API_SESSION_TTL", "3600"))
+
 def convert_to_chat_message_history(session_history: List[ChatMessage]) -> BaseChatMessageHistory:
     chat_history = ChatMessageHistory()
     for message in session_history:
@@ -11,4 +19,49 @@ def convert_to_chat_message_history(session_history: List[ChatMessage]) -> BaseC
             chat_history.add_user_message(message.content)
         else:
             chat_history.add_ai_message(message.content)
-    return chat_history
\ No newline at end of file
+    return chat_history
+
+class SessionHistoryStore:
+    """
+    Per-session chat histories for the API.
+
+    Each session id gets its own history, so concurrent users never share or
+    overwrite each other's conversation. Idle sessions expire after
+    ttl_seconds and the least recently used ones are dropped beyond
+    max_sessions.
+    """
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS, ttl_seconds: int = SESSION_TTL_SECONDS):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()
+
+    def get(self, session_id: str) -> BaseChatMessageHistory:
+        """Return the history of a session, creating an empty one if needed."""
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None or now - entry[1] > self.ttl_seconds:
+                entry = (ChatMessageHistory(), now)
+            self._sessions[session_id] = (entry[0], now)
+            self._sessions.move_to_end(session_id)
+            self._evict(now)
+            return entry[0]
+
+    def seed(self, session_id: str, session_history: List[ChatMessage]) -> None:
+        """Load client-side history into a session that has no messages yet."""
+        if not session_history:
+            return
+        history = self.get(session_id)
+        if not history.messages:
+            history.add_messages(convert_to_chat_message_history(session_history).messages)
+
+    def _evict(self, now: float) -> None:
+        while self._sessions:
+            oldest_id, (_, last_used) = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and now - last_used <= self.ttl_seconds:
+                break
+            del self._sessions[oldest_id]
+
+session_store = SessionHistoryStore()
\ No newline at end of file
@@ -1,6 +1,5 @@
-#src/api/models.py
 from pydantic import BaseModel
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 class ChatMessage(BaseModel):
     type: str
@@ -8,4 +7,7 @@ class ChatMessage(BaseModel):
 
 class QueryRequest(BaseModel):
     query: str
+    # Conversation to continue; a new one is started when omitted
+    session_id: Optional[str] = None
+    # Seeds the history of a session the server does not know yet
     chat_history: List[ChatMessage] = []
\ No newline at end of file
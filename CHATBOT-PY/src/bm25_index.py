@@ -0,0 +1,311 @@
+"""
+BM25 inverted index kept next to the Chroma collection.
+
+Chunks are tokenized once, at ingestion time, into term frequencies; the
+postings (term -> chunk ID -> frequency) make scoring a query a lookup of
+its terms instead of a scan over every chunk. The tokenizer keeps
+identifiers whole: NIP numbers, course codes such as "SI-2011" and dotted
+numbers survive as single tokens, and their parts and separator-free form
+are indexed as well. Each collection has its own index file in the Chroma
+persist directory, so a shadow re-index builds its own.
+"""
+
+import os
+import re
+import json
+import math
+import logging
+import tempfile
+import threading
+from collections import Counter
+
+try:
+    from src.reranker import STOPWORDS
+except ImportError:
+    from reranker import STOPWORDS
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+
+# BM25 term-frequency saturation and length normalization
+BM25_K1 = float(os.getenv("BM25_K1", "1.5"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+# Words, numbers and identifiers joined by '-', '.' or '/' (e.g. "si-2011", "1.2.3")
+TOKEN_PATTERN = re.compile(r'[^\W_]+(?:[-./][^\W_]+)*')
+SEPARATOR_PATTERN = re.compile(r'[-./]')
+
+
+def tokenize(text):
+    """
+    Split a text into BM25 terms.
+
+    Args:
+        text (str): Chunk or query text
+
+    Returns:
+        list: Lowercased terms without stopwords; compound identifiers add
+            their parts and their separator-free form
+    """
+    terms = []
+    for match in TOKEN_PATTERN.finditer(text.lower()):
+        token = match.group(0)
+        if SEPARATOR_PATTERN.search(token):
+            parts = SEPARATOR_PATTERN.split(token)
+            terms.append(token)
+            terms.append("".join(parts))
+            terms.extend(part for part in parts if part not in STOPWORDS)
+        elif token not in STOPWORDS:
+            terms.append(token)
+    return terms
+
+
+class BM25Index:
+    """
+    Inverted index with BM25 scoring over the chunks of one collection.
+
+    Args:
+        path (str, optional): File the index is loaded from and saved to
+        k1 (float): Term-frequency saturation
+        b (float): Length normalization
+    """
+
+    def __init__(self, path=None, k1=BM25_K1, b=BM25_B):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._docs = {}       # chunk ID -> {"text", "metadata", "terms": {term: frequency}}
+        self._postings = {}   # term -> {chunk ID: frequency}
+        self._lengths = {}    # chunk ID -> number of terms
+        self._total_length = 0
+        self.dirty = False
+
+    def __len__(self):
+        return len(self._docs)
+
+    def __contains__(self, doc_id):
+        return doc_id in self._docs
+
+    def _index_terms(self, doc_id, terms):
+        for term, frequency in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = frequency
+        self._lengths[doc_id] = sum(terms.values())
+        self._total_length += self._lengths[doc_id]
+
+    def add(self, ids, documents):
+        """
+        Index chunks, replacing chunks with the same IDs.
+
+        Args:
+            ids (list): Chunk IDs, as stored in Chroma
+            documents (list): LangChain Documents, one per ID
+        """
+        self.add_texts(ids, [doc.page_content for doc in documents], [doc.metadata for doc in documents])
+
+    def add_texts(self, ids, texts, metadatas=None):
+        """Index raw chunk texts and metadata, e.g. rows read from a Chroma collection."""
+        metadatas = metadatas or [None] * len(ids)
+        with self._lock:
+            self.remove([doc_id for doc_id in ids if doc_id in self._docs])
+            for doc_id, text, metadata in zip(ids, texts, metadatas):
+                text = text or ""
+                terms = dict(Counter(tokenize(text)))
+                self._docs[doc_id] = {"text": text, "metadata": dict(metadata or {}), "terms": terms}
+                self._index_terms(doc_id, terms)
+            self.dirty = self.dirty or bool(ids)
+
+    def update_metadata(self, ids, metadatas):
+        """Replace the stored metadata of indexed chunks."""
+        with self._lock:
+            for doc_id, metadata in zip(ids, metadatas):
+                if doc_id in self._docs:
+                    self._docs[doc_id]["metadata"] = dict(metadata or {})
+                    self.dirty = True
+
+    def remove(self, ids):
+        """Drop chunks from the index; unknown IDs are ignored."""
+        with self._lock:
+            for doc_id in ids:
+                entry = self._docs.pop(doc_id, None)
+                if entry is None:
+                    continue
+                for term, frequency in entry["terms"].items():
+                    postings = self._postings.get(term)
+                    if postings is not None:
+                        postings.pop(doc_id, None)
+                        if not postings:
+                            del self._postings[term]
+                self._total_length -= self._lengths.pop(doc_id, 0)
+                self.dirty = True
+
+    def search(self, query, k=20, expansions=None):
+        """
+        Rank chunks against a query with BM25.
+
+        Args:
+            query (str): The query
+            k (int): Maximum number of results
+            expansions (list, optional): (term, weight) pairs; a term's tokens
+                count as query terms with the term's weight
+
+        Returns:
+            list: (chunk ID, score) pairs, best first; only chunks sharing a term with the query
+        """
+        query_terms = Counter(tokenize(query))
+        for term, weight in expansions or ():
+            for token in tokenize(term):
+                query_terms[token] += weight
+
+        with self._lock:
+            n = len(self._docs)
+            if n == 0:
+                return []
+            average_length = self._total_length / n or 1.0
+
+            scores = {}
+            for term, query_frequency in query_terms.items():
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    doc_length = self._lengths[doc_id]
+                    norm = self.k1 * (1 - self.b + self.b * doc_length / average_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + query_frequency * idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def document(self, doc_id):
+        """(text, metadata) of an indexed chunk, or None."""
+        entry = self._docs.get(doc_id)
+        return None if entry is None else (entry["text"], entry["metadata"])
+
+    def save(self, force=False):
+        """Write the index atomically if it changed since it was loaded or saved."""
+        if self.path is None or not (self.dirty or force):
+            return
+        with self._lock:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix=".bm25-", dir=directory)
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump({"version": INDEX_VERSION, "docs": self._docs}, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            self.dirty = False
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        """Load an index file; a missing or unreadable file gives an empty index."""
+        index = cls(path, **kwargs)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != INDEX_VERSION:
+                logger.warning(f"Ignoring BM25 index {path} with unsupported version {data.get('version')}")
+                return index
+        except FileNotFoundError:
+            return index
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read BM25 index {path}, starting an empty one: {e}")
+            return index
+
+        for doc_id, entry in data["docs"].items():
+            index._docs[doc_id] = entry
+            index._index_terms(doc_id, entry["terms"])
+        return index
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def index_path(collection_name):
+    """BM25 index file of a collection, inside the Chroma persist directory."""
+    try:
+        from src.retriever import get_persist_directory
+    except ImportError:
+        from retriever import get_persist_directory
+    return os.path.join(get_persist_directory(), f"bm25_{collection_name}.json")
+
+
+def build_from_collection(index, collection, batch_size=1000):
+    """
+    Fill an index with every chunk stored in a Chroma collection.
+
+    Used for collections indexed before the BM25 index existed, or whose
+    index file was lost.
+    """
+    offset = 0
+    while True:
+        batch = collection.get(include=["documents", "metadatas"], limit=batch_size, offset=offset)
+        if not batch["ids"]:
+            break
+        index.add_texts(batch["ids"], batch["documents"], batch["metadatas"])
+        offset += len(batch["ids"])
+    logger.info(f"Built BM25 index over {len(index)} chunks of {collection.name}")
+    index.save(force=True)
+    return index
+
+
+def get_bm25_index(collection):
+    """
+    Return the shared BM25 index of a Chroma collection.
+
+    The index is loaded once per process and reloaded when its file was
+    rewritten by another process. An index that is missing or does not
+    match the collection's size is rebuilt from the collection.
+
+    Args:
+        collection: The chromadb collection (e.g. vectorstore._collection)
+
+    Returns:
+        BM25Index: The index for this collection
+    """
+    path = index_path(collection.name)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        mtime = None
+
+    with _indexes_lock:
+        cached = _indexes.get(collection.name)
+        if cached is not None and (cached[1] == mtime or cached[0].dirty):
+            return cached[0]
+
+        index = BM25Index.load(path)
+        if len(index) != collection.count():
+            index = build_from_collection(BM25Index(path), collection)
+            mtime = os.path.getmtime(path)
+        _indexes[collection.name] = (index, mtime)
+        return index
+
+
+def get_bm25_index_for(vectorstore):
+    """BM25 index of a LangChain Chroma store, or None if it has no accessible collection."""
+    collection = getattr(vectorstore, "_collection", None)
+    if collection is None:
+        return None
+    try:
+        return get_bm25_index(collection)
+    except Exception as e:
+        logger.warning(f"BM25 index unavailable: {e}")
+        return None
+
+
+def save_bm25_index(index):
+    """Persist an index and remember the new file version, so it is not reloaded needlessly."""
+    if index is None or not index.dirty:
+        return
+    index.save()
+    with _indexes_lock:
+        for name, (cached, _) in list(_indexes.items()):
+            if cached is index:
+                _indexes[name] = (index, os.path.getmtime(index.path))
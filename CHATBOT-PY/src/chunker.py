@@ -0,0 +1,137 @@
+"""
+Streaming, per-document chunker.
+
+Each document (a PDF or the crawled website) is chunked on its own and
+its chunks are yielded lazily as LangChain Documents carrying source, page
+and offset metadata. Google Drive links are swapped for short markers in a
+single regex pass before splitting, so the splitter never cuts a link, and
+restored per chunk in one pass over the chunk.
+"""
+
+import re
+import logging
+from bisect import bisect_right
+
+from langchain.docstore.document import Document
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Google Drive links must never be split across chunks
+DRIVE_LINK_PATTERN = re.compile(r'https://drive\.google\.com/\S+')
+LINK_MARKER_PATTERN = re.compile(r'\[DRIVE_LINK_(\d+)\]')
+
+
+def protect_links(text):
+    """
+    Replace every Drive link with a [DRIVE_LINK_i] marker in one pass.
+
+    Args:
+        text (str): Text to protect
+
+    Returns:
+        tuple: (marked text, list of links, offset anchors) where the anchors
+            map offsets in the marked text back to offsets in the original text
+    """
+    links = []
+    anchors = []  # (offset in marked text after a marker, offset in original text after the link)
+    parts = []
+    position = 0
+    marked_length = 0
+
+    for match in DRIVE_LINK_PATTERN.finditer(text):
+        marker = f"[DRIVE_LINK_{len(links)}]"
+        parts.append(text[position:match.start()])
+        parts.append(marker)
+        marked_length += match.start() - position + len(marker)
+        links.append(match.group(0))
+        anchors.append((marked_length, match.end()))
+        position = match.end()
+
+    parts.append(text[position:])
+    return "".join(parts), links, anchors
+
+
+def restore_links(chunk, links):
+    """Put the original links back into a chunk."""
+    if not links:
+        return chunk
+    return LINK_MARKER_PATTERN.sub(lambda match: links[int(match.group(1))], chunk)
+
+
+def original_offset(marked_offset, anchors, anchor_offsets):
+    """Translate an offset in the marked text to the same position in the original text."""
+    i = bisect_right(anchor_offsets, marked_offset)
+    if i == 0:
+        return marked_offset
+    marked_anchor, original_anchor = anchors[i - 1]
+    return original_anchor + (marked_offset - marked_anchor)
+
+
+def iter_chunk_documents(pages, source, text_splitter, marker_name=None):
+    """
+    Chunk one document and yield its chunks lazily.
+
+    Pages are wrapped in the '=== Start of X ===' / '=== End of X ===' lines
+    the splitter prefers to break on.
+
+    Args:
+        pages (iterable): (page number, text) pairs; page numbers are 1-based,
+            None for documents without pages
+        source (str): Source name stored in the metadata
+        text_splitter: LangChain text splitter
+        marker_name (str, optional): Name used in the page marker lines, defaults to source
+
+    Yields:
+        Document: Chunks with source, page, page_end, start_index and drive_links metadata
+    """
+    marker_name = marker_name or source
+
+    # Build the document text, remembering where each page starts
+    parts = []
+    page_starts = []
+    page_numbers = []
+    length = 0
+    for page, text in pages:
+        if not text:
+            continue
+        header = f"\n=== Start of {marker_name} ===\n"
+        page_starts.append(length + len(header))
+        page_numbers.append(page)
+        part = f"{header}{text}\n=== End of {marker_name} ===\n"
+        parts.append(part)
+        length += len(part)
+
+    if not parts:
+        return
+
+    document_text = "".join(parts)
+    marked_text, links, anchors = protect_links(document_text)
+    anchor_offsets = [marked for marked, _ in anchors]
+    overlap = getattr(text_splitter, "_chunk_overlap", 0)
+
+    search_from = 0
+    for chunk in text_splitter.split_text(marked_text):
+        marked_start = marked_text.find(chunk, search_from)
+        if marked_start < 0:
+            marked_start = marked_text.find(chunk)
+        search_from = max(0, marked_start + len(chunk) - overlap) if marked_start >= 0 else search_from
+
+        restored = restore_links(chunk, links)
+        metadata = {
+            "source": source,
+            # Chroma metadata values must be str, int, float or bool
+            "drive_links": ",".join(DRIVE_LINK_PATTERN.findall(restored)),
+        }
+
+        if marked_start >= 0:
+            start = original_offset(marked_start, anchors, anchor_offsets)
+            end = original_offset(marked_start + len(chunk), anchors, anchor_offsets)
+            metadata["start_index"] = start
+            first = max(0, bisect_right(page_starts, start) - 1)
+            last = max(0, bisect_right(page_starts, max(start, end - 1)) - 1)
+            if page_numbers[first] is not None:
+                metadata["page"] = page_numbers[first]
+                metadata["page_end"] = page_numbers[last]
+
+        yield Document(page_content=restored, metadata=metadata)
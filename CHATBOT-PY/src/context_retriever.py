@@ -0,0 +1,64 @@
+"""
+Retriever that lets the RAG chain consume context that was already retrieved.
+
+chunking_and_retrieval ranks the context for a question once; generation()
+injects those documents here for the duration of the chain call, so the
+chain does not run a second search against Chroma. Without injected
+documents the base retriever is used as before; when no base retriever is
+given, the live retriever is looked up on every call so a re-index that
+swapped the collection is picked up without rebuilding the chain.
+"""
+
+import logging
+import contextvars
+from contextlib import contextmanager
+from typing import Any, List
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+try:
+    from src.progress import emit_stage, ANN_SEARCH
+    from src.retriever import get_retriever
+except ImportError:
+    from progress import emit_stage, ANN_SEARCH
+    from retriever import get_retriever
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Documents injected for the current request (per thread / async task)
+_injected_documents = contextvars.ContextVar("injected_documents", default=None)
+
+
+@contextmanager
+def injected_context(documents):
+    """
+    Make the chain use these documents instead of searching.
+
+    Args:
+        documents (list or None): Documents to return from the retriever; None or
+            an empty list keeps the base retriever
+    """
+    token = _injected_documents.set(list(documents) if documents else None)
+    try:
+        yield
+    finally:
+        _injected_documents.reset(token)
+
+
+class ContextInjectionRetriever(BaseRetriever):
+    """Returns injected documents when present, otherwise delegates to base_retriever or the live retriever."""
+
+    base_retriever: Any = None
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        documents = _injected_documents.get()
+        if documents is not None:
+            logger.info(f"Using {len(documents)} pre-retrieved documents as context")
+            return documents
+        base_retriever = self.base_retriever or get_retriever()
+        documents = base_retriever.get_relevant_documents(query)
+        emit_stage(ANN_SEARCH, retrieved=len(documents))
+        return documents
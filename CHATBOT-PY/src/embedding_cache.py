@@ -0,0 +1,307 @@
+"""
+Persistent, content-addressed embedding cache.
+
+Vectors are keyed by a hash of the model name plus the whitespace-normalized
+text. They live in a memory-mapped float32 matrix on disk, indexed by a small
+SQLite table, with an in-memory LRU in front. When the disk cache is full the
+least recently used slot is overwritten.
+
+The Streamlit app, the API and the scheduler may share one cache directory:
+disk reads and writes take an exclusive lock file, so slot allocation and
+eviction stay consistent across processes. New vectors are buffered in
+memory and written in batches. Cache errors never reach callers of
+cached_encode; they fall back to encoding.
+"""
+
+import os
+import time
+import atexit
+import hashlib
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    # No POSIX file locks (Windows): only threads of one process are serialized
+    fcntl = None
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Default location: CHATBOT-PY/cache/embeddings (cache/ is git-ignored)
+DEFAULT_CACHE_DIR = os.getenv(
+    "EMBEDDING_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "embeddings")
+)
+DEFAULT_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "20000"))
+DEFAULT_MEMORY_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MEMORY_ENTRIES", "2048"))
+# Buffered vectors are written to disk once this many are pending or the interval has passed
+DEFAULT_WRITE_BATCH = int(os.getenv("EMBEDDING_CACHE_WRITE_BATCH", "256"))
+DEFAULT_WRITE_INTERVAL = float(os.getenv("EMBEDDING_CACHE_WRITE_INTERVAL", "30"))
+
+
+def normalize_text(text):
+    """Collapse whitespace; the tokenizer treats all whitespace runs the same."""
+    return " ".join(text.split())
+
+
+def cache_key(model_name, text):
+    """Content address of a text for a given model."""
+    return hashlib.sha1(f"{model_name}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Disk-backed embedding cache for one model.
+
+    Args:
+        model_name (str): Name of the embedding model, part of every key
+        dim (int): Embedding dimension
+        cache_dir (str): Directory holding the vector file and the index
+        max_entries (int): Number of vectors kept on disk before eviction
+        memory_entries (int): Number of vectors kept in the in-memory LRU
+        write_batch (int): Pending vectors that trigger a disk write
+        write_interval (float): Seconds after which pending vectors are written anyway
+    """
+
+    def __init__(self, model_name, dim, cache_dir=DEFAULT_CACHE_DIR,
+                 max_entries=DEFAULT_MAX_ENTRIES, memory_entries=DEFAULT_MEMORY_ENTRIES,
+                 write_batch=DEFAULT_WRITE_BATCH, write_interval=DEFAULT_WRITE_INTERVAL):
+        self.model_name = model_name
+        self.dim = dim
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.write_batch = write_batch
+        self.write_interval = write_interval
+        self._lock = threading.RLock()
+        self._memory = OrderedDict()
+        # Not yet written: key -> vector, and key -> last use of disk entries
+        self._pending = OrderedDict()
+        self._touched = {}
+        self._last_write = time.monotonic()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        safe_name = model_name.replace("/", "_")
+        vectors_path = os.path.join(cache_dir, f"{safe_name}.f32")
+        index_path = os.path.join(cache_dir, f"{safe_name}.sqlite3")
+        self._lock_path = os.path.join(cache_dir, f"{safe_name}.lock")
+
+        self._db = sqlite3.connect(index_path, timeout=30, check_same_thread=False)
+        with self._disk_lock():
+            # WAL lets readers in other processes proceed while one process writes
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, slot INTEGER UNIQUE NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries(last_used)")
+
+            # Start over if the file layout does not match this model or size cap
+            layout = f"{dim}x{max_entries}"
+            row = self._db.execute("SELECT value FROM meta WHERE name = 'layout'").fetchone()
+            if row is None or row[0] != layout or not os.path.exists(vectors_path):
+                self._db.execute("DELETE FROM entries")
+                self._db.execute("INSERT OR REPLACE INTO meta VALUES ('layout', ?)", (layout,))
+                mode = "w+"
+            else:
+                mode = "r+"
+            self._db.commit()
+
+            self._vectors = np.memmap(vectors_path, dtype=np.float32, mode=mode, shape=(max_entries, dim))
+
+        atexit.register(self.close)
+
+    @contextmanager
+    def _disk_lock(self):
+        """Exclusive access to the files, across threads and processes."""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self._lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def get_many(self, texts):
+        """
+        Look up cached vectors.
+
+        Args:
+            texts (list): Texts to look up
+
+        Returns:
+            list: One np.ndarray per text, or None where the text is not cached
+        """
+        keys = [cache_key(self.model_name, text) for text in texts]
+        results = [None] * len(keys)
+        disk_lookups = []
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is None:
+                    vector = self._pending.get(key)
+                if vector is not None:
+                    if key in self._memory:
+                        self._memory.move_to_end(key)
+                    results[i] = vector
+                else:
+                    disk_lookups.append(i)
+
+            if not disk_lookups:
+                return results
+
+            now = time.time()
+            with self._disk_lock():
+                for i in disk_lookups:
+                    row = self._db.execute("SELECT slot FROM entries WHERE key = ?", (keys[i],)).fetchone()
+                    if row is None:
+                        continue
+                    vector = np.array(self._vectors[row[0]])
+                    results[i] = vector
+                    self._remember(keys[i], vector)
+                    self._touched[keys[i]] = now
+
+        return results
+
+    def put_many(self, texts, vectors):
+        """
+        Store vectors; they are written to disk with the next batch.
+
+        Args:
+            texts (list): Texts that were embedded
+            vectors (array-like): One vector per text
+        """
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = cache_key(self.model_name, text)
+                vector = np.asarray(vector, dtype=np.float32)
+                self._pending[key] = vector
+                self._remember(key, vector)
+
+            if (len(self._pending) >= self.write_batch
+                    or time.monotonic() - self._last_write >= self.write_interval):
+                self.flush()
+
+    def flush(self):
+        """Write pending vectors and last-use times to disk in one transaction."""
+        with self._lock:
+            if not self._pending and not self._touched:
+                return
+            pending, touched = self._pending, self._touched
+            self._pending, self._touched = OrderedDict(), {}
+            self._last_write = time.monotonic()
+
+            now = time.time()
+            with self._disk_lock():
+                try:
+                    if touched:
+                        self._db.executemany(
+                            "UPDATE entries SET last_used = ? WHERE key = ?",
+                            [(used, key) for key, used in touched.items()]
+                        )
+
+                    # Entry count and highest slot are read once per batch and tracked from there
+                    count, highest = self._db.execute("SELECT COUNT(*), MAX(slot) FROM entries").fetchone()
+                    next_slot = 0 if highest is None else highest + 1
+                    for key, vector in pending.items():
+                        row = self._db.execute("SELECT slot FROM entries WHERE key = ?", (key,)).fetchone()
+                        if row is not None:
+                            slot = row[0]
+                            self._db.execute("UPDATE entries SET last_used = ? WHERE key = ?", (now, key))
+                        else:
+                            if count < self.max_entries:
+                                slot, next_slot = self._unused_slot(next_slot)
+                                count += 1
+                            else:
+                                slot = self._evict()
+                            self._db.execute("INSERT INTO entries VALUES (?, ?, ?)", (key, slot, now))
+                        self._vectors[slot] = vector
+
+                    self._vectors.flush()
+                    self._db.commit()
+                except Exception:
+                    self._db.rollback()
+                    raise
+
+    def _unused_slot(self, next_slot):
+        """An unused slot while the cache is not full, and the next slot to try."""
+        if next_slot < self.max_entries:
+            return next_slot, next_slot + 1
+        # Slots were freed out of order, find the first gap
+        used = {slot for (slot,) in self._db.execute("SELECT slot FROM entries")}
+        slot = next(slot for slot in range(self.max_entries) if slot not in used)
+        return slot, self.max_entries
+
+    def _evict(self):
+        """Free the slot of the least recently used entry."""
+        key, slot = self._db.execute(
+            "SELECT key, slot FROM entries ORDER BY last_used ASC LIMIT 1"
+        ).fetchone()
+        self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+        self._memory.pop(key, None)
+        return slot
+
+    def close(self):
+        """Write what is pending; called at interpreter exit."""
+        try:
+            self.flush()
+        except Exception as e:
+            logger.warning(f"Could not write pending embedding cache entries: {e}")
+
+    def _remember(self, key, vector):
+        """Put a vector in the in-memory LRU."""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+
+def cached_encode(cache, texts, encode_fn):
+    """
+    Embed texts, encoding only the ones that are not cached yet.
+
+    A failing cache (locked database, unreadable vector file) is logged and
+    bypassed; it never makes encoding fail.
+
+    Args:
+        cache (EmbeddingCache or None): Cache to read from and write to; None disables caching
+        texts (list): Texts to embed
+        encode_fn (callable): Encodes a list of texts into an (n, dim) array
+
+    Returns:
+        np.ndarray: Matrix with one row per text, in input order
+    """
+    if cache is None:
+        return np.asarray(encode_fn(texts), dtype=np.float32)
+
+    try:
+        vectors = cache.get_many(texts)
+    except Exception as e:
+        logger.warning(f"Embedding cache lookup failed, encoding without it: {e}")
+        vectors = [None] * len(texts)
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+
+    if missing:
+        encoded = np.asarray(encode_fn([texts[i] for i in missing]), dtype=np.float32)
+        try:
+            cache.put_many([texts[i] for i in missing], encoded)
+        except Exception as e:
+            logger.warning(f"Could not store embeddings in the cache: {e}")
+        for i, vector in zip(missing, encoded):
+            vectors[i] = vector
+
+    if not vectors:
+        return np.zeros((0, cache.dim), dtype=np.float32)
+    return np.vstack(vectors)
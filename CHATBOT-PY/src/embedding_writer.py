@@ -0,0 +1,115 @@
+"""
+Batched embedding writer for ingestion.
+
+Consumes a stream of chunks, embeds them in fixed-size batches with the
+shared sentence-transformers encoder and upserts every batch into the
+Chroma collection in one call, adding it to the collection's BM25 index
+as well. Chunks that do not carry a near-duplicate cluster yet get one
+before they are written. Only one batch is held in memory at a time,
+so the producer is only pulled as fast as batches are written. Because
+chunk IDs are content-hashed and every batch is committed on its own, an
+interrupted run resumes by skipping the IDs that are already stored.
+"""
+
+import os
+import time
+import logging
+from itertools import islice
+
+try:
+    from src.model_registry import get_encoder, DEFAULT_EMBEDDING_MODEL
+    from src.bm25_index import get_bm25_index_for, save_bm25_index
+    from src.near_duplicates import get_near_duplicate_index_for, save_near_duplicate_index, CLUSTER_FIELD
+except ImportError:
+    from model_registry import get_encoder, DEFAULT_EMBEDDING_MODEL
+    from bm25_index import get_bm25_index_for, save_bm25_index
+    from near_duplicates import get_near_duplicate_index_for, save_near_duplicate_index, CLUSTER_FIELD
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Chunks embedded and written per batch; lower it to save memory on small boxes
+DEFAULT_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+
+
+def iter_batches(items, batch_size):
+    """Yield lists of up to batch_size items, pulling from items lazily."""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+class EmbeddingWriter:
+    """
+    Embeds chunks in batches and writes them to the vector store in bulk.
+
+    Args:
+        vectorstore: LangChain Chroma vector store to write to
+        batch_size (int): Chunks per encode and write call
+        model_name (str): Embedding model, must match the one the store was built with
+    """
+
+    def __init__(self, vectorstore, batch_size=DEFAULT_BATCH_SIZE, model_name=DEFAULT_EMBEDDING_MODEL):
+        self.vectorstore = vectorstore
+        self.batch_size = max(1, batch_size)
+        self.model_name = model_name
+
+    def _write_batch(self, ids, documents, lexical_index=None):
+        collection = getattr(self.vectorstore, "_collection", None)
+        if collection is None:
+            # No direct collection access, let the vector store embed this batch
+            self.vectorstore.add_documents(documents, ids=ids)
+            return
+
+        # Same text normalization as the query-time embeddings
+        texts = [doc.page_content.replace("\n", " ") for doc in documents]
+        vectors = get_encoder(self.model_name).encode(texts, batch_size=self.batch_size)
+        collection.upsert(
+            ids=ids,
+            embeddings=vectors.tolist(),
+            documents=[doc.page_content for doc in documents],
+            metadatas=[doc.metadata for doc in documents]
+        )
+        if lexical_index is not None:
+            lexical_index.add(ids, documents)
+
+    def write(self, items, label="chunks"):
+        """
+        Embed and write a stream of chunks.
+
+        Args:
+            items (iterable): (chunk ID, Document) pairs, e.g. from a generator
+            label (str): Name used in the progress log lines
+
+        Returns:
+            dict: 'written' chunk count, 'seconds' and 'chunks_per_second'
+        """
+        started = time.perf_counter()
+        written = 0
+        lexical_index = get_bm25_index_for(self.vectorstore)
+        near_duplicates = get_near_duplicate_index_for(self.vectorstore)
+
+        for batch in iter_batches(items, self.batch_size):
+            ids = [doc_id for doc_id, _ in batch]
+            documents = [doc for _, doc in batch]
+            if near_duplicates is not None:
+                for doc_id, doc in batch:
+                    if CLUSTER_FIELD not in doc.metadata:
+                        doc.metadata[CLUSTER_FIELD] = near_duplicates.assign(doc_id, doc.page_content)
+            self._write_batch(ids, documents, lexical_index)
+            written += len(batch)
+
+            elapsed = time.perf_counter() - started
+            logger.info(f"Embedded {written} {label} ({written / elapsed if elapsed > 0 else 0.0:.1f} chunks/s)")
+
+        save_bm25_index(lexical_index)
+        save_near_duplicate_index(near_duplicates)
+        seconds = time.perf_counter() - started
+        return {
+            "written": written,
+            "seconds": round(seconds, 3),
+            "chunks_per_second": round(written / seconds, 1) if seconds > 0 else 0.0,
+        }
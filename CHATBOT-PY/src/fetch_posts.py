@@ -23,22 +23,20 @@ try:
     
     # Try to import vector store - but don't fail if not available
     try:
-        from src.retriever import retriever
-        # Check if we have a real vectorstore
-        vectorstore = None
-        if hasattr(retriever, 'vectorstore'):
-            vectorstore = retriever.vectorstore
-        elif hasattr(retriever, '_vectorstore'):
-            vectorstore = retriever._vectorstore
+        # The vector store itself is opened on first use, not at import
+        from src.retriever import get_vectorstore
     except ImportError:
         logger.warning("Could not import retriever for embedding posts")
-        vectorstore = None
+        get_vectorstore = lambda: None
         
     try:
-        from langchain_community.embeddings import HuggingFaceEmbeddings
+        from src.answer_cache import invalidate_answer_cache
+        from src.ingestion import chunk_id
+        from src.embedding_writer import EmbeddingWriter
+        from langchain_core.documents import Document
         embeddings_available = True
     except ImportError:
-        logger.warning("HuggingFaceEmbeddings not available")
+        logger.warning("Shared embedding model not available")
         embeddings_available = False
         
     FEEDPARSER_AVAILABLE = True
@@ -95,6 +93,7 @@ def process_and_embed_posts(posts):
         posts (list): List of post dictionaries fetched from RSS feed.
     """
     # If no vectorstore is available, just return the posts
+    vectorstore = get_vectorstore() if embeddings_available else None
     if vectorstore is None or not embeddings_available:
         logger.warning("Vector store not available, skipping embeddings")
         return posts
@@ -115,49 +114,34 @@ def process_and_embed_posts(posts):
         )
         chunks = text_splitter.split_text(combined_text)
 
-        # Initialize embeddings
-        embeddings = HuggingFaceEmbeddings(
-            model_name="all-MiniLM-L6-v2"
-        )
-
         # Add documents to the vector store if possible
         try:
+            # Stable IDs, so re-embedding the same posts updates them instead of adding duplicates
+            ids_by_chunk = {}
+            for chunk in chunks:
+                ids_by_chunk.setdefault(chunk_id("RSS Feed", chunk), chunk)
+            ids = list(ids_by_chunk)
+            chunks = list(ids_by_chunk.values())
             metadatas = [{"source": "RSS Feed"} for _ in chunks]
             
-            # Try different methods of adding documents based on the ChromaDB version
             try:
-                # First try add_texts with embedding parameter (older versions)
-                vectorstore.add_texts(texts=chunks, metadatas=metadatas, embedding=embeddings)
-                logger.info("Successfully added documents using add_texts with embedding parameter")
-            except (TypeError, ValueError) as e:
-                logger.warning(f"First add method failed: {e}, trying alternative methods...")
+                # Embed in batches with the shared encoder and upsert each batch
+                documents = [Document(page_content=chunk, metadata=metadata) for chunk, metadata in zip(chunks, metadatas)]
+                stats = EmbeddingWriter(vectorstore).write(zip(ids, documents), label="RSS chunks")
+                logger.info(f"Successfully added {stats['written']} documents ({stats['chunks_per_second']} chunks/s)")
+            except Exception as e:
+                logger.warning(f"Batched embedding failed: {e}, trying add_texts...")
                 
                 try:
-                    # Try add_texts without embedding parameter (newer versions)
-                    vectorstore.add_texts(texts=chunks, metadatas=metadatas)
-                    logger.info("Successfully added documents using add_texts without embedding parameter")
+                    # Let the vector store embed the texts itself
+                    vectorstore.add_texts(texts=chunks, metadatas=metadatas, ids=ids)
+                    logger.info("Successfully added documents using add_texts")
                 except Exception as e2:
-                    logger.warning(f"Second add method failed: {e2}, trying direct client access...")
-                    
-                    try:
-                        # Try accessing the collection directly if possible
-                        if hasattr(vectorstore, "_collection"):
-                            collection = vectorstore._collection
-                            # Generate embeddings manually
-                            text_embeddings = embeddings.embed_documents(chunks)
-                            # Add via the collection
-                            collection.add(
-                                embeddings=text_embeddings,
-                                documents=chunks,
-                                metadatas=metadatas,
-                                ids=[f"rss-{i}" for i in range(len(chunks))]
-                            )
-                            logger.info("Successfully added documents using direct collection access")
-                        else:
-                            raise ValueError("No _collection attribute found")
-                    except Exception as e3:
-                        logger.error(f"All embedding methods failed: {e3}")
-                        raise
+                    logger.error(f"All embedding methods failed: {e2}")
+                    raise
+            
+            # Cached answers may be outdated now that the vector store changed
+            invalidate_answer_cache()
                         
         except Exception as e:
             logger.error(f"Error adding to vector store: {e}")
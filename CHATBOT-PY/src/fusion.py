@@ -0,0 +1,35 @@
+"""
+Reciprocal-rank fusion of ranked result lists.
+
+Each list contributes weight / (k + rank) to every item it contains, so
+items ranked well by several retrievers rise to the top without the
+retrievers' scores having to be on the same scale.
+"""
+
+import os
+
+# Larger values flatten the difference between top and lower ranks
+DEFAULT_RRF_K = int(os.getenv("RRF_K", "60"))
+
+
+def reciprocal_rank_fusion(rankings, k=DEFAULT_RRF_K, weights=None):
+    """
+    Fuse several rankings into one.
+
+    Args:
+        rankings (list): Ranked lists of hashable item keys, best first
+        k (int): RRF rank constant
+        weights (list, optional): Weight per ranking, defaults to 1 for each
+
+    Returns:
+        list: (key, fused score) pairs, best first; ties keep first-seen order
+    """
+    weights = weights or [1.0] * len(rankings)
+    scores = {}
+    for ranking, weight in zip(rankings, weights):
+        if not weight:
+            continue
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + weight / (k + rank)
+    # sorted() is stable, so equal scores stay in first-seen order
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,111 @@
+"""
+Fuzzy vocabulary lookup with a symmetric deletion index (SymSpell).
+
+Every vocabulary entry is stored under each string obtained by deleting up
+to max_distance of its characters. Two strings within Levenshtein distance
+d share such a deletion variant (at most d deletions on each side), so
+looking up a word only needs its own deletion variants: a handful of dict
+lookups instead of a distance computation against the whole vocabulary.
+Candidates are then confirmed with a bounded Levenshtein distance, and
+results are memoized per word.
+"""
+
+from collections import OrderedDict
+
+
+def levenshtein_distance(a, b, max_distance=None):
+    """
+    Levenshtein distance of two strings.
+
+    Args:
+        a (str): First string
+        b (str): Second string
+        max_distance (int, optional): Stop early and return max_distance + 1
+            once the distance is known to exceed it
+
+    Returns:
+        int: The edit distance (or max_distance + 1)
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    if max_distance is not None and len(a) - len(b) > max_distance:
+        return max_distance + 1
+
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        if max_distance is not None and min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+def _deletes(word, max_distance):
+    """All strings obtained by deleting up to max_distance characters, the word included."""
+    variants = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {variant[:i] + variant[i + 1:] for variant in frontier for i in range(len(variant))}
+        variants |= frontier
+    return variants
+
+
+class FuzzyIndex:
+    """
+    Vocabulary with fast lookup of the entries within an edit distance.
+
+    Args:
+        vocabulary (iterable): Entries to index (words or short phrases)
+        max_distance (int): Largest edit distance a lookup can match
+        cache_size (int): Number of lookups memoized
+    """
+
+    def __init__(self, vocabulary, max_distance=2, cache_size=4096):
+        self.max_distance = max_distance
+        self.cache_size = cache_size
+        self.vocabulary = frozenset(vocabulary)
+        self._deletes = {}
+        for entry in self.vocabulary:
+            for variant in _deletes(entry, max_distance):
+                self._deletes.setdefault(variant, []).append(entry)
+        self._cache = OrderedDict()
+
+    def __contains__(self, entry):
+        return entry in self.vocabulary
+
+    def lookup(self, word):
+        """
+        Entries within max_distance of a word.
+
+        Args:
+            word (str): The word to look up
+
+        Returns:
+            tuple: (entry, distance) pairs, closest first, ties alphabetical
+        """
+        cached = self._cache.get(word)
+        if cached is not None:
+            self._cache.move_to_end(word)
+            return cached
+
+        candidates = set()
+        for variant in _deletes(word, self.max_distance):
+            candidates.update(self._deletes.get(variant, ()))
+
+        matches = []
+        for entry in candidates:
+            distance = levenshtein_distance(word, entry, self.max_distance)
+            if distance <= self.max_distance:
+                matches.append((entry, distance))
+        matches = tuple(sorted(matches, key=lambda match: (match[1], match[0])))
+
+        self._cache[word] = matches
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return matches
@@ -0,0 +1,284 @@
+"""
+Incremental, idempotent ingestion into the Chroma vector store.
+
+Every chunk gets a stable ID derived from its source and a hash of its
+content, so writing the same chunk twice updates it instead of adding a
+duplicate. A manifest next to chroma_db records, per source, a fingerprint
+of the input (file digest plus chunking version) and the IDs of its chunks.
+A run skips unchanged sources, embeds only chunks whose IDs are new, and
+deletes chunks that disappeared from a source or whose source is gone.
+The collection's BM25 index is kept in step with every write and delete.
+Before anything is embedded, every chunk is assigned a near-duplicate
+cluster ('dup_cluster') and near-duplicates within a source are dropped.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import tempfile
+
+try:
+    from src.embedding_writer import EmbeddingWriter, DEFAULT_BATCH_SIZE
+    from src.bm25_index import get_bm25_index_for, save_bm25_index
+    from src.near_duplicates import (
+        get_near_duplicate_index_for, save_near_duplicate_index, minhash, CLUSTER_FIELD, DROP_WITHIN_SOURCE
+    )
+except ImportError:
+    from embedding_writer import EmbeddingWriter, DEFAULT_BATCH_SIZE
+    from bm25_index import get_bm25_index_for, save_bm25_index
+    from near_duplicates import (
+        get_near_duplicate_index_for, save_near_duplicate_index, minhash, CLUSTER_FIELD, DROP_WITHIN_SOURCE
+    )
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "ingest_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def file_digest(path, block_size=1 << 20):
+    """SHA-256 of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def text_digest(text):
+    """SHA-256 of a text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def content_hash(text):
+    """Hash of a chunk's whitespace-normalized content."""
+    return hashlib.sha1(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+def chunk_id(source, text):
+    """
+    Stable ID of a chunk: the same content from the same source always maps to the same ID.
+
+    Args:
+        source (str): Source of the chunk, e.g. the PDF file name
+        text (str): Chunk content
+
+    Returns:
+        str: The chunk ID
+    """
+    return hashlib.sha1(f"{source}\0{content_hash(text)}".encode("utf-8")).hexdigest()
+
+
+def load_manifest(path):
+    """Read the manifest, or return an empty one if it is missing or unreadable."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+        logger.warning(f"Ignoring manifest {path} with unsupported version {manifest.get('version')}")
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read manifest {path}, starting a new one: {e}")
+    return {"version": MANIFEST_VERSION, "sources": {}}
+
+
+def save_manifest(path, manifest):
+    """Write the manifest atomically so an interrupted run never leaves a torn file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".manifest-", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class IncrementalIndexer:
+    """
+    Keeps the vector store in sync with a set of sources.
+
+    Args:
+        vectorstore: LangChain Chroma vector store to write to
+        manifest_path (str, optional): Manifest file, defaults to
+            ingest_manifest.json inside the Chroma persist directory
+        batch_size (int): Chunks embedded and written per batch
+    """
+
+    def __init__(self, vectorstore, manifest_path=None, batch_size=DEFAULT_BATCH_SIZE):
+        self.vectorstore = vectorstore
+        self.writer = EmbeddingWriter(vectorstore, batch_size=batch_size)
+        if manifest_path is None:
+            try:
+                from src.retriever import get_persist_directory
+            except ImportError:
+                from retriever import get_persist_directory
+            manifest_path = os.path.join(get_persist_directory(), MANIFEST_FILENAME)
+        self.manifest_path = manifest_path
+        self.manifest = load_manifest(manifest_path)
+        self.lexical_index = get_bm25_index_for(vectorstore)
+        self.near_duplicates = get_near_duplicate_index_for(vectorstore)
+        self.changed = False
+
+    @property
+    def sources(self):
+        return self.manifest["sources"]
+
+    def is_current(self, source, fingerprint):
+        """Check whether a source was already indexed from the same input."""
+        entry = self.sources.get(source)
+        return entry is not None and entry.get("fingerprint") == fingerprint
+
+    def _stored_ids(self, source):
+        """IDs of every chunk of a source in the collection, including ones from before the manifest."""
+        ids = set(self.sources.get(source, {}).get("chunks", []))
+        collection = getattr(self.vectorstore, "_collection", None)
+        if collection is not None:
+            try:
+                ids.update(collection.get(where={"source": source}, include=[])["ids"])
+            except Exception as e:
+                logger.warning(f"Could not list stored chunks of {source}: {e}")
+        return ids
+
+    def _existing_ids(self, ids):
+        """Subset of ids that are already stored."""
+        collection = getattr(self.vectorstore, "_collection", None)
+        if collection is None or not ids:
+            return set()
+        try:
+            return set(collection.get(ids=list(ids), include=[])["ids"])
+        except Exception as e:
+            logger.warning(f"Could not look up stored chunk IDs: {e}")
+            return set()
+
+    def sync_source(self, source, fingerprint, documents):
+        """
+        Make the stored chunks of a source match the given documents.
+
+        New chunks are embedded and upserted, chunks that are no longer
+        produced are deleted, and unchanged chunks keep their vectors and
+        only get their metadata refreshed. A chunk that is a near-duplicate
+        of an earlier chunk of the same source is dropped before embedding.
+
+        Args:
+            source (str): Source name, stored as the 'source' metadata
+            fingerprint (str): Fingerprint of the input the documents were built from
+            documents (iterable): LangChain Documents of this source, e.g. a lazy generator
+
+        Returns:
+            dict: Counts of 'added', 'deleted', 'unchanged' and 'dropped' chunks
+        """
+        # One entry per ID: identical chunks of a source collapse into one
+        by_id = {}
+        source_clusters = set()
+        dropped = 0
+        for doc in documents:
+            doc_id = chunk_id(source, doc.page_content)
+            if doc_id in by_id:
+                continue
+
+            if self.near_duplicates is not None:
+                signature = minhash(doc.page_content)
+                cluster = self.near_duplicates.cluster_for(doc_id, signature)
+                if DROP_WITHIN_SOURCE and cluster in source_clusters:
+                    # Same content as a chunk kept a moment ago, e.g. a repeated page header block
+                    dropped += 1
+                    continue
+                self.near_duplicates.add(doc_id, signature, cluster)
+                source_clusters.add(cluster)
+                doc.metadata[CLUSTER_FIELD] = cluster
+
+            doc.metadata["source"] = doc.metadata.get("source", source)
+            doc.metadata["chunk_id"] = doc_id
+            doc.metadata["content_hash"] = content_hash(doc.page_content)
+            by_id[doc_id] = doc
+
+        wanted = set(by_id)
+        stored = self._stored_ids(source)
+        to_delete = stored - wanted
+        to_add = [doc_id for doc_id in by_id if doc_id not in stored]
+
+        # Chunks missing from the manifest may still be stored, e.g. after a lost manifest
+        already_stored = self._existing_ids(to_add)
+        to_add = [doc_id for doc_id in to_add if doc_id not in already_stored]
+
+        if to_delete:
+            self.vectorstore.delete(ids=sorted(to_delete))
+            self._remove_lexical(to_delete)
+        if to_add:
+            # Embedded and written in batches; an interrupted run resumes from the stored IDs
+            self.writer.write(((doc_id, by_id[doc_id]) for doc_id in to_add), label=f"chunks of {source}")
+        added = set(to_add)
+        self._refresh_metadata([doc_id for doc_id in by_id if doc_id not in added], by_id)
+
+        self.sources[source] = {"fingerprint": fingerprint, "chunks": sorted(wanted)}
+        self.changed = self.changed or bool(to_add or to_delete)
+        save_bm25_index(self.lexical_index)
+        save_near_duplicate_index(self.near_duplicates)
+        save_manifest(self.manifest_path, self.manifest)
+
+        stats = {"added": len(to_add), "deleted": len(to_delete), "unchanged": len(wanted) - len(to_add), "dropped": dropped}
+        logger.info(f"Synced {source}: {stats['added']} added, {stats['deleted']} deleted, "
+                    f"{stats['unchanged']} unchanged, {stats['dropped']} near-duplicates dropped")
+        return stats
+
+    def _refresh_metadata(self, ids, by_id):
+        """Update the metadata of chunks that are kept, without embedding them again."""
+        collection = getattr(self.vectorstore, "_collection", None)
+        if collection is None or not ids:
+            return
+        try:
+            collection.update(ids=ids, metadatas=[by_id[doc_id].metadata for doc_id in ids])
+        except Exception as e:
+            logger.warning(f"Could not refresh chunk metadata: {e}")
+            return
+        if self.lexical_index is not None:
+            missing = [doc_id for doc_id in ids if doc_id not in self.lexical_index]
+            self.lexical_index.add(missing, [by_id[doc_id] for doc_id in missing])
+            self.lexical_index.update_metadata(ids, [by_id[doc_id].metadata for doc_id in ids])
+
+    def _remove_lexical(self, ids):
+        if self.lexical_index is not None:
+            self.lexical_index.remove(ids)
+        if self.near_duplicates is not None:
+            self.near_duplicates.remove(ids)
+
+    def remove_source(self, source):
+        """Delete every chunk of a source and drop it from the manifest."""
+        ids = self._stored_ids(source)
+        if ids:
+            self.vectorstore.delete(ids=sorted(ids))
+            self._remove_lexical(ids)
+            self.changed = True
+        self.sources.pop(source, None)
+        save_bm25_index(self.lexical_index)
+        save_near_duplicate_index(self.near_duplicates)
+        save_manifest(self.manifest_path, self.manifest)
+        logger.info(f"Removed {source}: {len(ids)} chunks deleted")
+        return len(ids)
+
+    def remove_missing(self, present_sources, candidates=None):
+        """
+        Remove sources that were indexed before but are no longer present.
+
+        Args:
+            present_sources (iterable): Sources seen in this run
+            candidates (iterable, optional): Sources this run is responsible for;
+                defaults to every source in the manifest
+
+        Returns:
+            list: The removed sources
+        """
+        present = set(present_sources)
+        candidates = set(self.sources if candidates is None else candidates)
+        removed = sorted(source for source in candidates if source in self.sources and source not in present)
+        for source in removed:
+            self.remove_source(source)
+        return removed
@@ -0,0 +1,238 @@
+"""
+Single-pass query intent classification.
+
+All intent keyword lists are compiled once, at import, into one regular
+expression. One scan of the lowercased question finds every keyword
+occurrence (including keywords inside or at the start of longer ones),
+and the intent flags are derived from the keyword groups that were hit.
+Results are memoized per question text, so retrieval and generation share
+one classification of the same question.
+"""
+
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+GRATITUDE_EXPRESSIONS = [
+    "terima kasih", "makasih", "thank you", "thanks", "thx",
+    "thank", "makasi", "terimakasih", "trims", "trimakasih",
+    "thank u", "tq", "ty", "terimakasi", "terima kasi"
+]
+
+GREETINGS = {
+    'halo', 'hello', 'hi', 'hai', 'hey', 'hallo', 'helo',
+    'selamat pagi', 'selamat siang', 'selamat sore', 'selamat malam',
+    'pagi', 'siang', 'sore', 'malam'
+}
+
+# Keywords related to procedures and processes in both English and Indonesian
+PROCEDURE_KEYWORDS = [
+    # Indonesian keywords
+    "bagaimana", "cara", "langkah", "proses", "tahap", "alur", "prosedur",
+    "mekanisme", "tata cara", "petunjuk", "instruksi", "protokol", "urutan",
+    "mengurus", "mengelola", "memproses", "melakukan", "melaksanakan",
+    "syarat", "persyaratan", "dibutuhkan untuk", "diharuskan untuk",
+
+    # English keywords
+    "how to", "procedure", "process", "step", "instruction", "guide",
+    "protocol", "mechanism", "workflow", "sequence", "order",
+    "requirement", "mandatory", "needed for", "required for"
+]
+
+# Special strong indicators that always indicate a procedure question
+STRONG_PROCEDURE_INDICATORS = [
+    "mekanisme pelaksanaan", "bagaimana cara", "bagaimana mekanisme",
+    "tata cara", "prosedur", "langkah-langkah", "alur",
+    "how to conduct", "how to perform", "mechanism of", "procedure for"
+]
+
+# High-priority academic procedures (immediate detection)
+HIGH_PRIORITY_PROCEDURES = [
+    # Thesis and exam procedures
+    "ujian proposal", "ujian skripsi", "sidang proposal", "sidang skripsi",
+    "sidang tugas akhir", "komposisi dewan penguji", "persyaratan ujian",
+    "thesis defense", "proposal defense", "thesis examination", "proposal examination",
+    "dewan penguji", "tim penguji", "persyaratan penguji", "pembimbing dan penguji",
+    "persyaratan pembimbing", "komposisi pembimbing", "mekanisme ujian",
+    "prosedur ujian", "prosedur sidang", "mekanisme sidang"
+]
+
+# Specific academic procedures
+ACADEMIC_PROCEDURES = [
+    # Indonesian academic procedures
+    "cuti akademik", "registrasi ulang", "pendaftaran", "ujian", "sidang",
+    "proposal", "skripsi", "pembimbing", "penguji", "magang", "pkl",
+    "wisuda", "yudisium", "konversi", "perwalian", "pindah prodi", "pindah kampus",
+    "kkn", "kuliah kerja nyata", "uas", "uts", "praktikum", "pelatihan",
+    "pengumpulan skripsi", "pengajuan judul", "pengajuan proposal",
+    "konsultasi", "bimbingan", "kartu studi", "krs", "permintaan surat",
+
+    # English academic procedures
+    "academic leave", "registration", "exam", "thesis defense",
+    "proposal", "thesis", "supervisor", "examiner", "internship",
+    "graduation", "transfer", "student exchange", "community service",
+    "final exam", "midterm", "practicum", "training", "thesis submission",
+    "title submission", "proposal submission", "consultation",
+    "study card", "course selection", "request letter"
+]
+
+# Specific question structures about academic procedures
+ACADEMIC_STRUCTURE_INDICATORS = [
+    "mengurus", "mendaftar", "melakukan", "mengajukan", "mengikuti",
+    "apply for", "register for", "submit", "participate in", "enroll in"
+]
+
+# Keywords that indicate requests for more details
+DETAIL_KEYWORDS = [
+    "jelaskan lebih", "detail", "rinci", "elaborate", "explain more",
+    "lebih lanjut", "further", "more information", "informasi lebih",
+    "bisa dijelaskan", "can you explain", "tolong jelaskan", "please explain",
+    "mohon jelaskan", "kindly explain", "tell me more", "ceritakan lebih"
+]
+
+# Keywords that indicate questions about lecturers
+LECTURER_KEYWORDS = [
+    "dosen", "lecturer", "professor", "pak ", "bu ", "bapak ", "ibu ",
+    "koordinator", "koorprodi", "kaprodi", "ketua prodi", "ketua program studi",
+    "pengajar", "staff", "staf", "pengampu", "matakuliah", "mata kuliah",
+    "siapa yang mengajar", "siapa yang menjabat", "who teaches", "who is the coordinator"
+]
+
+# Specific lecturer names
+LECTURER_NAMES = [
+    "ardwi", "mahendra", "rasben", "aditra", "raditya", "dendi",
+    "maysanjaya", "darmawiguna", "dantes", "pradnyana", "putra"
+]
+
+# Keywords that indicate questions about documents or curriculum access
+DOCUMENT_ACCESS_KEYWORDS = [
+    "dokumen", "document", "kurikulum", "curriculum", "akses", "access",
+    "link", "tautan", "unduh", "download", "file", "buku", "buku pedoman",
+    "panduan", "guide", "manual", "handbook", "sillabus", "silabus",
+    "dimana", "where", "how to", "bagaimana cara", "mendapatkan", "get"
+]
+
+KKN_KEYWORDS = [
+    "kkn", "kuliah kerja nyata", "kuliah kerja lapangan"
+]
+
+# Keywords related to thesis/proposal examination
+THESIS_KEYWORDS = [
+    "ujian proposal", "ujian skripsi", "sidang proposal", "sidang skripsi",
+    "sidang tugas akhir", "ujian tugas akhir", "defense", "seminar proposal"
+]
+
+# Keywords related to examiners/committee
+EXAMINER_KEYWORDS = [
+    "dewan penguji", "komposisi", "penguji", "pembimbing", "tim penguji",
+    "juri", "komite", "komite penguji", "komposisi dewan", "persyaratan penguji"
+]
+
+# Keywords related to procedure/mechanism of thesis examinations
+THESIS_PROCEDURE_KEYWORDS = [
+    "mekanisme", "prosedur", "tata cara", "tatacara", "alur", "proses",
+    "pelaksanaan", "persyaratan", "syarat", "ketentuan", "format",
+    "protokol", "langkah", "tahapan"
+]
+
+# Compound phrases that strongly indicate a thesis examination question
+THESIS_COMPOUND_INDICATORS = [
+    "komposisi dewan penguji", "komposisi penguji", "dewan penguji skripsi",
+    "persyaratan ujian proposal", "persyaratan ujian skripsi",
+    "mekanisme ujian proposal", "mekanisme ujian skripsi",
+    "prosedur ujian proposal", "prosedur ujian skripsi"
+]
+
+INTERNSHIP_KEYWORDS = [
+    "magang", "internship", "pkl", "praktik kerja", "praktik lapangan",
+    "kerja praktek", "praktek kerja"
+]
+
+INTERNSHIP_DOCUMENT_KEYWORDS = [
+    "dokumen", "document", "berkas", "file", "persyaratan", "requirement",
+    "pendukung", "supporting", "form", "formulir", "template", "format",
+    "pengajuan", "application", "surat", "letter", "mou", "proposal"
+]
+
+KEYWORD_GROUPS = {
+    "gratitude": GRATITUDE_EXPRESSIONS,
+    "procedure": PROCEDURE_KEYWORDS + STRONG_PROCEDURE_INDICATORS + HIGH_PRIORITY_PROCEDURES
+                 + ACADEMIC_PROCEDURES + ACADEMIC_STRUCTURE_INDICATORS,
+    "details": DETAIL_KEYWORDS,
+    "lecturer": LECTURER_KEYWORDS + LECTURER_NAMES,
+    "document": DOCUMENT_ACCESS_KEYWORDS,
+    "kkn": KKN_KEYWORDS,
+    "thesis": THESIS_KEYWORDS,
+    "examiner": EXAMINER_KEYWORDS,
+    "thesis_procedure": THESIS_PROCEDURE_KEYWORDS,
+    "thesis_compound": THESIS_COMPOUND_INDICATORS,
+    "internship": INTERNSHIP_KEYWORDS,
+    "internship_document": INTERNSHIP_DOCUMENT_KEYWORDS,
+}
+
+
+def _build_matcher(groups):
+    """
+    Compile every keyword into one pattern and map each keyword to its groups.
+
+    The pattern is a lookahead, so a match is reported at every position;
+    alternatives are ordered longest first, and each keyword also carries
+    the groups of the keywords that are its prefixes, so keywords starting
+    at the same position as a longer match are not lost.
+    """
+    keyword_groups = {}
+    for group, keywords in groups.items():
+        for keyword in keywords:
+            keyword_groups.setdefault(keyword, set()).add(group)
+
+    keywords = sorted(keyword_groups, key=len, reverse=True)
+    closure = {
+        keyword: frozenset().union(*(keyword_groups[other] for other in keywords if keyword.startswith(other)))
+        for keyword in keywords
+    }
+    pattern = re.compile("(?=(" + "|".join(re.escape(keyword) for keyword in keywords) + "))")
+    return pattern, closure
+
+
+_PATTERN, _KEYWORD_GROUPS = _build_matcher(KEYWORD_GROUPS)
+
+# Matched keyword: start offset, end offset, keyword and the keyword groups it belongs to
+KeywordMatch = namedtuple("KeywordMatch", ["start", "end", "keyword", "groups"])
+
+Intents = namedtuple("Intents", [
+    "greeting", "gratitude", "procedure", "details", "lecturer",
+    "document_access", "kkn", "thesis_examiner", "internship_document", "matches"
+])
+
+
+@lru_cache(maxsize=512)
+def classify_intents(text):
+    """
+    Classify a question in one pass over its text.
+
+    Args:
+        text (str): The question
+
+    Returns:
+        Intents: The intent flags and the keyword matches they are based on
+    """
+    text_lower = text.lower()
+    matches = tuple(
+        KeywordMatch(match.start(), match.start() + len(match.group(1)), match.group(1), _KEYWORD_GROUPS[match.group(1)])
+        for match in _PATTERN.finditer(text_lower)
+    )
+    hit = frozenset().union(*(match.groups for match in matches))
+
+    return Intents(
+        greeting=text.strip().lower() in GREETINGS,
+        gratitude="gratitude" in hit,
+        procedure="procedure" in hit,
+        details="details" in hit,
+        lecturer="lecturer" in hit,
+        document_access="document" in hit,
+        kkn="kkn" in hit,
+        thesis_examiner=("thesis" in hit and ("examiner" in hit or "thesis_procedure" in hit))
+                        or "thesis_compound" in hit,
+        internship_document="internship" in hit and "internship_document" in hit,
+        matches=matches,
+    )
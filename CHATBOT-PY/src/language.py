@@ -0,0 +1,90 @@
+"""
+Language and style detection of user questions.
+
+A question is tokenized once and its token set is intersected with fixed
+English, Indonesian and informal-Indonesian word tables, plus a few
+two-word question patterns. The result is both the answer language ('en'
+or 'id') and the style used for spelling-correction messages ('english',
+'casual' or 'formal'). Results are memoized per text; a question's result
+is also carried in its request context (see src.request_context).
+"""
+
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+WORD_PATTERN = re.compile(r"[\w']+")
+
+# Common English words
+ENGLISH_WORDS = frozenset([
+    "what", "how", "when", "where", "who", "why",
+    "is", "are", "am", "was", "were", "be", "been", "being",
+    "have", "has", "had", "do", "does", "did", "can", "could",
+    "will", "would", "shall", "should", "may", "might", "must",
+    "the", "a", "an", "this", "that", "these", "those",
+    "and", "but", "or", "if", "because", "although", "unless",
+    "about", "above", "across", "after", "against", "along",
+    "please", "tell", "explain", "describe", "information"
+])
+
+# Common Indonesian words
+INDONESIAN_WORDS = frozenset([
+    "apa", "bagaimana", "kapan", "dimana", "siapa", "mengapa",
+    "adalah", "merupakan", "menjadi", "ada", "sudah", "telah", "sedang",
+    "akan", "bisa", "dapat", "boleh", "harus", "wajib", "perlu",
+    "ini", "itu", "tersebut", "yang", "dan", "tetapi", "atau", "jika",
+    "karena", "meskipun", "kecuali", "tentang", "di", "ke", "dari",
+    "pada", "untuk", "dengan", "oleh", "dalam", "luar", "atas", "bawah",
+    "tolong", "mohon", "jelaskan", "ceritakan", "informasi", "berikan"
+])
+
+# Chat-style Indonesian pronouns and particles
+INFORMAL_WORDS = frozenset(["aku", "gue", "gw", "lu", "km", "kamu", "nih", "dong", "sih"])
+
+# Question patterns that count twice for their language
+INDONESIAN_PATTERNS = frozenset([("apa", "itu"), ("siapa", "itu"), ("bagaimana", "cara"), ("kapan", "waktu"), ("dimana", "tempat")])
+ENGLISH_PATTERNS = frozenset([("what", "is"), ("who", "is"), ("how", "to"), ("when", "is"), ("where", "is")])
+PATTERN_WEIGHT = 2
+
+LanguageProfile = namedtuple("LanguageProfile", ["language", "style"])
+
+
+@lru_cache(maxsize=512)
+def detect_language_profile(text):
+    """
+    Detect the language and style of a text.
+
+    English wins only with strictly more evidence than Indonesian, so
+    texts without evidence either way are Indonesian.
+
+    Args:
+        text (str): The text to analyze
+
+    Returns:
+        LanguageProfile: language 'en' or 'id'; style 'english', 'casual' or 'formal'
+    """
+    tokens = WORD_PATTERN.findall(text.lower())
+    words = set(tokens)
+    bigrams = set(zip(tokens, tokens[1:]))
+
+    english_count = len(words & ENGLISH_WORDS) + PATTERN_WEIGHT * bool(bigrams & ENGLISH_PATTERNS)
+    indonesian_count = len(words & INDONESIAN_WORDS) + PATTERN_WEIGHT * bool(bigrams & INDONESIAN_PATTERNS)
+
+    if english_count > indonesian_count:
+        return LanguageProfile("en", "english")
+    if words & INFORMAL_WORDS:
+        return LanguageProfile("id", "casual")
+    return LanguageProfile("id", "formal")
+
+
+def detect_language(text):
+    """
+    Detect whether the text is in English or Indonesian.
+
+    Args:
+        text (str): The text to analyze
+
+    Returns:
+        str: 'en' for English, 'id' for Indonesian
+    """
+    return detect_language_profile(text).language
@@ -6,13 +6,30 @@ from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 from langchain.chains import ConversationalRetrievalChain
 from langchain.memory import ConversationBufferMemory
-from src.retriever import retriever
+from src.retriever import (
+    get_retriever, warm_up, get_relevant_documents_with_embeddings, get_multi_query_documents_with_embeddings,
+    get_index_version
+)
 import pandas as pd
-import time
 from src.fetch_posts import fetch_rss_posts, process_and_embed_posts, get_latest_posts
-from sklearn.metrics.pairwise import cosine_similarity
-from sentence_transformers import SentenceTransformer
 from src.web_crawler import get_crawled_content
+from src.model_registry import get_encoder
+from src.answer_cache import get_answer_cache
+from src.context_retriever import ContextInjectionRetriever, injected_context
+from src.progress import (
+    emit_stage, stage_listener, stage_label, StageCallbackHandler,
+    QUERY_ANALYSIS, ANN_SEARCH, RERANK, CONDENSE_QUESTION_TAG
+)
+from src.streaming import TokenCallbackHandler, PlaceholderWriter
+from langchain_core.documents import Document
+from src.prompts import RAG_PROMPT_TEMPLATE
+from src.reranker import rerank_scores, resolve_chunk_embeddings, is_low_quality_chunk
+from src.near_duplicates import collapse_near_duplicates
+from src.intents import classify_intents
+from src.query_expansion import expand_query, format_expanded_query
+from src.multi_query import MULTI_QUERY_ENABLED, INTENT_FOCUS, build_sub_queries
+from src.language import detect_language
+from src.request_context import RequestContext, use_request, current_request
 import logging
 from langchain.prompts import ChatPromptTemplate, PromptTemplate
 import numpy as np
@@ -53,12 +70,15 @@ if not openai_api_key:
     st.error("OpenAI API key not set. Please set it in the .env file or Streamlit secrets.")
     st.stop()
 
-# Load a pre-trained model for embeddings
-model = SentenceTransformer('all-MiniLM-L6-v2')
-
 # Initialize global variables
 rag_chain = None
 
+# Candidates fetched per retrieved chunk before MMR; one over-fetch replaces repeated searches
+OVERFETCH_FACTOR = int(os.getenv("RETRIEVAL_OVERFETCH_FACTOR", "2"))
+
+# Open the vector store and load the embedding model in the background (once per process)
+warm_up()
+
 def initialize_rag_chain():
     """Initialize the RAG chain for conversational retrieval"""
     global rag_chain
@@ -72,206 +92,28 @@ def initialize_rag_chain():
                 return_messages=True
             )
         
-        # Initialize the OpenAI chat model
+        # Initialize the OpenAI chat model; the answer is streamed token by token
         llm = ChatOpenAI(
             model_name="gpt-4-turbo",
-            openai_api_key=openai_api_key
+            openai_api_key=openai_api_key,
+            streaming=True
+        )
+        
+        # Follow-up questions are condensed without streaming, so only answer tokens reach the user
+        condense_question_llm = ChatOpenAI(
+            model_name="gpt-4-turbo",
+            openai_api_key=openai_api_key,
+            tags=[CONDENSE_QUESTION_TAG]
         )
         
         # Create a custom prompt template
         custom_prompt = PromptTemplate(
-            template="""SUPER CRITICAL RULE: If the {context} contains a direct and complete answer to the user's specific {question} (e.g., it matches an FAQ entry), you MUST COPY that answer VERBATIM from the {context}. DO NOT SUMMARIZE, REPHRASE, or CHANGE IT IN ANY WAY. For example, if the question is 'Apa yang harus dilakukan mahasiswa setelah laporan skripsi disetujui (ACC) oleh dosen pembimbing?' and the context contains the full answer starting with 'Saya akan menjelaskan...' and including the link 'https://go.undiksha.ac.id/RegSidang-TI', you MUST output that exact text.
-
-ADDITIONAL CRITICAL RULE FOR INTERNSHIP DELIVERABLES: If the user asks about 'tagihan magang', 'kewajiban magang', 'apa saja yang harus diselesaikan saat magang', or similar, you MUST find the context listing the required items (starting with '1. Proposal Magang', '2. Input Jurnal harian...', etc.) and provide that EXACT numbered list and any concluding sentences from that specific context. DO NOT provide information about conduct ('tata tertib') instead.
-
----
-
-Gunakan bagian-bagian konteks berikut untuk menjawab pertanyaan pengguna secara komprehensif dan akurat.
-Jika Anda tidak tahu jawabannya, jangan mencoba membuat-buat jawaban. Sebagai gantinya, jawab dengan sopan dan membantu dengan:
-1. Pengakuan bahwa Anda tidak memiliki informasi spesifik tentang topik tersebut
-2. Tawaran untuk membantu dengan topik terkait lainnya yang mungkin Anda ketahui
-
-INSTRUKSI KRITIS UNTUK MEMASTIKAN JAWABAN YANG SETIA DENGAN SUMBER:
-- JANGAN PERNAH menambahkan informasi atau konteks yang tidak ada dalam sumber.
-- JANGAN PERNAH menambahkan frasa "di Program Studi Sistem Informasi Undiksha" atau referensi spesifik ke institusi KECUALI jika eksplisit disebutkan dalam konteks.
-- SELALU berikan jawaban yang bersumber HANYA dari informasi dalam konteks yang diberikan.
-- PENTING: Jika konteks berisi jawaban yang LENGKAP dan LANGSUNG untuk pertanyaan spesifik pengguna (misalnya, dari daftar FAQ atau prosedur detail), prioritaskan untuk menggunakan TEKS PERSIS dari konteks tersebut, termasuk semua detail, tautan (link), dan struktur aslinya. JANGAN meringkas atau mengubah formulasi jawaban langsung ini.
-- JANGAN membuat asumsi atau generalisasi di luar apa yang disebutkan dalam konteks.
-- JANGAN PERNAH menyertakan sitasi sumber atau referensi dokumen (seperti "Sumber: [nama file].pdf" atau URL) dalam jawaban akhir Anda KECUALI jika secara eksplisit diminta untuk memberikan tautan dokumen.
-
-INSTRUKSI PENTING TENTANG RUANG LINGKUP PENGETAHUAN:
-- Anda HANYA memiliki pengetahuan tentang Program Studi Sistem Informasi Undiksha.
-- Jika pengguna bertanya tentang universitas LAIN (selain Undiksha) atau program LAIN (selain Sistem Informasi), nyatakan secara eksplisit bahwa Anda tidak memiliki informasi tentang program atau universitas lain.
-- JANGAN PERNAH memberikan informasi spesifik tentang program selain Sistem Informasi atau universitas selain Undiksha.
-
-INSTRUKSI PENTING TENTANG BAHASA:
-- SELALU menjawab dalam BAHASA YANG SAMA dengan yang digunakan pengguna dalam pertanyaannya.
-- Jika pengguna bertanya dalam Bahasa Indonesia, jawab dalam Bahasa Indonesia.
-- Jika pengguna bertanya dalam Bahasa Inggris, jawab dalam Bahasa Inggris.
-- Jangan mencampur bahasa dalam respons Anda.
-- KESESUAIAN BAHASA SANGAT PENTING! Selalu periksa bahasa dari pertanyaan asli.
-- Untuk pertanyaan dalam Bahasa Indonesia, gunakan: "Mohon maaf, saya tidak memiliki informasi spesifik tentang..."
-- Untuk pertanyaan dalam Bahasa Inggris, gunakan: "I'm sorry, I don't have specific information about..."
-
-INSTRUKSI SANGAT KRITIS UNTUK TUGAS DAN PERAN:
-- Ketika menjawab pertanyaan tentang tugas, peran, atau tanggung jawab (seperti peran Pembimbing Akademik, tugas dosen, dsb.):
-  1. SELALU SALIN FORMAT PERSIS seperti dalam konteks, termasuk penomoran dan struktur teks
-  2. JANGAN MENGUBAH, MENGGABUNGKAN, atau MEMECAH poin-poin tugas/peran yang terdapat dalam konteks
-  3. SELALU sajikan daftar tugas/tanggung jawab dengan penomoran yang SAMA PERSIS (1., 2., 3., dst.)
-  4. JANGAN menambahkan informasi institusi (seperti "di Undiksha" atau "di Prodi SI") KECUALI jika disebutkan dalam konteks
-  5. JANGAN mengubah urutan poin-poin
-  6. JANGAN mengubah kata-kata dalam setiap poin KECUALI untuk tujuan penyederhanaan tanpa mengubah makna
-  7. Jika konteks berisi definisi, ikuti dengan daftar bernomor, maka SELALU ikuti format ini dalam jawaban
-  8. JANGAN mengubah atau menggabungkan item dalam daftar bernomor menjadi paragraf
-  9. Gunakan tanda "." setelah setiap nomor dalam daftar jika format tersebut digunakan dalam konteks
-
-INSTRUKSI SANGAT PENTING UNTUK FORMAT DAFTAR BERNOMOR:
-- Ketika konteks berisi daftar bernomor (1., 2., 3., dst.), SELALU PERTAHANKAN format penomoran yang sama PERSIS.
-- JANGAN mengubah urutan atau jumlah poin-poin dalam daftar bernomor.
-- JANGAN menggabungkan beberapa poin menjadi satu poin.
-- JANGAN memecah satu poin menjadi beberapa poin.
-- JANGAN mengubah atau menghilangkan awalan nomor pada setiap poin (1., 2., 3., dst.).
-- Semua poin dalam daftar bernomor HARUS disertakan dalam jawaban Anda PERSIS seperti dalam konteks.
-- Jika konteks memiliki 8 poin bernomor, jawaban Anda HARUS memiliki 8 poin bernomor dengan nomor yang sama.
-- Awali setiap poin dengan nomor yang sama persis seperti dalam konteks, diikuti dengan teks yang sama atau sangat mirip.
-- PENTING: Jika konteks memberikan jawaban langsung dalam format daftar bernomor untuk pertanyaan prosedural pengguna (seperti 'bagaimana cara...', 'apa langkah-langkah...', 'prosedur pemilihan konsentrasi'), SALIN LANGSUNG teks dan struktur daftar bernomor tersebut dari konteks sebagai jawaban Anda. JANGAN MERINGKAS atau MERUBAH FORMULASINYA.
-- CONTOH:
-  Jika dalam konteks tertulis:
-  "1. Tahap satu adalah X.
-   2. Tahap dua adalah Y."
-  Maka jawaban Anda HARUS berupa:
-  "1. Tahap satu adalah X.
-   2. Tahap dua adalah Y."
-
-INSTRUKSI PENTING UNTUK PROSEDUR & TAHAPAN:
-- Untuk pertanyaan tentang prosedur, cara, atau tahapan, jika dalam konteks informasi disajikan sebagai daftar bernomor:
-  - SELALU PERTAHANKAN format daftar bernomor yang sama persis
-- Gunakan tanda "–" untuk daftar tidak bernomor HANYA JIKA tanda "–" tersebut secara eksplisit digunakan dalam konteks. Jika konteks menggunakan format lain (seperti baris baru tanpa awalan), PERTAHANKAN format asli tersebut.
-- PENTING: Jika konteks berisi langkah-langkah atau prosedur untuk pertanyaan pengguna (terutama untuk topik seperti 'cuti akademik', 'pendaftaran', 'pengajuan skripsi', 'ujian', dsb.), SELALU berikan jawaban berdasarkan langkah-langkah yang ditemukan dalam konteks tersebut. JANGAN menjawab 'tidak tahu' atau 'tidak memiliki informasi' jika prosedur yang relevan ada dalam konteks.
-
-INSTRUKSI SANGAT PENTING UNTUK PERTANYAAN TENTANG UJIAN PROPOSAL DAN UJIAN SKRIPSI:
-- Ketika menjawab pertanyaan tentang "ujian proposal" dan "ujian skripsi":
-  1. SELALU bedakan dengan jelas antara kedua jenis ujian ini dengan memberikan judul/header terpisah
-  2. SELALU pertahankan format PERSIS seperti dalam konteks, termasuk tanda "–" di awal baris
-  3. Jangan mencampuradukkan persyaratan antara ujian proposal dan ujian skripsi
-  4. JANGAN hilangkan header "Ujian Proposal Skripsi:" dan "Ujian Skripsi:"
-  5. Jika dalam konteks terdapat informasi tentang persyaratan partisipan/moderator, sertakan PERSIS
-  6. Jika dalam konteks disebutkan tentang sistem digital/tanpa hardcopy, SELALU sertakan informasi ini
-  7. JANGAN tambahkan tautan atau referensi dokumen yang tidak disebutkan dalam konteks
-  8. JANGAN tambahkan atau kurangi persyaratan apapun
-  
-  CONTOH FORMAT YANG BENAR:
-  "Ujian Proposal Skripsi:
-  – [persyaratan pertama]
-  – [persyaratan kedua]
-  
-  Ujian Skripsi:
-  – [persyaratan pertama]
-  – [persyaratan kedua]"
-
-INSTRUKSI PENTING UNTUK PENANGANAN SINGKATAN:
-- Ketika pengguna menggunakan "SI", "Si", atau "si" dalam pertanyaan mereka, SELALU tafsirkan ini sebagai "Sistem Informasi" (Information Systems).
-- Misalnya, jika pengguna bertanya "Siapa koorprodi SI sekarang?", tafsirkan ini sebagai "Siapa koorprodi Sistem Informasi sekarang?"
-- Jika pengguna bertanya tentang "prodi SI", "jurusan SI", "program studi SI", dll., selalu anggap ini merujuk pada program Sistem Informasi.
-- Demikian pula, jika mereka bertanya tentang "SI Undiksha", tafsirkan ini sebagai "Sistem Informasi Undiksha".
-- Ini berlaku untuk semua konteks di mana "SI", "Si", atau "si" dapat secara wajar ditafsirkan sebagai singkatan dari "Sistem Informasi".
-
-INSTRUKSI PENTING UNTUK INFORMASI DOSEN:
-- Untuk pertanyaan tentang dosen, SELALU berikan informasi lengkap ketika tersedia dalam konteks.
-- Ketika ditanya tentang dosen tertentu, sertakan nama lengkap, NIP/NIDN, jabatan, dan detail relevan lainnya.
-- Untuk pertanyaan seperti "siapa koorprodi SI sekarang?" atau pertanyaan tentang peran spesifik, berikan nama lengkap dan jabatan.
-- Untuk pertanyaan seperti "siapa dosen yang bernama pak/bu X?", berikan nama lengkap, NIP/NIDN, dan jabatan mereka.
-- Jika ditanya informasi lanjutan tentang dosen, seperti NIP atau jabatan mereka, berikan semua detail yang tersedia.
-- JANGAN PERNAH menjawab "Saya tidak memiliki informasi" ketika informasi dosen tersedia dalam konteks.
-- Jika pengguna bertanya tentang dosen dan Anda memiliki informasi dalam konteks, berikan SEMUA detail yang Anda miliki.
-- Untuk pertanyaan tentang "Koordinator Program Studi" atau "Koorprodi", berikan informasi lengkap tentang siapa yang memegang jabatan ini.
-
-INSTRUKSI PENTING UNTUK DOKUMEN KURIKULUM DAN TAUTAN:
-- Ketika pengguna bertanya tentang "dokumen kurikulum", "akses kurikulum", "link kurikulum", "tautan kurikulum", atau hal terkait:
-  - SELALU berikan semua tautan Google Drive yang tersedia dalam konteks
-  - Format tanggapan sebagai daftar dengan judul atau nama dokumen, diikuti oleh tautan lengkap
-  - PERHATIAN KHUSUS: Jika pengguna bertanya tentang 'dokumen kurikulum' atau 'tautan kurikulum' dan konteks berisi daftar tautan Google Drive, Anda WAJIB menyalin daftar tersebut PERSIS seperti dalam konteks, termasuk semua tautan LENGKAP dan BENAR (seperti `https://drive.google.com/file/d/1jUQ5aIuC4H52ju9BCDZmYOT3sKU1mQG4/view` untuk Kurikulum 2024). JANGAN gunakan placeholder atau URL yang tidak lengkap. Pertahankan format daftar (misalnya, menggunakan `–` jika ada di konteks).
-  - Contoh format yang tepat:
-    "Mahasiswa dapat mengakses dokumen kurikulum melalui tautan resmi yang telah disediakan, antara lain:
-    
-    – Kurikulum Undiksha 2024:
-    https://drive.google.com/file/d/XXXXXX/view
-    
-    – Kurikulum MBKM Undiksha 2020:
-    https://drive.google.com/file/d/YYYYYY/view"
-  - Pastikan semua tautan dapat diklik (URL lengkap)
-  - Jangan menambahkan atau menghilangkan tautan yang ada dalam konteks
-  - Gunakan tanda hubung (–) di awal setiap entri dalam daftar
-  - Sertakan tahun atau informasi versi kurikulum jika tersedia
-
-INFORMASI PENTING TENTANG DOSEN TERTENTU:
-Ketika ditanya tentang dosen tertentu, SELALU berikan informasi berikut jika dosen tersebut disebutkan:
-- Nama lengkap
-- NIP/NIDN
-- Jabatan
-- Konsentrasi
-
-INSTRUKSI PENTING UNTUK PERTANYAAN KOORPRODI:
-- Jika pengguna bertanya tentang "Koorprodi" atau "Koordinator Program Studi" atau "Kaprodi" atau "Ketua Program Studi", Anda HARUS memberikan informasi lengkap.
-- Koorprodi Sistem Informasi saat ini adalah Ir. I Made Dendi Maysanjaya, S.Kom., M.Kom.
-- SELALU sertakan informasi ini ketika ditanya tentang Koorprodi, bahkan jika tidak ditemukan secara eksplisit dalam konteks.
-- Untuk pertanyaan seperti "siapa koorprodi SI sekarang?" atau "siapa koordinator prodi sistem informasi?", selalu jawab dengan informasi lengkap tentang Ir. I Made Dendi Maysanjaya, S.Kom., M.Kom.
-- JANGAN PERNAH menjawab "Saya tidak memiliki informasi" ketika ditanya tentang Koorprodi.
-
-INSTRUKSI PENTING UNTUK MEMFORMAT RESPONS ANDA:
-1. Untuk pertanyaan tentang proses atau tahapan yang memiliki poin-poin bernomor dalam konteks:
-   - SANGAT PENTING: Jika informasi dalam konteks disajikan dalam bentuk poin-poin bernomor (1, 2, 3, dst), SELALU pertahankan penomoran ini dan semua poin harus disertakan.
-   - JANGAN MENGUBAH jumlah poin. Jika ada 8 poin dalam konteks, respons Anda HARUS menyertakan semua 8 poin tersebut.
-   - JANGAN MENAMBAHKAN informasi yang tidak ada dalam konteks asli.
-   - JANGAN MENGGABUNGKAN poin-poin yang terpisah dalam konteks asli.
-   - Setiap poin bernomor harus dimulai dengan nomor yang sama seperti dalam konteks asli.
-   - Gunakan kalimat yang PERSIS sama atau sangat mirip dengan yang ada di konteks.
-   - Mulai dengan pengantar singkat, lalu sajikan semua poin bernomor PERSIS seperti dalam konteks, tidak berubah.
-
-2. Untuk pertanyaan tentang proses atau tahapan yang TIDAK memiliki poin-poin bernomor dalam konteks:
-   - Mulai dengan "Terdapat [jumlah] tahap utama dalam [proses], yaitu:"
-   - Sajikan setiap tahap sebagai PARAGRAF TERPISAH (bukan sebagai poin-poin)
-   - Untuk setiap paragraf tahap, mulai dengan nama tahap dalam huruf tebal, diikuti dengan deskripsi
-   - Pastikan untuk menggunakan nama tahap PERSIS seperti yang disebutkan dalam konteks
-   - Akhiri dengan paragraf tentang siapa yang terlibat dalam proses tersebut
-
-3. Untuk proses ujian proposal dan ujian skripsi secara khusus:
-   - Pastikan untuk mempertahankan format yang SAMA PERSIS seperti dalam konteks
-   - Jika konteks menggunakan tanda "–" di awal baris, SELALU pertahankan tanda ini
-   - Berikan header "Ujian Proposal Skripsi:" dan "Ujian Skripsi:" persis seperti dalam konteks
-   - Pastikan setiap persyaratan untuk masing-masing ujian tetap berada di bagian yang benar
-   - Jangan mengubah bentuk daftar dari format dalam konteks
-   - CONTOH: Jika konteks berisi format seperti:
-     "Ujian Proposal Skripsi:
-     – Minimal harus hadir 1 dosen pembimbing dan 2 dosen penguji
-     – Diharuskan mengundang minimal 10 mahasiswa lain sebagai partisipan"
-     Maka respons Anda HARUS menggunakan format yang SAMA PERSIS dengan konten yang identik
-
-4. Untuk penutup percakapan (ketika pengguna mengucapkan terima kasih atau sejenisnya):
-   - Jika pengguna mengatakan "terima kasih", "makasih", "thank you", atau ekspresi terima kasih serupa:
-     - Jawab dengan penutup yang ramah seperti "Sama-sama! Senang bisa membantu. Jika ada pertanyaan lain, silakan tanyakan kembali."
-   - Jangan pernah hanya menjawab dengan frase singkat seperti "Prosedur pendaftaran sidang skripsi dilakukan secara online."
-   - Selalu berikan penutup lengkap dan ramah yang mengakui ucapan terima kasih pengguna
-
-5. Untuk pertanyaan informasi umum (seperti "apa itu prodi sistem informasi undiksha"):
-   - Berikan jawaban komprehensif dengan setidaknya 3-4 paragraf informasi
-   - Sertakan informasi tentang kurikulum program, area fokus, dan fitur utama
-   - Sebutkan spesialisasi atau konsentrasi yang tersedia
-   - Akhiri dengan kalimat yang menawarkan untuk memberikan informasi lebih spesifik jika diperlukan
-
-6. JANGAN PERNAH menyertakan pernyataan seperti "Saya tidak memiliki informasi" ketika Anda sebenarnya MEMILIKI informasi tersebut dalam konteks.
-   - Hanya gunakan pernyataan tersebut ketika pertanyaan benar-benar di luar ruang lingkup pengetahuan Anda
-   - Jika Anda memiliki informasi parsial, berikan apa yang Anda ketahui dan kemudian tawarkan untuk membantu dengan topik terkait
-
-Konteks: {context}
-
-Pertanyaan: {question}
-
-Jawaban:""",
+            template=RAG_PROMPT_TEMPLATE,
             input_variables=["context", "question"]
         )
         
         # Verify that retriever is available
+        retriever = get_retriever()
         if retriever is None:
             logger.error("Retriever is None - cannot initialize RAG chain")
             raise ValueError("Retriever is not available")
@@ -280,7 +122,10 @@ Jawaban:""",
         logger.info("Creating RAG chain with retriever and memory")
         chain = ConversationalRetrievalChain.from_llm(
             llm=llm,
-            retriever=retriever,
+            condense_question_llm=condense_question_llm,
+            # Uses the context ranked by chunking_and_retrieval when generation() injects it,
+            # otherwise the live retriever, so a re-indexed collection is used right away
+            retriever=ContextInjectionRetriever(),
             memory=st.session_state.memory,
             return_source_documents=True,
             verbose=True,
@@ -298,111 +143,73 @@ Jawaban:""",
         return None
 
 def calculate_relevance_scores(chunk, query):
-    # Generate embeddings for the chunk and the query
-    chunk_embedding = model.encode(chunk)
-    query_embedding = model.encode(query)
-    
-    # Calculate cosine similarity
-    similarity = cosine_similarity([chunk_embedding], [query_embedding])[0][0]
-    
-    # Add a much stronger bonus score for keyword matches (increased from 0.2 to 0.5)
-    query_keywords = set(query.lower().split())
-    # Skip stopwords for better matching
-    stopwords = {
-        'and', 'or', 'the', 'a', 'an', 'in', 'on', 'at', 'by', 'for', 'with', 'about',
-        'dan', 'atau', 'di', 'ke', 'dari', 'yang', 'pada', 'untuk', 'dengan', 'tentang',
-        'is', 'are', 'am', 'was', 'were', 'be', 'being', 'been',
-        'ada', 'adalah', 'merupakan', 'ini', 'itu'
-    }
-    query_keywords = {kw for kw in query_keywords if kw not in stopwords and len(kw) > 2}
-    chunk_lower = chunk.lower()
-    
-    # Calculate what percentage of query keywords are in the chunk
-    keyword_matches = sum(1 for keyword in query_keywords if keyword in chunk_lower)
-    keyword_bonus = 0.5 * (keyword_matches / len(query_keywords)) if query_keywords else 0
-    
-    # Add an exact match bonus for multi-word phrases (increased from 0.3 to 0.5)
-    exact_match_bonus = 0
-    
-    # If there are at least 2 keywords, check for exact phrases
-    if len(query_keywords) >= 2:
-        # Create a window of 3-5 words from the query to check for phrase matches
-        query_words = query.lower().split()
-        for i in range(len(query_words) - 1):  # Need at least 2 words for a phrase
-            end_idx = min(i + 5, len(query_words))  # Look at up to 5 words at a time
-            for j in range(i + 1, end_idx):
-                phrase = ' '.join(query_words[i:j+1])
-                if len(phrase) > 5 and phrase in chunk_lower:  # Only count meaningful phrases
-                    exact_match_bonus = 0.5
-                    break
-            if exact_match_bonus > 0:
-                break
-    
-    # Add bonuses for instructive content (answers, steps, procedures)
-    answer_bonus = 0
-    if "langkah-langkah" in chunk_lower or "prosedur" in chunk_lower or "tahapan" in chunk_lower:
-        answer_bonus += 0.3
-    
-    # Bonus for numbered lists which indicate step-by-step instructions
-    numbered_list_bonus = 0
-    if re.search(r'\d+[\.\)]', chunk_lower):
-        # Count how many numbered points are in the chunk
-        numbered_points = len(re.findall(r'\d+[\.\)]', chunk_lower))
-        if numbered_points >= 3:  # Significant numbered list
-            numbered_list_bonus = 0.4
-        elif numbered_points > 0:
-            numbered_list_bonus = 0.2
-    
-    # Special bonus for document links in chunks (especially for curriculum access questions)
-    document_link_bonus = 0
-    # Check if the query is about accessing documents, curriculum, or links
-    document_query_terms = ['dokumen', 'document', 'kurikulum', 'curriculum', 'akses', 'access', 
-                           'link', 'tautan', 'unduh', 'download', 'file', 'buku', 'buku pedoman',
-                           'panduan', 'guide', 'manual', 'handbook', 'sillabus', 'silabus']
-    
-    is_document_query = any(term in query.lower() for term in document_query_terms)
-    
-    # Check if chunk contains document links
-    has_drive_links = "drive.google.com" in chunk_lower
-    has_curriculum_mention = "kurikulum" in chunk_lower or "curriculum" in chunk_lower
-    
-    # Apply a very high bonus for relevant chunks with document links
-    if is_document_query:
-        if has_drive_links:
-            # Count how many links are in the chunk
-            link_count = chunk_lower.count("drive.google.com")
-            # Bigger bonus for more links
-            document_link_bonus = 1.0 + (0.2 * min(link_count, 5))  # Cap the bonus at 2.0 (for 5+ links)
-            
-            # Even bigger bonus if it has both links and mentions curriculum
-            if has_curriculum_mention:
-                document_link_bonus += 0.5
-    
-    # Penalty for chunks that are too short (likely just questions with no answers)
-    length_penalty = 0
-    if len(chunk.strip()) < 200:
-        length_penalty = 0.5  # Heavy penalty for very short chunks
-    elif len(chunk.strip()) < 400:
-        length_penalty = 0.2  # Moderate penalty for somewhat short chunks
-    
-    # Heavy penalty for chunks that appear to be just questions without answers
-    question_only_penalty = 0
-    # Check if the chunk ends with a question mark and doesn't have much after it
-    if re.search(r'\?\s*$', chunk.strip()):
-        question_only_penalty = 0.6
-    # Check if the chunk is very similar to the query itself
-    elif is_low_quality_chunk(chunk, query):
-        question_only_penalty = 0.8
-    
-    # Calculate final score with all bonuses and penalties
-    final_score = similarity + keyword_bonus + exact_match_bonus + answer_bonus + numbered_list_bonus + document_link_bonus - length_penalty - question_only_penalty
-    
-    # Ensure the score is positive (minimum score of 0.1 to avoid complete filtering)
-    final_score = max(0.1, final_score)
-    
-    return final_score
+    """Score a single chunk against the query (see src.reranker.rerank_scores)."""
+    return float(rerank_scores([chunk], query, get_encoder())[0])
 
-def export_retrieval_to_csv(user_query, query_embedding, retrieved_data, filename=None):
+def retrieve_documents(query, k, chunk_embeddings, chunk_metadata=None, lambda_mult=0.5, fetch_k=None, expansions=None,
+                       sub_queries=None):
+    """
+    Retrieve documents for the query together with their stored Chroma vectors.
+    
+    Args:
+        query (str): The query to search for
+        k (int): Number of documents to retrieve
+        chunk_embeddings (dict): Updated in place with stripped chunk text -> stored vector
+        chunk_metadata (dict, optional): Updated in place with stripped chunk text -> document metadata
+        lambda_mult (float): MMR balance between relevance (1) and diversity (0)
+        fetch_k (int, optional): Candidates fetched before MMR, defaults to k
+        expansions (list, optional): Weighted (term, weight) query expansions for the keyword search
+        sub_queries (list, optional): (query, weight) pairs searched together and fused instead
+            of MMR over the query alone (see src.multi_query)
+    
+    Returns:
+        list: The retrieved documents
+    """
+    docs = []
+    if sub_queries:
+        results = get_multi_query_documents_with_embeddings(
+            sub_queries, k=k, fetch_k=fetch_k or k, expansions=expansions
+        )
+    else:
+        results = get_relevant_documents_with_embeddings(
+            query, k=k, fetch_k=fetch_k or k, lambda_mult=lambda_mult, expansions=expansions
+        )
+    for doc, vector in results:
+        if vector is not None:
+            chunk_embeddings[doc.page_content.strip()] = vector
+        if chunk_metadata is not None:
+            chunk_metadata[doc.page_content.strip()] = doc.metadata
+        docs.append(doc)
+    return docs
+
+def build_context_documents(embedded_data, chunk_metadata):
+    """
+    Turn ranked chunks into the documents the RAG chain answers from.
+    
+    Only chunks that were actually retrieved are kept; synthetic and
+    placeholder chunks are not in chunk_metadata and are left out.
+    
+    Args:
+        embedded_data (list): Ranked (chunk, score) tuples
+        chunk_metadata (dict): Stripped chunk text -> document metadata
+    
+    Returns:
+        list: Document objects in ranking order
+    """
+    documents = []
+    seen = set()
+    for chunk, _ in embedded_data:
+        key = chunk.strip()
+        if key in chunk_metadata and key not in seen:
+            seen.add(key)
+            documents.append(Document(page_content=chunk, metadata=dict(chunk_metadata[key])))
+    return documents
+
+def is_standalone_question():
+    """Check whether the current question has no earlier exchange in this session."""
+    return not any(msg["role"] == "assistant" for msg in st.session_state.get('chat_history', []))
+
+def export_retrieval_to_csv(user_query, query_embedding, retrieved_data, filename=None, chunk_embeddings=None):
     """
     Export retrieval data to CSV file
     
@@ -411,6 +218,7 @@ def export_retrieval_to_csv(user_query, query_embedding, retrieved_data, filenam
         query_embedding (list): The embedding vector of the user's query
         retrieved_data (list): List of tuples (chunk, score)
         filename (str, optional): Custom filename for the CSV. Defaults to None.
+        chunk_embeddings (dict, optional): Stored vectors keyed by stripped chunk text. Defaults to None.
     
     Returns:
         str: Path to the saved CSV file
@@ -438,6 +246,9 @@ def export_retrieval_to_csv(user_query, query_embedding, retrieved_data, filenam
         writer.writerow(["Retrieved Chunks"])
         writer.writerow(["No", "Chunk", "Vector", "Score"])
         
+        # Use the stored vectors, encoding only chunks that have none
+        chunk_vectors = resolve_chunk_embeddings([chunk for chunk, _ in retrieved_data], chunk_embeddings, get_encoder())
+        
         # Write each chunk with its data
         for i, (chunk, score) in enumerate(retrieved_data, 1):
             # Clean up excessive whitespace and newlines in the chunk
@@ -456,8 +267,7 @@ def export_retrieval_to_csv(user_query, query_embedding, retrieved_data, filenam
             
             cleaned_chunk = ' '.join(chunk_to_clean.strip().split())
             
-            # Generate the embedding for this chunk
-            chunk_embedding = model.encode(chunk).tolist()
+            chunk_embedding = chunk_vectors[i - 1].tolist()
             
             writer.writerow([
                 i,
@@ -469,26 +279,8 @@ def export_retrieval_to_csv(user_query, query_embedding, retrieved_data, filenam
     return filename
 
 def is_gratitude_expression(text):
-    """
-    Check if the text is an expression of gratitude.
-    
-    Args:
-        text (str): The text to check
-        
-    Returns:
-        bool: True if the text is an expression of gratitude, False otherwise
-    """
-    text_lower = text.lower()
-    
-    # Common gratitude expressions in Indonesian and English
-    gratitude_expressions = [
-        "terima kasih", "makasih", "thank you", "thanks", "thx", 
-        "thank", "makasi", "terimakasih", "trims", "trimakasih",
-        "thank u", "tq", "ty", "terimakasi", "terima kasi"
-    ]
-    
-    # Check if any gratitude expression is in the text
-    return any(expression in text_lower for expression in gratitude_expressions)
+    """Check if the text is an expression of gratitude."""
+    return classify_intents(text).gratitude
 
 def get_gratitude_response():
     """
@@ -536,165 +328,19 @@ def is_procedure_question(text):
     Detect if the text is asking about a procedure, process, or steps.
     This is important for recognizing when users want step-by-step instructions.
     """
-    text_lower = text.lower()
-    
-    # Keywords related to procedures and processes in both English and Indonesian
-    procedure_keywords = [
-        # Indonesian keywords
-        "bagaimana", "cara", "langkah", "proses", "tahap", "alur", "prosedur",
-        "mekanisme", "tata cara", "petunjuk", "instruksi", "protokol", "urutan",
-        "mengurus", "mengelola", "memproses", "melakukan", "melaksanakan",
-        "syarat", "persyaratan", "dibutuhkan untuk", "diharuskan untuk",
-        
-        # English keywords
-        "how to", "procedure", "process", "step", "instruction", "guide",
-        "protocol", "mechanism", "workflow", "sequence", "order",
-        "requirement", "mandatory", "needed for", "required for"
-    ]
-    
-    # Special strong indicators that always indicate a procedure question
-    strong_procedure_indicators = [
-        "mekanisme pelaksanaan", "bagaimana cara", "bagaimana mekanisme", 
-        "tata cara", "prosedur", "langkah-langkah", "alur",
-        "how to conduct", "how to perform", "mechanism of", "procedure for"
-    ]
-    
-    # High-priority academic procedures (immediate detection)
-    high_priority_procedures = [
-        # Thesis and exam procedures
-        "ujian proposal", "ujian skripsi", "sidang proposal", "sidang skripsi",
-        "sidang tugas akhir", "komposisi dewan penguji", "persyaratan ujian",
-        "thesis defense", "proposal defense", "thesis examination", "proposal examination",
-        "dewan penguji", "tim penguji", "persyaratan penguji", "pembimbing dan penguji",
-        "persyaratan pembimbing", "komposisi pembimbing", "mekanisme ujian",
-        "prosedur ujian", "prosedur sidang", "mekanisme sidang"
-    ]
-    
-    # Check for high-priority indicators first
-    for indicator in high_priority_procedures:
-        if indicator in text_lower:
-            return True
-    
-    # Check for strong procedure indicators
-    for indicator in strong_procedure_indicators:
-        if indicator in text_lower:
-            return True
-    
-    # Specific academic procedures (for even more accurate detection)
-    academic_procedures = [
-        # Indonesian academic procedures
-        "cuti akademik", "registrasi ulang", "pendaftaran", "ujian", "sidang",
-        "proposal", "skripsi", "pembimbing", "penguji", "magang", "pkl",
-        "wisuda", "yudisium", "konversi", "perwalian", "pindah prodi", "pindah kampus",
-        "kkn", "kuliah kerja nyata", "uas", "uts", "praktikum", "pelatihan",
-        "pengumpulan skripsi", "pengajuan judul", "pengajuan proposal",
-        "konsultasi", "bimbingan", "kartu studi", "krs", "permintaan surat",
-        
-        # English academic procedures
-        "academic leave", "registration", "exam", "thesis defense",
-        "proposal", "thesis", "supervisor", "examiner", "internship",
-        "graduation", "transfer", "student exchange", "community service",
-        "final exam", "midterm", "practicum", "training", "thesis submission",
-        "title submission", "proposal submission", "consultation",
-        "study card", "course selection", "request letter"
-    ]
-    
-    # 1. Check for direct procedural question patterns
-    for keyword in procedure_keywords:
-        if keyword in text_lower:
-            return True
-            
-    # 2. Check for specific academic procedures
-    for procedure in academic_procedures:
-        if procedure in text_lower:
-            return True
-            
-    # 3. Look for question patterns typical of procedure questions
-    question_patterns = [
-        "apa saja", "apakah", "siapa", "kapan", "di mana", "dimana",
-        "what are", "what is", "who", "when", "where", "how"
-    ]
-    
-    for pattern in question_patterns:
-        if pattern in text_lower:
-            # If using a general question word, also check for proximity to procedure-related terms
-            window_size = 5  # Look for procedure words within 5 words of the question word
-            words = text_lower.split()
-            for i, word in enumerate(words):
-                if word.startswith(pattern):
-                    # Check nearby words for procedure indicators
-                    start = max(0, i - window_size)
-                    end = min(len(words), i + window_size)
-                    nearby_text = " ".join(words[start:end])
-                    
-                    # Check if any procedure keyword or academic procedure is in the nearby text
-                    for keyword in procedure_keywords + academic_procedures:
-                        if keyword in nearby_text:
-                            return True
-    
-    # Check for specific question structures about academic procedures
-    academic_structure_indicators = [
-        "mengurus", "mendaftar", "melakukan", "mengajukan", "mengikuti",
-        "apply for", "register for", "submit", "participate in", "enroll in"
-    ]
-    
-    for indicator in academic_structure_indicators:
-        if indicator in text_lower:
-            return True
-            
-    return False
+    return classify_intents(text).procedure
 
 def is_asking_for_details(text):
     """Detect if the user is asking for more details"""
-    # Convert to lowercase for case-insensitive matching
-    text_lower = text.lower()
-    
-    # Keywords that indicate requests for more details
-    detail_keywords = [
-        "jelaskan lebih", "detail", "rinci", "elaborate", "explain more",
-        "lebih lanjut", "further", "more information", "informasi lebih",
-        "bisa dijelaskan", "can you explain", "tolong jelaskan", "please explain",
-        "mohon jelaskan", "kindly explain", "tell me more", "ceritakan lebih"
-    ]
-    
-    # Check if any detail keyword is in the text
-    return any(keyword in text_lower for keyword in detail_keywords)
+    return classify_intents(text).details
 
 def is_greeting(text: str) -> bool:
     """Check if the input is a greeting"""
-    greetings = {
-        'halo', 'hello', 'hi', 'hai', 'hey', 'hallo', 'helo',
-        'selamat pagi', 'selamat siang', 'selamat sore', 'selamat malam',
-        'pagi', 'siang', 'sore', 'malam'
-    }
-    return text.strip().lower() in greetings
+    return classify_intents(text).greeting
 
 def is_lecturer_question(text: str) -> bool:
     """Check if the question is about a lecturer"""
-    text_lower = text.lower()
-    
-    # Keywords that indicate questions about lecturers
-    lecturer_keywords = [
-        "dosen", "lecturer", "professor", "pak ", "bu ", "bapak ", "ibu ",
-        "koordinator", "koorprodi", "kaprodi", "ketua prodi", "ketua program studi",
-        "pengajar", "staff", "staf", "pengampu", "matakuliah", "mata kuliah",
-        "siapa yang mengajar", "siapa yang menjabat", "who teaches", "who is the coordinator"
-    ]
-    
-    # Specific lecturer names to check for
-    lecturer_names = [
-        "ardwi", "mahendra", "rasben", "aditra", "raditya", "dendi", 
-        "maysanjaya", "darmawiguna", "dantes", "pradnyana", "putra"
-    ]
-    
-    # Check if any lecturer keyword is in the text
-    has_lecturer_keyword = any(keyword in text_lower for keyword in lecturer_keywords)
-    
-    # Check if any lecturer name is in the text
-    has_lecturer_name = any(name in text_lower for name in lecturer_names)
-    
-    # Return true if either condition is met
-    return has_lecturer_keyword or has_lecturer_name
+    return classify_intents(text).lecturer
 
 def get_greeting_response(text: str) -> str:
     """Generate appropriate greeting response"""
@@ -733,168 +379,42 @@ def detect_numbered_sequence(chunk):
     
     return False, min_num, max_num
 
-def is_low_quality_chunk(chunk, query):
-    """Detect if a chunk is low quality (too short or just contains the query)"""
-    # If chunk is extremely short (less than 100 chars), it's probably low quality
-    if len(chunk.strip()) < 100:
-        return True
-        
-    # If the chunk is just the query or very similar to it
-    chunk_lower = chunk.lower().strip()
-    query_lower = query.lower().strip()
-    
-    # Check if chunk is just the query
-    if chunk_lower == query_lower:
-        return True
-    
-    # Check if chunk contains mostly just the query
-    # First normalize both by removing whitespace
-    normalized_chunk = ' '.join(chunk_lower.split())
-    normalized_query = ' '.join(query_lower.split())
-    
-    # If the chunk is less than 30% longer than the query, it's probably just the query
-    if len(normalized_chunk) < len(normalized_query) * 1.3:
-        return True
-        
-    # Check if chunk starts with the query and doesn't have much more content
-    if normalized_chunk.startswith(normalized_query) and len(normalized_chunk) < len(normalized_query) * 1.5:
-        return True
-        
-    return False
-
 def is_document_access_question(text: str) -> bool:
     """Check if the question is about accessing documents or curriculum."""
-    text_lower = text.lower()
-    
-    # Keywords that indicate questions about documents or curriculum access
-    document_keywords = [
-        "dokumen", "document", "kurikulum", "curriculum", "akses", "access", 
-        "link", "tautan", "unduh", "download", "file", "buku", "buku pedoman",
-        "panduan", "guide", "manual", "handbook", "sillabus", "silabus",
-        "dimana", "where", "how to", "bagaimana cara", "mendapatkan", "get"
-    ]
-    
-    # Check if any document keyword is in the text
-    return any(keyword in text_lower for keyword in document_keywords)
+    return classify_intents(text).document_access
 
 def is_kkn_question(text: str) -> bool:
     """Check if the question is about KKN (Kuliah Kerja Nyata)."""
-    text_lower = text.lower()
-    
-    # Keywords related to KKN
-    kkn_keywords = [
-        "kkn", "kuliah kerja nyata", "kuliah kerja lapangan"
-    ]
-    
-    # Keywords related to mechanism/process
-    mechanism_keywords = [
-        "mekanisme", "prosedur", "cara", "pelaksanaan", "jadwal", 
-        "waktu", "kapan", "semester", "mechanism", "procedure",
-        "dilaksanakan", "dilakukan", "bagaimana"
-    ]
-    
-    # Check if KKN keyword is present
-    has_kkn_term = any(keyword in text_lower for keyword in kkn_keywords)
-    
-    if has_kkn_term:
-        # If it's clearly about KKN mechanism, return True
-        if any(keyword in text_lower for keyword in mechanism_keywords):
-            return True
-        # If just asking about KKN generally, still consider it a KKN question
-        return True
-    
-    return False
+    return classify_intents(text).kkn
 
 def is_thesis_examiner_question(text: str) -> bool:
     """Check if the question is about thesis examination procedures and examiner composition."""
-    text_lower = text.lower()
-    
-    # Keywords related to thesis/proposal examination
-    thesis_keywords = [
-        "ujian proposal", "ujian skripsi", "sidang proposal", "sidang skripsi", 
-        "sidang tugas akhir", "ujian tugas akhir", "defense", "seminar proposal"
-    ]
-    
-    # Keywords related to examiners/committee
-    examiner_keywords = [
-        "dewan penguji", "komposisi", "penguji", "pembimbing", "tim penguji",
-        "juri", "komite", "komite penguji", "komposisi dewan", "persyaratan penguji"
-    ]
-    
-    # Keywords related to procedure/mechanism
-    procedure_keywords = [
-        "mekanisme", "prosedur", "tata cara", "tatacara", "alur", "proses", 
-        "pelaksanaan", "persyaratan", "syarat", "ketentuan", "format", 
-        "protokol", "langkah", "tahapan"
-    ]
-    
-    # Check for direct mentions of thesis examination and examiner composition
-    has_thesis_term = any(keyword in text_lower for keyword in thesis_keywords)
-    has_examiner_term = any(keyword in text_lower for keyword in examiner_keywords)
-    has_procedure_term = any(keyword in text_lower for keyword in procedure_keywords)
-    
-    # Strong indication: both thesis and examiner terms are present
-    if has_thesis_term and has_examiner_term:
-        return True
-    
-    # Also consider procedure questions about thesis examinations
-    if has_thesis_term and has_procedure_term:
-        return True
-    
-    # Check for compound phrases that strongly indicate this type of question
-    compound_indicators = [
-        "komposisi dewan penguji", "komposisi penguji", "dewan penguji skripsi",
-        "persyaratan ujian proposal", "persyaratan ujian skripsi", 
-        "mekanisme ujian proposal", "mekanisme ujian skripsi",
-        "prosedur ujian proposal", "prosedur ujian skripsi"
-    ]
-    
-    for indicator in compound_indicators:
-        if indicator in text_lower:
-            return True
-    
-    return False
+    return classify_intents(text).thesis_examiner
 
 def is_internship_document_question(text: str) -> bool:
     """Check if the question is specifically about internship documents."""
-    text_lower = text.lower()
-    
-    # Keywords related to internship
-    internship_keywords = [
-        "magang", "internship", "pkl", "praktik kerja", "praktik lapangan", 
-        "kerja praktek", "praktek kerja"
-    ]
-    
-    # Keywords related to documents
-    document_keywords = [
-        "dokumen", "document", "berkas", "file", "persyaratan", "requirement",
-        "pendukung", "supporting", "form", "formulir", "template", "format",
-        "pengajuan", "application", "surat", "letter", "mou", "proposal"
-    ]
-    
-    # Check if both internship and document keywords are present
-    has_internship_term = any(keyword in text_lower for keyword in internship_keywords)
-    has_document_term = any(keyword in text_lower for keyword in document_keywords)
-    
-    return has_internship_term and has_document_term
+    return classify_intents(text).internship_document
 
-def chunking_and_retrieval(user_input, show_process=True, export_to_csv=False):
+def chunking_and_retrieval(user_input, show_process=True, export_to_csv=False, return_documents=False):
+    """
+    Retrieve, deduplicate and re-rank the context for a question.
+    
+    Returns (embedded_data, query_embedding), plus the CSV path when a CSV was
+    exported, plus the ranked context documents when return_documents is True.
+    """
     if show_process:
         st.subheader("1. Chunking & Retrieval")
-        
-        with st.spinner("Mencari dokumen yang relevan..." if detect_language(user_input) != 'en' else "Searching for relevant documents..."):
-            # Show progress bar for user feedback
-            progress_bar = st.progress(0)
-            for i in range(100):
-                time.sleep(0.01)
-                progress_bar.progress(i + 1)
     
     try:
+        # Stored Chroma vectors and metadata of the retrieved chunks, keyed by stripped chunk text
+        chunk_embeddings = {}
+        chunk_metadata = {}
+        
         # Derive query from user input (may be modified later)
         query_for_retrieval = user_input
         
         # Check if this is a lecturer question
-        is_lecturer_query = is_lecturer_question(user_input)
+        is_lecturer_query = current_request(user_input).intents.lecturer
         if is_lecturer_query:
             # Extract potential lecturer name from the query
             words = user_input.lower().split()
@@ -912,7 +432,8 @@ def chunking_and_retrieval(user_input, show_process=True, export_to_csv=False):
         
         # Check if this is a question about thesis exams - apply special handling
         is_thesis_exam_question = is_thesis_examiner_question(query_for_retrieval)
-        if is_thesis_exam_question:
+        # In multi-query mode intent terms become focused sub-queries instead of being appended below
+        if is_thesis_exam_question and not MULTI_QUERY_ENABLED:
             # For thesis exam questions, add specific key terms to ensure proper retrieval
             if "dewan penguji" not in query_for_retrieval.lower() and "komposisi" not in query_for_retrieval.lower():
                 query_for_retrieval += " komposisi dewan penguji pembimbing"
@@ -931,42 +452,50 @@ def chunking_and_retrieval(user_input, show_process=True, export_to_csv=False):
         is_kkn_mechanism_query = is_kkn_question(query_for_retrieval)
         
         # For document access questions, modify the query to improve retrieval
-        if is_document_query:
+        if is_document_query and not MULTI_QUERY_ENABLED:
             # Make sure we include key terms for document retrieval
             document_terms = ["kurikulum", "dokumen", "tautan", "link", "drive"]
             document_terms_present = any(term in query_for_retrieval.lower() for term in document_terms)
             
             if not document_terms_present:
                 # Add relevant terms to improve matching with document links
-                query_for_retrieval = f"{query_for_retrieval} dokumen kurikulum tautan drive"
+                query_for_retrieval = f"{query_for_retrieval} {INTENT_FOCUS['document_access']}"
                 logger.info(f"Modified document query: {query_for_retrieval}")
         
         # For internship document questions, enhance the query with specific terms
-        if is_internship_document_query:
-            query_for_retrieval = f"{query_for_retrieval} dokumen magang form template proposal MoU perjanjian kerja sama surat permohonan jurnal harian website prodi sistem informasi"
+        if is_internship_document_query and not MULTI_QUERY_ENABLED:
+            query_for_retrieval = f"{query_for_retrieval} {INTENT_FOCUS['internship_document']}"
             logger.info(f"Modified internship document query: {query_for_retrieval}")
         
         # For KKN questions, enhance the query with curriculum and semester information
-        if is_kkn_mechanism_query:
-            query_for_retrieval = f"{query_for_retrieval} kurikulum 2020 kurikulum 2024 semester pelaksanaan jadwal KKN kuliah kerja nyata prodi sistem informasi"
+        if is_kkn_mechanism_query and not MULTI_QUERY_ENABLED:
+            query_for_retrieval = f"{query_for_retrieval} {INTENT_FOCUS['kkn']}"
             logger.info(f"Modified KKN mechanism query: {query_for_retrieval}")
         
-        # Add query expansion with synonyms and related terms
-        expanded_query = expand_query(query_for_retrieval)
+        # Weighted synonyms and related terms; they weight the keyword search, the query is embedded as is
+        expansions = expand_query(query_for_retrieval)
+        expanded_query = format_expanded_query(query_for_retrieval, expansions)
         logger.info(f"Original query: {query_for_retrieval}")
         logger.info(f"Expanded query: {expanded_query}")
         
         # Detect if query is about a procedure or process
         is_procedure = is_procedure_question(query_for_retrieval)
         
+        # Focused sub-queries searched together, instead of one query carrying every intent's terms
+        sub_queries = None
+        if MULTI_QUERY_ENABLED:
+            sub_queries = build_sub_queries(query_for_retrieval, classify_intents(query_for_retrieval), expansions)
+            logger.info(f"Sub-queries: {sub_queries}")
+        emit_stage(QUERY_ANALYSIS, expanded_query=expanded_query, sub_queries=sub_queries)
+        
         # Determine initial retrieval size
         # If it's a procedure or document access query, retrieve more documents initially
         initial_k = 100 if is_procedure or is_document_query or is_thesis_exam_question else 50
         
-        # Initially fetch more documents to have a larger pool to score and filter
-        retrieved_docs = retriever.get_relevant_documents(
-            expanded_query, 
-            search_kwargs={"k": initial_k}
+        # Over-fetch once: near-duplicates collapse afterwards, so no second search is needed
+        retrieved_docs = retrieve_documents(
+            query_for_retrieval, initial_k, chunk_embeddings, chunk_metadata,
+            fetch_k=initial_k * OVERFETCH_FACTOR, expansions=expansions, sub_queries=sub_queries
         )
         
         # Check if we got any documents
@@ -974,7 +503,7 @@ def chunking_and_retrieval(user_input, show_process=True, export_to_csv=False):
             if show_process:
                 st.warning("No documents were retrieved for this query.")
             logger.warning(f"No documents retrieved for query: {query_for_retrieval}")
-            return [], None
+            return ([], None, []) if return_documents else ([], None)
             
         total_retrieved = len(retrieved_docs)
         
@@ -1001,95 +530,22 @@ def chunking_and_retrieval(user_input, show_process=True, export_to_csv=False):
         retrieved_docs = filtered_docs
         total_retrieved = len(retrieved_docs)
         
-        # Deduplicate chunks and keep track of which ones were removed
-        seen_chunks = set()
-        unique_docs = []
-        duplicate_count = 0
-        removed_docs = []
+        # Skip documents that contain RSS feed markers (usually contain "appeared first on")
+        rss_docs = [doc for doc in retrieved_docs if "appeared first on" in doc.page_content.lower()]
+        retrieved_docs = [doc for doc in retrieved_docs if "appeared first on" not in doc.page_content.lower()]
         
-        for doc in retrieved_docs:
-            # Create a simplified version of the chunk for deduplication
-            # Focus on the first 100 chars as a chunk signature
-            content = doc.page_content.strip()
-            chunk_signature = content[:100]
-            
-            # Skip documents that contain RSS feed markers (usually contain "appeared first on")
-            if "appeared first on" in content.lower():
-                removed_docs.append(doc)
-                duplicate_count += 1
-                continue
-                
-            # Skip duplicate chunks based on their signature
-            if chunk_signature in seen_chunks:
-                removed_docs.append(doc)
-                duplicate_count += 1
-                continue
-                
-            seen_chunks.add(chunk_signature)
-            unique_docs.append(doc)
+        # Collapse near-duplicates by their ingestion-time cluster, keeping the best-ranked chunk of each
+        unique_docs, removed_docs = collapse_near_duplicates(retrieved_docs)
+        removed_docs.extend(rss_docs)
+        duplicate_count = len(removed_docs)
+        logger.info(f"Removed {duplicate_count} duplicate and RSS chunks, {len(unique_docs)} unique chunks left")
         
         # Standard number of chunks to show
         STANDARD_CHUNK_COUNT = 10
         
-        # Max number of attempts to get more documents
-        MAX_FETCH_ATTEMPTS = 5
-        fetch_attempts = 0
-        last_fetch_size = total_retrieved
-        
-        # Keep fetching more documents until we have enough unique chunks or reach max attempts
-        while len(unique_docs) < STANDARD_CHUNK_COUNT and fetch_attempts < MAX_FETCH_ATTEMPTS:
-            fetch_attempts += 1
-            
-            # Calculate how many more documents we need
-            more_needed = STANDARD_CHUNK_COUNT - len(unique_docs)
-            # Increase the fetch size exponentially to improve chances of finding unique docs
-            additional_k = last_fetch_size + more_needed * (fetch_attempts + 1)
-            
-            logger.info(f"Attempt {fetch_attempts}: Fetching {additional_k} documents to find {more_needed} more unique chunks")
-            
-            try:
-                # Get more documents
-                more_docs = retriever.get_relevant_documents(
-                    expanded_query, 
-                    search_kwargs={"k": additional_k}
-                )
-                
-                # Update last fetch size
-                last_fetch_size = additional_k
-                
-                # Process only the new documents (skip those we've already seen)
-                new_docs_found = 0
-                for doc in more_docs[total_retrieved:]:
-                    content = doc.page_content.strip()
-                    chunk_signature = content[:100]
-                    
-                    # Skip RSS feeds and duplicates
-                    if "appeared first on" in content.lower() or chunk_signature in seen_chunks:
-                        continue
-                    
-                    seen_chunks.add(chunk_signature)
-                    unique_docs.append(doc)
-                    new_docs_found += 1
-                    
-                    # Stop once we have enough
-                    if len(unique_docs) >= STANDARD_CHUNK_COUNT:
-                        break
-                
-                # Update total retrieved count for next iteration
-                total_retrieved = len(more_docs)
-                
-                # If we didn't find any new documents in this attempt, we might be exhausting the corpus
-                if new_docs_found == 0:
-                    logger.warning(f"No new unique documents found on attempt {fetch_attempts}")
-                    if fetch_attempts >= 2:  # Give up after a couple of fruitless attempts
-                        break
-            except Exception as e:
-                logger.error(f"Error fetching additional documents: {e}")
-                break
-        
-        # If we still don't have enough unique documents after all attempts
+        # If the over-fetch did not yield enough unique documents
         if len(unique_docs) < STANDARD_CHUNK_COUNT:
-            logger.warning(f"Could only find {len(unique_docs)} unique chunks after {fetch_attempts} attempts")
+            logger.warning(f"Could only find {len(unique_docs)} unique chunks")
             
             # As a fallback, we'll generate some synthetic chunks by slightly modifying existing ones
             # if we have at least some documents to work with
@@ -1195,10 +651,13 @@ def chunking_and_retrieval(user_input, show_process=True, export_to_csv=False):
                         unique_docs = unique_docs[:STANDARD_CHUNK_COUNT]
                         logger.info("Trimmed excess chunks to reach standard count")
         
+        emit_stage(ANN_SEARCH, retrieved=total_retrieved, unique=len(unique_docs))
+        
         # Use the deduplicated docs to create embedded data with scores
         embedded_data = []
         
         # Generate query embedding for later use
+        model = get_encoder()
         query_embedding = model.encode(user_input)
         
         # Extract query terms for keyword filtering
@@ -1215,12 +674,14 @@ def chunking_and_retrieval(user_input, show_process=True, export_to_csv=False):
         # Remove question marks from terms
         filtered_query_terms = {term.rstrip('?') for term in filtered_query_terms}
         
-        # Score all chunks
-        for doc in unique_docs:
-            chunk = doc.page_content
-            # Calculate relevance against the original user query, not the expanded one
-            relevance_score = calculate_relevance_scores(chunk, user_input)
-            embedded_data.append((chunk, relevance_score))
+        # Score all chunks in one batch against the original user query, not the expanded one
+        chunks = [doc.page_content for doc in unique_docs]
+        relevance_scores = rerank_scores(
+            chunks, user_input, model,
+            query_embedding=query_embedding,
+            chunk_embeddings=resolve_chunk_embeddings(chunks, chunk_embeddings, model)
+        )
+        embedded_data.extend(zip(chunks, relevance_scores.tolist()))
         
         # Sort by relevance score in descending order
         embedded_data.sort(key=lambda x: x[1], reverse=True)
@@ -1312,81 +773,42 @@ def chunking_and_retrieval(user_input, show_process=True, export_to_csv=False):
             
             # Force the exact number in the final output
             if len(embedded_data) < STANDARD_CHUNK_COUNT:
-                # Instead of duplicating chunks, get more with lower score threshold
-                try:
-                    # Only attempt to find more docs if we have expanded_query defined
-                    if 'expanded_query' in locals() and embedded_data:
-                        # Try to get more documents with a larger search
-                        more_needed = STANDARD_CHUNK_COUNT - len(embedded_data)
-                        logger.info(f"Attempting to find {more_needed} more unique documents with expanded search")
-                        
-                        # Get more documents with a much larger k value
-                        more_docs = retriever.get_relevant_documents(
-                            expanded_query, 
-                            search_kwargs={"k": 200}  # Use a larger value to find more diverse chunks
-                        )
-                        
-                        # Process only documents we haven't seen yet
-                        seen_content = {chunk for chunk, _ in embedded_data}
-                        additional_chunks = []
-                        
-                        for doc in more_docs:
-                            content = doc.page_content.strip()
-                            # Skip if we've already included this content
-                            if content in seen_content:
-                                continue
-                            
-                            # Calculate relevance score
-                            score = calculate_relevance_scores(content, user_input)
-                            additional_chunks.append((content, score))
-                            seen_content.add(content)
-                            
-                            # Stop when we have enough
-                            if len(embedded_data) + len(additional_chunks) >= STANDARD_CHUNK_COUNT:
-                                break
-                        
-                        # Add the new unique chunks
-                        embedded_data.extend(additional_chunks)
-                    
-                    # If we still don't have enough or don't have expanded_query, fall back to placeholders
-                    if len(embedded_data) < STANDARD_CHUNK_COUNT:
-                        remaining_needed = STANDARD_CHUNK_COUNT - len(embedded_data)
-                        logger.warning(f"Could not find enough unique chunks, need {remaining_needed} more")
-                        
-                        # Create placeholders with informative messages instead of duplicating
-                        for i in range(remaining_needed):
-                            if embedded_data:  # If we have some data
-                                placeholder = f"Additional context (lower relevance): This chunk has lower relevance to your query but may provide supplementary information."
-                            else:  # If we have no data
-                                placeholder = f"No relevant information found for: {user_input}"
-                            
-                            embedded_data.append((placeholder, 0.0))
+                # Every unique candidate of the over-fetch is already ranked, pad with placeholders
+                remaining_needed = STANDARD_CHUNK_COUNT - len(embedded_data)
+                logger.warning(f"Could not find enough unique chunks, need {remaining_needed} more")
+                
+                # Create placeholders with informative messages instead of duplicating
+                for i in range(remaining_needed):
+                    if embedded_data:  # If we have some data
+                        placeholder = f"Additional context (lower relevance): This chunk has lower relevance to your query but may provide supplementary information."
+                    else:  # If we have no data
+                        placeholder = f"No relevant information found for: {user_input}"
                     
-                except Exception as e:
-                    logger.error(f"Error finding additional chunks: {e}", exc_info=True)
-                    # If all else fails, use placeholders
-                    while len(embedded_data) < STANDARD_CHUNK_COUNT:
-                        if embedded_data:  # If we have some data
-                            placeholder = f"Additional context (lower relevance): This chunk has lower relevance to your query but may provide supplementary information."
-                        else:  # If we have no data
-                            placeholder = f"No relevant information found for: {user_input}"
-                        
-                        embedded_data.append((placeholder, 0.0))
+                    embedded_data.append((placeholder, 0.0))
             elif len(embedded_data) > STANDARD_CHUNK_COUNT:
                 # Trim to exact count
                 embedded_data = embedded_data[:STANDARD_CHUNK_COUNT]
                 logger.info("Trimmed excess embedded chunks to reach standard count")
         
+        emit_stage(RERANK, chunks=len(embedded_data))
+        
         # Store the total number of docs for display purposes
         total_initial_docs = total_retrieved
         
+        # The ranked context generation() answers from
+        context_documents = build_context_documents(embedded_data, chunk_metadata) if return_documents else None
+        
         if show_process and st.session_state.processing_new_question:
+            # Keep what the dev-mode view needs so reruns do not search or encode again
+            st.session_state.dev_mode_chunk_embeddings = chunk_embeddings
+            st.session_state.dev_mode_total_docs = total_initial_docs
+            
             # Display the embedding process only when processing a new question
-            display_embedding_process(embedded_data, user_input, query_embedding, total_initial_docs)
+            display_embedding_process(embedded_data, user_input, query_embedding, total_initial_docs, chunk_embeddings)
             
             # Export to CSV if requested
             if export_to_csv:
-                csv_path = export_retrieval_to_csv(user_input, query_embedding, embedded_data)
+                csv_path = export_retrieval_to_csv(user_input, query_embedding, embedded_data, chunk_embeddings=chunk_embeddings)
                 st.success(f"Retrieval data exported to CSV: {csv_path}")
                 
                 # Provide download button for the CSV
@@ -1398,16 +820,20 @@ def chunking_and_retrieval(user_input, show_process=True, export_to_csv=False):
                     file_name=os.path.basename(csv_path),
                     mime="text/csv"
                 )
+                if return_documents:
+                    return embedded_data, query_embedding, csv_path, context_documents
                 return embedded_data, query_embedding, csv_path
-            
+        
+        if return_documents:
+            return embedded_data, query_embedding, context_documents
         return embedded_data, query_embedding
     except Exception as e:
         if show_process:
             st.warning(f"An error occurred during retrieval: {e}")
         logger.error(f"Error in chunking_and_retrieval: {e}", exc_info=True)
-        return [], None
+        return ([], None, []) if return_documents else ([], None)
 
-def display_embedding_process(embedded_data, query=None, query_embedding=None, total_before_dedup=None):
+def display_embedding_process(embedded_data, query=None, query_embedding=None, total_before_dedup=None, chunk_embeddings=None):
     st.subheader("Embedding Process")
     
     # Generate a unique key for sliders in this function instance
@@ -1629,11 +1055,13 @@ def display_embedding_process(embedded_data, query=None, query_embedding=None, t
         synthetic_count = sum(1 for chunk, _ in cleaned_embedded_data 
                             if is_synthetic_chunk(chunk))
         
+        # Use the stored vectors of the retrieved chunks, encoding only chunks that have none
+        chunk_vectors = resolve_chunk_embeddings([chunk for chunk, _ in embedded_data], chunk_embeddings, get_encoder())
+        
         # Create data for the chunks table with full vectors
         chunks_data = []
         for i, (chunk, score) in enumerate(cleaned_embedded_data, 1):
-            # Generate vector for the chunk
-            chunk_embedding = model.encode(chunk).tolist()
+            chunk_embedding = chunk_vectors[i - 1].tolist()
             # Format the chunk as a paragraph by replacing newlines with spaces
             formatted_chunk = ' '.join(chunk.split())
             # Mark synthetic chunks
@@ -1883,56 +1311,6 @@ def format_dont_know_response(query):
     
     return response
 
-def detect_language(text):
-    """
-    Detect whether the text is in English or Indonesian.
-    
-    Args:
-        text (str): The text to analyze
-        
-    Returns:
-        str: 'en' for English, 'id' for Indonesian
-    """
-    text_lower = text.lower()
-    
-    # Common English words
-    english_words = [
-        "what", "how", "when", "where", "who", "why", 
-        "is", "are", "am", "was", "were", "be", "been", "being",
-        "have", "has", "had", "do", "does", "did", "can", "could",
-        "will", "would", "shall", "should", "may", "might", "must",
-        "the", "a", "an", "this", "that", "these", "those",
-        "and", "but", "or", "if", "because", "although", "unless",
-        "about", "above", "across", "after", "against", "along",
-        "please", "tell", "explain", "describe", "information"
-    ]
-    
-    # Common Indonesian words
-    indonesian_words = [
-        "apa", "bagaimana", "kapan", "dimana", "siapa", "mengapa",
-        "adalah", "merupakan", "menjadi", "ada", "sudah", "telah", "sedang",
-        "akan", "bisa", "dapat", "boleh", "harus", "wajib", "perlu",
-        "ini", "itu", "tersebut", "yang", "dan", "tetapi", "atau", "jika",
-        "karena", "meskipun", "kecuali", "tentang", "di", "ke", "dari",
-        "pada", "untuk", "dengan", "oleh", "dalam", "luar", "atas", "bawah",
-        "tolong", "mohon", "jelaskan", "ceritakan", "informasi", "berikan"
-    ]
-    
-    # Count occurrences of words from each language
-    english_count = sum(1 for word in english_words if f" {word} " in f" {text_lower} ")
-    indonesian_count = sum(1 for word in indonesian_words if f" {word} " in f" {text_lower} ")
-    
-    # Add weight for common Indonesian question patterns
-    if any(pattern in text_lower for pattern in ["apa itu", "siapa itu", "bagaimana cara", "kapan waktu", "dimana tempat"]):
-        indonesian_count += 2
-    
-    # Add weight for common English question patterns
-    if any(pattern in text_lower for pattern in ["what is", "who is", "how to", "when is", "where is"]):
-        english_count += 2
-    
-    # Return the detected language
-    return "en" if english_count > indonesian_count else "id"
-
 def format_response(answer, is_english=False):
     """Format the response to be more conversational and engaging"""
     # Remove any prefixes like "Berikut adalah", "Here is", etc.
@@ -2079,12 +1457,32 @@ Seluruh ujian dilakukan melalui sistem, dan tidak diperbolehkan adanya berkas ha
     
     return formatted_answer
 
-def generation(user_input, show_process=False):
+def generation(user_input, show_process=False, context_documents=None, on_token=None):
+    """
+    Generate the answer to a question.
+    
+    Args:
+        user_input (str): The user's question
+        show_process (bool): Show the developer-mode process view
+        context_documents (list, optional): Context already ranked by chunking_and_retrieval.
+            Standalone questions without it are retrieved here once; follow-up questions
+            without it let the chain retrieve with the condensed question.
+        on_token (callable, optional): Receives each answer token as the LLM streams it.
+            The returned answer is the post-processed text and replaces the streamed draft.
+    
+    Returns:
+        str: The formatted answer
+    """
     try:
+        # Intents and language of the question, analyzed once for this request
+        request = current_request(user_input)
+        intents = request.intents
+        language = request.language
+        is_english = request.is_english
+        
         # First, check if it's a simple greeting
-        if is_greeting(user_input.strip().lower()):
+        if intents.greeting:
             # Return ONLY the greeting response, nothing else
-            is_english = detect_language(user_input) == 'en'
             if is_english:
                 return "Hi there! 👋 I'm here to help you with information about Undiksha's Information Systems Program. What would you like to know?"
             else:
@@ -2094,18 +1492,33 @@ def generation(user_input, show_process=False):
         global rag_chain
         
         # Check if the user is expressing gratitude
-        if is_gratitude_expression(user_input):
+        if intents.gratitude:
             return get_gratitude_response()
         
         # Flag to indicate if this is a request for more details
-        is_detail_request = is_asking_for_details(user_input)
+        is_detail_request = intents.details
         
         # Check if this is a lecturer question
-        is_lecturer_query = is_lecturer_question(user_input)
+        is_lecturer_query = intents.lecturer
         
-        # Detect language
-        language = detect_language(user_input)
-        is_english = (language == 'en')
+        # Standalone questions (no earlier exchange to condense against) can be
+        # answered from the semantic answer cache; developer mode always generates
+        answer_cache = get_answer_cache(version_fn=get_index_version)
+        is_standalone = is_standalone_question()
+        use_answer_cache = is_standalone and not show_process
+        
+        if use_answer_cache:
+            try:
+                cached = answer_cache.lookup(user_input, language)
+            except Exception as e:
+                logger.warning(f"Answer cache lookup failed: {e}")
+                cached = None
+            
+            if cached:
+                # Keep the conversation memory in sync with what the user saw
+                if 'memory' in st.session_state:
+                    st.session_state.memory.save_context({"question": user_input}, {"answer": cached["answer"]})
+                return cached["answer"]
         
         # Ensure rag_chain is initialized
         try:
@@ -2120,14 +1533,6 @@ def generation(user_input, show_process=False):
         
         if show_process:
             st.subheader("2. Generation")
-            with st.spinner("Sedang menyusun jawaban terbaik untuk Anda sabar dulu yaah..." if not is_english else "Generating the best answer for you, please wait..."):
-                progress_bar = st.progress(0)
-                for i in range(100):
-                    time.sleep(0.01)
-                    progress_bar.progress(i + 1)
-        else:
-            with st.spinner("Generating response..."):
-                time.sleep(1)  # Minimal delay for user feedback
         
         try:
             # Convert chat history to the format expected by the RAG chain
@@ -2164,26 +1569,39 @@ def generation(user_input, show_process=False):
                     if "dosen" not in query_for_retrieval.lower():
                         query_for_retrieval = f"dosen koordinator program studi {query_for_retrieval}"
             
-            # Call the RAG chain with the formatted history and potentially modified query
-            response = rag_chain.invoke({
-                "question": query_for_retrieval,
-                "chat_history": formatted_history
-            })
+            # Run the single retrieval stage for standalone questions that were not retrieved yet
+            if context_documents is None and is_standalone:
+                _, _, context_documents = chunking_and_retrieval(user_input, show_process=False, return_documents=True)
+            
+            callbacks = [StageCallbackHandler()]
+            if on_token is not None:
+                callbacks.append(TokenCallbackHandler(on_token))
+            
+            # Call the RAG chain with the formatted history and potentially modified query,
+            # answering from the pre-ranked context instead of searching again
+            with injected_context(context_documents):
+                response = rag_chain.invoke(
+                    {
+                        "question": query_for_retrieval,
+                        "chat_history": formatted_history
+                    },
+                    config={"callbacks": callbacks}
+                )
             
             if isinstance(response, dict) and "answer" in response:
                 answer = response["answer"]
                 
                 # Check if this is a procedural question to preserve numbered lists
-                is_procedure = is_procedure_question(user_input)
+                is_procedure = intents.procedure
                 
                 # Check if this is an internship document question to format with specific links
-                is_internship_doc_question = is_internship_document_question(user_input)
+                is_internship_doc_question = intents.internship_document
                 
                 # Check if this is a KKN mechanism question
-                is_kkn_mechanism_question = is_kkn_question(user_input)
+                is_kkn_mechanism_question = intents.kkn
                 
                 # Check if this is a thesis exam question
-                is_thesis_exam_question = is_thesis_examiner_question(user_input)
+                is_thesis_exam_question = intents.thesis_examiner
                 
                 # Format the response to be more conversational
                 answer = format_response(answer, is_english=is_english)
@@ -2255,12 +1673,16 @@ def generation(user_input, show_process=False):
                 
                 # If it's a general information question but the answer is too short, enhance it
                 elif is_general_info_question and is_short_answer:
-                    # Get more context for this type of question
-                    embedded_data, _ = chunking_and_retrieval(user_input, show_process=False)
+                    # Reuse the context that was already retrieved for this question
+                    if context_documents:
+                        top_chunks = [doc.page_content for doc in context_documents[:3]]
+                    else:
+                        embedded_data, _ = chunking_and_retrieval(user_input, show_process=False)
+                        top_chunks = [chunk for chunk, _ in embedded_data[:3]]
                     
                     # Extract the top chunks
                     additional_context = ""
-                    for chunk, _ in embedded_data[:3]:  # Use top 3 chunks
+                    for chunk in top_chunks:  # Use top 3 chunks
                         additional_context += chunk + " "
                     
                     # Enhance the answer with more information
@@ -2299,7 +1721,7 @@ def generation(user_input, show_process=False):
                             answer += "\n\nThe Information Systems Program at Undiksha offers a comprehensive curriculum covering both foundational and advanced courses in information systems. The program has several concentrations including Information Systems Management, Business Intelligence and Engineering, and Cyber Security. If you need more specific information about certain aspects of this program, please ask."
                 
                 # Check if this is a procedure question but the answer is too short
-                if is_procedure_question(user_input) and len(answer.split()) < 50 and not is_detail_request:
+                if intents.procedure and len(answer.split()) < 50 and not is_detail_request:
                     # If the answer is too short for a procedure question, ask for more details
                     logger.warning(f"Answer too short for procedure question: {answer}")
                     if not is_english:
@@ -2314,6 +1736,15 @@ def generation(user_input, show_process=False):
                         answer += "\n\nSaya harap penjelasan ini membantu. Jika Anda memerlukan informasi lebih spesifik, silakan tanyakan bagian tertentu yang ingin Anda ketahui lebih dalam."
                     else:
                         answer += "\n\nI hope this explanation helps. If you need more specific information, please ask about the particular aspect you'd like to know more about."
+                
+                # Cache the final answer, unless it is a short "I don't know"
+                is_dont_know_answer = any(phrase in answer.lower() for phrase in dont_know_phrases) and len(answer.split()) < 50
+                if use_answer_cache and not is_dont_know_answer:
+                    try:
+                        sources = [doc.metadata.get("source", "unknown") for doc in response.get("source_documents", [])]
+                        answer_cache.store(user_input, language, answer, sources)
+                    except Exception as e:
+                        logger.warning(f"Could not store answer in cache: {e}")
             else:
                 logger.warning(f"Unexpected response format: {response}")
                 answer = "Maaf, saya tidak dapat memproses pertanyaan Anda saat ini." if not is_english else "Sorry, I cannot process your question at this time."
@@ -2333,7 +1764,7 @@ def generation(user_input, show_process=False):
     except Exception as e:
         # Handle any exceptions that might occur during processing
         logger.error(f"Unhandled error in generation function: {e}", exc_info=True)
-        is_english = detect_language(user_input) == 'en'
+        is_english = current_request(user_input).is_english
         return "I'm sorry, I encountered an error while processing your request. Please try again." if is_english else "Maaf, terjadi kesalahan saat memproses permintaan Anda. Silakan coba lagi."
 
 def check_and_refresh_rss_feed():
@@ -2419,6 +1850,12 @@ def main():
     if "dev_mode_csv_path" not in st.session_state:
         st.session_state.dev_mode_csv_path = None
     
+    if "dev_mode_chunk_embeddings" not in st.session_state:
+        st.session_state.dev_mode_chunk_embeddings = None
+    
+    if "dev_mode_total_docs" not in st.session_state:
+        st.session_state.dev_mode_total_docs = None
+    
     if "dev_mode_latest_answer" not in st.session_state:
         st.session_state.dev_mode_latest_answer = None
     
@@ -2440,6 +1877,9 @@ def main():
         # Mode selection
         mode = st.radio("Mode", ["User Mode", "Developer Mode"])
         
+        # Only the authenticated developer sidebar offers the CSV export
+        export_to_csv = False
+        
         # Developer mode authentication
         if mode == "Developer Mode":
             if not st.session_state.authenticated:
@@ -2510,23 +1950,17 @@ def main():
                         
         # Display the embedding process info (if available)
         if st.session_state.dev_mode_embedded_data is not None and not st.session_state.processing_new_question:
-            # Get the relevant documents using the proper search_kwargs
-            try:
-                relevant_docs = retriever.get_relevant_documents(
-                    st.session_state.dev_mode_query, 
-                    search_kwargs={"k": 20}
-                )
-                total_docs = len(relevant_docs)
-            except Exception as e:
-                logger.error(f"Error retrieving relevant documents: {e}", exc_info=True)
-                st.warning(f"Could not retrieve relevant documents: {e}")
+            # Reuse the count from the original retrieval instead of searching again
+            total_docs = st.session_state.dev_mode_total_docs
+            if total_docs is None:
                 total_docs = len(st.session_state.dev_mode_embedded_data)
             
             display_embedding_process(
                 st.session_state.dev_mode_embedded_data,
                 st.session_state.dev_mode_query,
                 st.session_state.dev_mode_query_embedding,
-                total_docs
+                total_docs,
+                st.session_state.dev_mode_chunk_embeddings
             )
             
             # If we exported to CSV, show download button
@@ -2574,6 +2008,18 @@ def main():
             with st.chat_message("assistant"):
                 message_placeholder = st.empty()
                 message_placeholder.markdown("⏳ Sedang memproses...")
+                stage_progress = st.progress(0)
+        
+        # Analyze the question once; every stage of this request reads the result
+        request = RequestContext(user_input)
+        
+        # Advance the progress bar as the pipeline stages actually finish
+        stage_language = request.language
+        def render_stage(event):
+            stage_progress.progress(
+                event["fraction"],
+                text=f"{stage_label(event['stage'], stage_language)} ({event['elapsed']:.1f}s)"
+            )
         
         # Set flag that we're processing a new question
         st.session_state.processing_new_question = True
@@ -2584,38 +2030,18 @@ def main():
             st.session_state.dev_mode_query_embedding = None
             st.session_state.dev_mode_query = None
             st.session_state.dev_mode_csv_path = None
-            
-        # Process the query
-        if show_process:
-            try:
-                result = chunking_and_retrieval(user_input, show_process, export_to_csv)
-                
-                # Handle different return types
-                if export_to_csv and len(result) == 3:
-                    embedded_data, query_embedding, csv_path = result
-                    st.session_state.dev_mode_csv_path = csv_path
-                else:
-                    embedded_data, query_embedding = result
-                
-                # Only store in session state if valid data is returned
-                if embedded_data and query_embedding is not None:
-                    st.session_state.dev_mode_embedded_data = embedded_data
-                    st.session_state.dev_mode_query_embedding = query_embedding
-                    st.session_state.dev_mode_query = user_input
-                    logger.info(f"Successfully stored {len(embedded_data)} embedded chunks for query: {user_input[:50]}...")
-                else:
-                    logger.warning("No valid embedding data returned from chunking_and_retrieval")
-            except Exception as e:
-                logger.error(f"Error processing embeddings: {e}", exc_info=True)
-                st.error(f"An error occurred during retrieval: {e}")
-        else:
-            # In user mode, we don't need to store the results
-            chunking_and_retrieval(user_input, show_process)
+            st.session_state.dev_mode_chunk_embeddings = None
+            st.session_state.dev_mode_total_docs = None
+        
+        # Stream the answer into the assistant message as it is generated
+        answer_writer = PlaceholderWriter(message_placeholder)
         
-        # Generate response
-        answer = generation(user_input, show_process)
+        # Process the query
+        with use_request(request), stage_listener(render_stage):
+            answer = answer_question(user_input, show_process, export_to_csv, on_token=answer_writer.write)
+        stage_progress.empty()
         
-        # Update the placeholder with the actual response
+        # Replace the streamed draft with the post-processed response
         message_placeholder.markdown(answer)
         
         # Store the latest answer
@@ -2630,229 +2056,51 @@ def main():
         # Rerun to update the UI
         st.rerun()
 
-def expand_query(query):
+def answer_question(user_input, show_process, export_to_csv, on_token=None):
     """
-    Expand the query with related terms to improve retrieval.
+    Run retrieval (in developer mode) and generation for a new question.
     
     Args:
-        query (str): The original query
-        
+        user_input (str): The user's question
+        show_process (bool): Developer mode, shows and stores the retrieval process
+        export_to_csv (bool): Export the retrieval results to CSV
+        on_token (callable, optional): Receives answer tokens while they are streamed
+    
     Returns:
-        str: The expanded query with additional related terms
+        str: The answer
     """
-    # Dictionary of common terms and their related terms/synonyms
-    expansion_dict = {
-        # Indonesian terms
-        "dosen": ["pengajar", "staf pengajar", "pendidik", "tenaga pengajar", "guru besar", "lektor"],
-        "kurikulum": ["mata kuliah", "pelajaran", "silabus", "materi", "bahan ajar", "rps"],
-        "skripsi": ["tugas akhir", "penelitian akhir", "karya ilmiah", "tesis", "disertasi"],
-        "mahasiswa": ["pelajar", "siswa", "peserta didik", "maba", "anak didik"],
-        "koorprodi": ["koordinator program studi", "ketua program studi", "kaprodi", "ketua jurusan", "pimpinan program"],
-        "pendaftaran": ["registrasi", "daftar", "enroll", "penerimaan", "admisi"],
-        "biaya": ["pembayaran", "harga", "tarif", "keuangan", "uang kuliah", "spp"],
-        "beasiswa": ["bantuan biaya", "tunjangan pendidikan", "bantuan pendidikan", "keringanan biaya"],
-        "ujian": ["tes", "evaluasi", "penilaian", "sidang", "asesmen"],
-        "kuliah": ["perkuliahan", "kelas", "pembelajaran", "studi", "belajar"],
-        "sistem": ["metode", "prosedur", "mekanisme", "alur", "tata cara"],
-        "informasi": ["data", "keterangan", "penjelasan", "detail", "rincian"],
-        "undiksha": ["universitas pendidikan ganesha", "universitas", "kampus", "perguruan tinggi"],
-        
-        # English terms
-        "lecturer": ["teacher", "professor", "instructor", "faculty member", "academic staff"],
-        "curriculum": ["courses", "subjects", "syllabus", "program", "study plan"],
-        "thesis": ["final project", "final paper", "research paper", "capstone", "dissertation"],
-        "student": ["learner", "pupil", "undergraduate", "graduate", "scholar"],
-        "coordinator": ["head", "chair", "director", "lead", "manager"],
-        "registration": ["enrollment", "signup", "admission", "entry", "application"],
-        "fee": ["cost", "payment", "tuition", "price", "charge", "expense"],
-        "scholarship": ["financial aid", "grant", "fellowship", "funding", "stipend"],
-        "exam": ["test", "assessment", "evaluation", "quiz", "examination"],
-        "study": ["learn", "education", "training", "course", "class"],
-        "system": ["method", "procedure", "process", "structure", "framework"],
-        "information": ["data", "details", "facts", "knowledge", "particulars"],
-        "procedure": ["process", "method", "approach", "technique", "steps"],
-
-        # Additional academic procedure terms
-        "prosedur": ["langkah", "tahapan", "mekanisme", "alur", "cara", "proses", "protokol"],
-        "tahapan": ["langkah", "step", "proses", "alur", "urutan"],
-        "mekanisme": ["prosedur", "sistem", "metode", "alur", "tata cara", "proses"],
-        "cuti": ["izin", "jeda", "istirahat", "rehat", "penundaan", "pemberhentian sementara"],
-        "cuti akademik": ["penundaan kuliah", "izin tidak kuliah", "istirahat kuliah", "jeda studi"],
-        "pembimbing akademik": ["dosen PA", "dosen wali", "pembimbing studi", "penasihat akademik"],
-        "penguji": ["dosen penilai", "penilai", "juri", "dewan penguji", "tim penguji"],
-        "proposal": ["usulan", "rencana penelitian", "pra-skripsi", "rancangan penelitian"],
-        "ujian proposal": ["sidang proposal", "seminar proposal", "presentasi proposal", "ujian pendahuluan"],
-        "ujian skripsi": ["sidang skripsi", "sidang akhir", "sidang tugas akhir", "ujian akhir", "sidang sarjana"],
-        "dewan penguji": ["komisi penguji", "tim penguji", "penilai skripsi", "majelis penguji"], 
-        "komposisi": ["susunan", "struktur", "formasi", "anggota", "keanggotaan"],
-        "magang": ["internship", "praktik kerja", "praktik lapangan", "kerja praktek", "PKL", "PPL"],
-        "dokumen": ["berkas", "file", "arsip", "surat", "formulir"],
-        "pengajuan": ["permohonan", "aplikasi", "pendaftaran", "permintaan", "pengumpulan"],
-        "persyaratan": ["syarat", "ketentuan", "kriteria", "prasyarat", "kualifikasi"],
-        
-        # Enhanced internship-related terms
-        "magang": ["internship", "praktik kerja", "praktik lapangan", "kerja praktek", "PKL", "PPL", "MBKM", "Merdeka Belajar", "praktek industri"],
-        "dokumen magang": ["berkas magang", "file magang", "formulir magang", "form magang", "template magang", "persyaratan magang", "pendukung magang"],
-        "mou": ["memorandum of understanding", "perjanjian kerjasama", "kesepakatan kerjasama", "kerjasama industri"],
-        "jurnal harian": ["log harian", "diary magang", "catatan harian", "daily log", "daily journal"],
-        "proposal magang": ["rencana magang", "usulan magang", "pengajuan magang", "rancangan magang"],
-        "surat permohonan": ["surat pengajuan", "surat izin", "surat keterangan", "surat rekomendasi"],
-        
-        # KKN-related terms
-        "kkn": ["kuliah kerja nyata", "kuliah kerja lapangan", "pengabdian masyarakat", "community service", "program kkn"],
-        "mekanisme kkn": ["prosedur kkn", "alur kkn", "tahapan kkn", "pelaksanaan kkn", "jadwal kkn"],
-        "kurikulum 2020": ["k2020", "kurikulum lama", "kurikulum sebelumnya"],
-        "kurikulum 2024": ["k2024", "kurikulum baru", "kurikulum terbaru"],
-        "semester": ["periode", "masa studi", "tahap perkuliahan", "term"],
-        
-        # Thesis examination related terms
-        "ujian proposal": ["sidang proposal", "seminar proposal", "presentasi proposal", "ujian pendahuluan", "defense proposal"],
-        "ujian skripsi": ["sidang skripsi", "sidang tugas akhir", "ujian akhir", "sidang sarjana", "thesis defense"],
-        "dewan penguji": ["komisi penguji", "tim penguji", "komite penguji", "majelis penguji", "penguji skripsi"],
-        "komposisi penguji": ["susunan penguji", "formasi penguji", "anggota penguji", "struktur dewan penguji", "persyaratan komposisi"],
-        "pembimbing": ["supervisor", "dosen pembimbing", "promotor", "pembimbing skripsi", "pembimbing tugas akhir"],
-        "mekanisme ujian": ["prosedur ujian", "tata cara ujian", "proses ujian", "alur ujian", "tatacara ujian"],
-        "persyaratan ujian": ["syarat ujian", "ketentuan ujian", "prasyarat ujian", "kualifikasi ujian", "kriteria ujian"],
-        "moderator": ["pemandu acara", "pemimpin sidang", "fasilitator", "penengah", "koordinator sidang"],
-        "sistem digital": ["sistem online", "platform digital", "sistem elektronik", "hardcopy", "dokumen digital"],
-        
-        # Compound terms with explicit expansions
-        "cara mengurus": ["prosedur pengurusan", "mekanisme mengurus", "langkah mengurus", "proses mengurus"],
-        "surat permohonan": ["dokumen permohonan", "berkas permohonan", "formulir permohonan", "surat pengajuan"],
-        "peran pembimbing": ["tugas pembimbing", "fungsi pembimbing", "tanggung jawab pembimbing", "kewajiban pembimbing"],
-        "dokumen pendukung": ["berkas pendukung", "file pendukung", "persyaratan pendukung", "kelengkapan dokumen"],
-        "mengajukan magang": ["mendaftar magang", "apply magang", "daftar magang", "pengajuan magang"]
-    }
-    
-    # Special handling for procedural questions
-    procedural_query_markers = [
-        "bagaimana", "cara", "prosedur", "mekanisme", "langkah", "tahapan", "how", "steps", "procedure"
-    ]
-    
-    # Special handling for internship document questions
-    internship_document_markers = [
-        "magang", "internship", "dokumen magang", "berkas magang", "persyaratan magang",
-        "pendukung magang", "file magang", "template magang", "form magang"
-    ]
+    # Context ranked once and handed to generation (None lets generation decide)
+    context_documents = None
     
-    # Special handling for KKN questions
-    kkn_markers = [
-        "kkn", "kuliah kerja nyata", "kuliah kerja lapangan", "mekanisme kkn", "prosedur kkn"
-    ]
-    
-    # Special handling for thesis exam questions
-    thesis_exam_markers = [
-        "ujian proposal", "ujian skripsi", "sidang proposal", "sidang skripsi", 
-        "dewan penguji", "komposisi penguji", "mekanisme ujian", "persyaratan ujian"
-    ]
+    if show_process:
+        try:
+            result = chunking_and_retrieval(user_input, show_process, export_to_csv, return_documents=True)
+            
+            # Handle different return types
+            if export_to_csv and len(result) == 4:
+                embedded_data, query_embedding, csv_path, retrieved_documents = result
+                st.session_state.dev_mode_csv_path = csv_path
+            else:
+                embedded_data, query_embedding, retrieved_documents = result
+            
+            # Follow-up questions are retrieved by the chain with the condensed question
+            if is_standalone_question():
+                context_documents = retrieved_documents
+            
+            # Only store in session state if valid data is returned
+            if embedded_data and query_embedding is not None:
+                st.session_state.dev_mode_embedded_data = embedded_data
+                st.session_state.dev_mode_query_embedding = query_embedding
+                st.session_state.dev_mode_query = user_input
+                logger.info(f"Successfully stored {len(embedded_data)} embedded chunks for query: {user_input[:50]}...")
+            else:
+                logger.warning("No valid embedding data returned from chunking_and_retrieval")
+        except Exception as e:
+            logger.error(f"Error processing embeddings: {e}", exc_info=True)
+            st.error(f"An error occurred during retrieval: {e}")
     
-    # Check if this is a procedural question
-    is_procedural = any(marker in query.lower() for marker in procedural_query_markers)
-    
-    # Check if this is an internship document question
-    is_internship_doc = any(marker in query.lower() for marker in internship_document_markers)
-    
-    # Check if this is a KKN question
-    is_kkn_query = any(marker in query.lower() for marker in kkn_markers)
-    
-    # Check if this is a thesis exam question
-    is_thesis_exam = any(marker in query.lower() for marker in thesis_exam_markers)
-    
-    # Split the query into words
-    words = query.lower().split()
-    
-    # Initialize expanded query with original query
-    expanded = query
-    
-    # First prioritize compound terms of 2-3 words for procedural questions
-    if is_procedural:
-        # Look for pairs of words that might be compound terms
-        for i in range(len(words) - 1):
-            two_word = f"{words[i]} {words[i+1]}"
-            if two_word in expansion_dict:
-                # For procedural questions, add more related terms
-                related_terms = expansion_dict[two_word]
-                if related_terms:
-                    # Add up to 4 related terms for procedural questions
-                    random.shuffle(related_terms)
-                    for term in related_terms[:4]:
-                        if term not in expanded.lower():
-                            expanded += f" {term}"
-    
-    # For internship document questions, add specific terms
-    if is_internship_doc:
-        # Add specific internship document terms to improve retrieval
-        internship_doc_terms = [
-            "dokumen magang", "magang MBKM", "template magang", "proposal magang", 
-            "jurnal harian magang", "MoU magang", "persyaratan magang", "surat permohonan magang",
-            "daftar MoU", "perjanjian kerjasama", "form pengajuan", "website prodi"
-        ]
-        
-        # Add internship document terms not already in the query
-        for term in internship_doc_terms:
-            if term not in expanded.lower():
-                expanded += f" {term}"
-                
-    # For KKN questions, add specific terms
-    if is_kkn_query:
-        # Add specific KKN-related terms to improve retrieval
-        kkn_terms = [
-            "kkn prodi sistem informasi", "kurikulum 2020", "kurikulum 2024", 
-            "semester 4", "semester 5", "semester 7", "pelaksanaan kkn",
-            "mekanisme kkn", "jadwal kkn", "waktu kkn", "tahap kkn"
-        ]
-        
-        # Add KKN terms not already in the query
-        for term in kkn_terms:
-            if term not in expanded.lower():
-                expanded += f" {term}"
-                
-    # For thesis exam questions, add specific terms
-    if is_thesis_exam:
-        # Add specific thesis exam terms to improve retrieval
-        thesis_terms = [
-            "ujian proposal skripsi", "ujian skripsi", "dewan penguji", 
-            "komposisi dewan penguji", "persyaratan penguji", "1 dosen pembimbing",
-            "2 dosen penguji", "10 mahasiswa", "moderator", "2 dosen pembimbing",
-            "1 dosen penguji", "sistem digital", "dokumen digital", "hardcopy"
-        ]
-        
-        # Add thesis exam terms not already in the query
-        for term in thesis_terms:
-            if term not in expanded.lower():
-                expanded += f" {term}"
-    
-    # Add related terms for each word in the query
-    added_terms = set()
-    for word in words:
-        if word in expansion_dict:
-            # Add up to 3 random related terms for regular words
-            # For procedural questions, prioritize process-related terms
-            related_terms = expansion_dict[word]
-            if related_terms:
-                # Shuffle to get random terms each time
-                random.shuffle(related_terms)
-                # Add up to 3 terms that haven't been added yet
-                max_terms = 4 if is_procedural else 3
-                for term in related_terms[:max_terms]:
-                    if term not in expanded.lower() and term not in added_terms:
-                        expanded += f" {term}"
-                        added_terms.add(term)
-    
-    # Also look for compound terms (2-3 word phrases) for non-procedural questions
-    if not is_procedural:
-        for i in range(len(words) - 1):
-            two_word = f"{words[i]} {words[i+1]}"
-            if two_word in expansion_dict:
-                related_terms = expansion_dict[two_word]
-                if related_terms:
-                    random.shuffle(related_terms)
-                    for term in related_terms[:2]:
-                        if term not in expanded.lower() and term not in added_terms:
-                            expanded += f" {term}"
-                            added_terms.add(term)
-    
-    return expanded
+    # Generate response (in user mode this runs the only retrieval for the question)
+    return generation(user_input, show_process, context_documents, on_token=on_token)
 
 def format_internship_document_response(answer):
     """
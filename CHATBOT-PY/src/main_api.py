@@ -40,6 +40,12 @@ app.include_router(api_router, prefix="/api")
 # Initialize scheduler when the API starts
 scheduler = init_scheduler()
 
+@app.on_event("startup")
+def warm_up_retriever():
+    # Open the vector store and load the embedding model before the first request
+    from src.retriever import warm_up
+    warm_up()
+
 # Shut down scheduler gracefully when the application stops
 atexit.register(lambda: scheduler.shutdown())
 
@@ -0,0 +1,123 @@
+"""
+Vectorized maximal marginal relevance.
+
+Selects the same documents as LangChain's maximal_marginal_relevance, but
+computes the candidate-to-candidate similarity matrix once as one matrix
+product and keeps, per candidate, its highest similarity to anything
+selected so far, so each greedy step is a single vectorized update. A
+selector can be asked again for a larger k (it continues where it stopped),
+extended with more candidates (only the new rows and columns of the
+similarity matrix are computed), or restricted to its fetch_k candidates
+most similar to the query, so a pool fetched for a larger fetch_k gives the
+same selection as a fresh fetch of fetch_k candidates.
+"""
+
+import numpy as np
+
+
+def _normalize(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class MMRSelector:
+    """
+    Greedy MMR over a growing candidate set.
+
+    Args:
+        query_embedding (array-like): Query vector
+        candidate_embeddings (array-like): Candidate vectors, one row per candidate
+    """
+
+    def __init__(self, query_embedding, candidate_embeddings=None):
+        self._query = _normalize(query_embedding)[0]
+        dim = self._query.shape[0]
+        self._candidates = np.zeros((0, dim), dtype=np.float32)
+        self._query_similarity = np.zeros(0, dtype=np.float32)
+        self._pairwise = np.zeros((0, 0), dtype=np.float32)
+        self._lambda_mult = None
+        self._fetch_k = None
+        self._excluded = None
+        self._selected = []
+        self._max_similarity = np.zeros(0, dtype=np.float32)
+        if candidate_embeddings is not None and len(candidate_embeddings):
+            self.extend(candidate_embeddings)
+
+    def __len__(self):
+        return len(self._query_similarity)
+
+    def extend(self, candidate_embeddings):
+        """
+        Add candidates; only their similarities to the existing and to each other are computed.
+
+        Any selection made so far is discarded, because a new candidate may
+        have been picked earlier.
+        """
+        new = _normalize(candidate_embeddings)
+        if not len(new):
+            return
+        cross = self._candidates @ new.T
+        self._pairwise = np.block([
+            [self._pairwise, cross],
+            [cross.T, new @ new.T],
+        ])
+        self._candidates = np.vstack([self._candidates, new])
+        self._query_similarity = np.concatenate([self._query_similarity, new @ self._query])
+        self._fetch_k = None
+        self._reset()
+
+    def _reset(self):
+        self._selected = []
+        self._max_similarity = np.full(len(self), -np.inf, dtype=np.float32)
+        # Candidates outside the fetch_k most similar to the query take no part
+        self._excluded = None
+        if self._fetch_k is not None and self._fetch_k < len(self):
+            self._excluded = np.ones(len(self), dtype=bool)
+            self._excluded[np.argsort(-self._query_similarity, kind="stable")[:self._fetch_k]] = False
+
+    def select(self, k, lambda_mult=0.5, fetch_k=None):
+        """
+        Indices of the first k candidates picked by MMR.
+
+        Asking again with the same lambda_mult and fetch_k and a larger k
+        continues the previous selection instead of starting over.
+
+        Args:
+            k (int): Number of candidates to select
+            lambda_mult (float): Balance between relevance (1) and diversity (0)
+            fetch_k (int, optional): Only select among the fetch_k candidates most
+                similar to the query; defaults to all candidates
+
+        Returns:
+            list: Candidate indices in selection order
+        """
+        fetch_k = len(self) if fetch_k is None else min(fetch_k, len(self))
+        if lambda_mult != self._lambda_mult or fetch_k != self._fetch_k:
+            self._lambda_mult = lambda_mult
+            self._fetch_k = fetch_k
+            self._reset()
+
+        k = min(k, fetch_k)
+        while len(self._selected) < k:
+            if not self._selected:
+                scores = self._query_similarity.copy()
+            else:
+                scores = lambda_mult * self._query_similarity - (1 - lambda_mult) * self._max_similarity
+                scores[self._selected] = -np.inf
+            if self._excluded is not None:
+                scores[self._excluded] = -np.inf
+            best = int(np.argmax(scores))
+            self._selected.append(best)
+            np.maximum(self._max_similarity, self._pairwise[best], out=self._max_similarity)
+        return self._selected[:k]
+
+
+def maximal_marginal_relevance(query_embedding, candidate_embeddings, k=4, lambda_mult=0.5):
+    """Drop-in replacement for LangChain's maximal_marginal_relevance."""
+    if min(k, len(candidate_embeddings)) <= 0:
+        return []
+    return MMRSelector(query_embedding, candidate_embeddings).select(k, lambda_mult)
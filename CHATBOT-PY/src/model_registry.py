@@ -0,0 +1,194 @@
+"""
+Process-wide registry of embedding models.
+
+Every module that needs all-MiniLM-L6-v2 (the retriever, the Streamlit app,
+RSS ingestion and the document splitter) gets it from here, so the weights
+are loaded once per process, lazily, on first use.
+"""
+
+import os
+import logging
+import threading
+
+try:
+    from langchain_core.embeddings import Embeddings
+except ImportError:
+    # Fall back to a plain base class when langchain is not installed
+    Embeddings = object
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Model used for all chunk and query embeddings (384 dimensions)
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+# Set EMBEDDING_CACHE_ENABLED=0 to always run the encoder
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "1") != "0"
+
+_lock = threading.RLock()
+_sentence_transformers = {}
+_encoders = {}
+_embeddings = {}
+
+
+def get_sentence_transformer(model_name=DEFAULT_EMBEDDING_MODEL):
+    """
+    Return the shared SentenceTransformer for a model, loading it on first use.
+
+    Args:
+        model_name (str): Name of the sentence-transformers model
+
+    Returns:
+        SentenceTransformer: The process-wide instance for this model
+    """
+    model = _sentence_transformers.get(model_name)
+    if model is not None:
+        return model
+
+    with _lock:
+        # Another thread may have loaded it while we were waiting
+        model = _sentence_transformers.get(model_name)
+        if model is None:
+            from sentence_transformers import SentenceTransformer
+            logger.info(f"Loading embedding model {model_name}")
+            model = SentenceTransformer(model_name)
+            _sentence_transformers[model_name] = model
+    return model
+
+
+def get_encoder(model_name=DEFAULT_EMBEDDING_MODEL):
+    """
+    Return the shared cached encoder for a model.
+
+    The encoder has the same encode() call as SentenceTransformer but serves
+    repeated texts from the persistent embedding cache.
+
+    Args:
+        model_name (str): Name of the sentence-transformers model
+
+    Returns:
+        CachedEncoder: The process-wide encoder for this model
+    """
+    encoder = _encoders.get(model_name)
+    if encoder is not None:
+        return encoder
+
+    with _lock:
+        encoder = _encoders.get(model_name)
+        if encoder is None:
+            encoder = CachedEncoder(model_name)
+            _encoders[model_name] = encoder
+    return encoder
+
+
+def get_embeddings(model_name=DEFAULT_EMBEDDING_MODEL):
+    """
+    Return a LangChain embeddings object backed by the shared SentenceTransformer.
+
+    Args:
+        model_name (str): Name of the sentence-transformers model
+
+    Returns:
+        SharedSentenceTransformerEmbeddings: The process-wide wrapper for this model
+    """
+    embeddings = _embeddings.get(model_name)
+    if embeddings is not None:
+        return embeddings
+
+    with _lock:
+        embeddings = _embeddings.get(model_name)
+        if embeddings is None:
+            embeddings = SharedSentenceTransformerEmbeddings(model_name)
+            _embeddings[model_name] = embeddings
+    return embeddings
+
+
+class CachedEncoder:
+    """
+    SentenceTransformer.encode() front-end backed by the embedding cache.
+
+    The cache is opened on first use; if it cannot be opened the encoder
+    falls back to plain model.encode() calls.
+    """
+
+    def __init__(self, model_name=DEFAULT_EMBEDDING_MODEL):
+        self.model_name = model_name
+        self._cache = None
+        self._cache_ready = False
+
+    @property
+    def model(self):
+        return get_sentence_transformer(self.model_name)
+
+    @property
+    def cache(self):
+        if not self._cache_ready:
+            with _lock:
+                if not self._cache_ready:
+                    if EMBEDDING_CACHE_ENABLED:
+                        try:
+                            from src.embedding_cache import EmbeddingCache
+                        except ImportError:
+                            from embedding_cache import EmbeddingCache
+                        try:
+                            dim = self.model.get_sentence_embedding_dimension()
+                            self._cache = EmbeddingCache(self.model_name, dim)
+                        except Exception as e:
+                            logger.warning(f"Embedding cache unavailable, encoding without it: {e}")
+                            self._cache = None
+                    self._cache_ready = True
+        return self._cache
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        """
+        Encode one text or a list of texts.
+
+        The cache only holds vectors of the default encode() options, so
+        calls with extra options (e.g. normalize_embeddings=True) go straight
+        to the model.
+
+        Args:
+            sentences (str or list): Text(s) to encode
+            batch_size (int): Batch size for the texts that are not cached
+            **kwargs: Extra SentenceTransformer.encode() options
+
+        Returns:
+            np.ndarray: A vector for a single text, otherwise a matrix with one row per text
+        """
+        try:
+            from src.embedding_cache import cached_encode
+        except ImportError:
+            from embedding_cache import cached_encode
+
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        vectors = cached_encode(
+            None if kwargs else self.cache,
+            texts,
+            lambda missing: self.model.encode(missing, batch_size=batch_size, **kwargs)
+        )
+        return vectors[0] if single else vectors
+
+
+class SharedSentenceTransformerEmbeddings(Embeddings):
+    """
+    Drop-in replacement for HuggingFaceEmbeddings that uses the shared model.
+
+    Encodes the same way HuggingFaceEmbeddings does (newlines replaced with
+    spaces), so vectors match the ones already stored in Chroma. Repeated
+    texts are served from the embedding cache.
+    """
+
+    def __init__(self, model_name=DEFAULT_EMBEDDING_MODEL):
+        self.model_name = model_name
+
+    @property
+    def client(self):
+        return get_encoder(self.model_name)
+
+    def embed_documents(self, texts):
+        texts = [text.replace("\n", " ") for text in texts]
+        return self.client.encode(texts).tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
@@ -0,0 +1,59 @@
+"""
+Sub-queries for multi-query retrieval.
+
+Instead of appending every intent's boilerplate terms and every synonym to
+one long query, which drags its embedding away from the question, the
+question is searched together with a few short focused sub-queries: one
+per detected intent and a few built from the weighted query expansions.
+The sub-queries are embedded in one batch and searched together (see
+retriever.get_multi_query_documents_with_embeddings), and their rankings
+are fused with reciprocal-rank fusion, each weighted by its sub-query.
+"""
+
+import os
+
+# Set MULTI_QUERY_RETRIEVAL=1 to search focused sub-queries instead of one expanded query
+MULTI_QUERY_ENABLED = os.getenv("MULTI_QUERY_RETRIEVAL", "0") == "1"
+# Upper bound on searched queries, the question included
+MAX_SUB_QUERIES = int(os.getenv("MULTI_QUERY_MAX", "5"))
+# Expansion terms combined into one sub-query
+TERMS_PER_SUB_QUERY = 3
+
+# RRF weight of an intent's focused sub-query; the question itself has weight 1
+INTENT_QUERY_WEIGHT = 0.7
+
+# Focused sub-query per intent flag (see src.intents.Intents)
+INTENT_FOCUS = {
+    "thesis_examiner": "ujian proposal skripsi komposisi dewan penguji pembimbing sistem digital hardcopy dokumen",
+    "internship_document": "dokumen magang form template proposal MoU perjanjian kerja sama surat permohonan jurnal harian website prodi sistem informasi",
+    "kkn": "kurikulum 2020 kurikulum 2024 semester pelaksanaan jadwal KKN kuliah kerja nyata prodi sistem informasi",
+    "document_access": "dokumen kurikulum tautan drive",
+}
+
+
+def build_sub_queries(query, intents, expansions=(), max_queries=MAX_SUB_QUERIES):
+    """
+    Build the queries to search for a question.
+
+    Args:
+        query (str): The question
+        intents (Intents): Its classification (see src.intents.classify_intents)
+        expansions (iterable): Its (term, weight) expansions (see src.query_expansion.expand_query)
+        max_queries (int): Maximum number of queries, the question included
+
+    Returns:
+        list: (query, weight) pairs, the question first
+    """
+    sub_queries = [(query, 1.0)]
+
+    for intent, focus in INTENT_FOCUS.items():
+        if getattr(intents, intent):
+            sub_queries.append((focus, INTENT_QUERY_WEIGHT))
+
+    # Strongest expansions first, a few terms per sub-query
+    ranked = sorted(expansions, key=lambda expansion: expansion[1], reverse=True)
+    for start in range(0, len(ranked), TERMS_PER_SUB_QUERY):
+        group = ranked[start:start + TERMS_PER_SUB_QUERY]
+        sub_queries.append((" ".join(term for term, _ in group), sum(weight for _, weight in group) / len(group)))
+
+    return sub_queries[:max_queries]
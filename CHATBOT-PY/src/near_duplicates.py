@@ -0,0 +1,325 @@
+"""
+Near-duplicate detection of chunks at ingestion time.
+
+Every chunk is shingled into word 3-grams and summarized by a MinHash
+signature, whose agreement with another chunk's signature estimates the
+Jaccard similarity of their shingle sets. Signatures are split into LSH
+bands, so candidate near-duplicates are found by a few hash-table lookups
+instead of comparisons against the whole collection; candidates are then
+confirmed on the estimated similarity. Chunks are clustered before they
+are embedded: a near-duplicate of another chunk of the same source is
+dropped, one of a chunk from another source joins that chunk's cluster.
+The cluster ID is stored in the chunk metadata ('dup_cluster'), so
+query-time deduplication is a metadata check.
+"""
+
+import os
+import re
+import json
+import base64
+import hashlib
+import logging
+import tempfile
+import threading
+
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 2
+
+# Estimated Jaccard similarity of shingle sets from which two chunks are near-duplicates
+SIMILARITY_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.8"))
+# Set NEAR_DUP_DROP=0 to keep (and only cluster) near-duplicates within a source
+DROP_WITHIN_SOURCE = os.getenv("NEAR_DUP_DROP", "1") != "0"
+
+NUM_PERM = 128
+# 16 bands of 8 rows: pairs above ~0.7 similarity share a band with high probability
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+
+WORD_PATTERN = re.compile(r'\w+')
+
+# Metadata field holding a chunk's cluster ID
+CLUSTER_FIELD = "dup_cluster"
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+# Fixed seed: signatures must be comparable across runs and processes
+_permutations = np.random.RandomState(1).randint(1, (1 << 61) - 1, size=(2, NUM_PERM), dtype=np.uint64)
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Word n-grams of the lowercased text; short texts give one shingle of all their words."""
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash(text):
+    """MinHash signature (NUM_PERM uint32 values) of a text's shingle set."""
+    features = shingles(text)
+    if not features:
+        return np.full(NUM_PERM, _MAX_HASH, dtype=np.uint64)
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=4).digest(), "big") for feature in features],
+        dtype=np.uint64
+    )
+    a, b = _permutations
+    # One universal hash per permutation, applied to every shingle at once
+    permuted = (np.outer(hashes, a) + b) % _MERSENNE_PRIME & _MAX_HASH
+    return permuted.min(axis=0)
+
+
+def estimated_similarity(a, b):
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    return float(np.mean(a == b))
+
+
+def _band_keys(signature):
+    return [signature[i * ROWS:(i + 1) * ROWS].tobytes() for i in range(BANDS)]
+
+
+def _encode(signature):
+    return base64.b64encode(signature.astype(np.uint32).tobytes()).decode("ascii")
+
+
+def _decode(value):
+    return np.frombuffer(base64.b64decode(value), dtype=np.uint32).astype(np.uint64)
+
+
+class NearDuplicateIndex:
+    """
+    MinHash LSH index assigning chunks to near-duplicate clusters.
+
+    Args:
+        path (str, optional): File the index is loaded from and saved to
+        threshold (float): Estimated Jaccard similarity needed to be a near-duplicate
+    """
+
+    def __init__(self, path=None, threshold=SIMILARITY_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self._lock = threading.RLock()
+        self._signatures = {}  # chunk ID -> signature
+        self._clusters = {}    # chunk ID -> cluster ID
+        self._bands = [{} for _ in range(BANDS)]  # band key -> set of chunk IDs
+        self.dirty = False
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def __contains__(self, doc_id):
+        return doc_id in self._signatures
+
+    def add(self, doc_id, signature, cluster):
+        """Index a chunk under a known cluster."""
+        with self._lock:
+            self.remove([doc_id])
+            self._signatures[doc_id] = signature
+            self._clusters[doc_id] = cluster
+            for table, key in zip(self._bands, _band_keys(signature)):
+                table.setdefault(key, set()).add(doc_id)
+            self.dirty = True
+
+    def find(self, signature, exclude=None):
+        """
+        The closest indexed near-duplicate of a signature.
+
+        Returns:
+            tuple: (chunk ID, cluster ID) or None
+        """
+        with self._lock:
+            candidates = set()
+            for table, key in zip(self._bands, _band_keys(signature)):
+                candidates.update(table.get(key, ()))
+            candidates.discard(exclude)
+
+            best = None
+            for other in candidates:
+                similarity = estimated_similarity(signature, self._signatures[other])
+                if similarity >= self.threshold and (best is None or similarity > best[0]):
+                    best = (similarity, other)
+            return None if best is None else (best[1], self._clusters[best[1]])
+
+    def cluster_for(self, doc_id, signature):
+        """
+        Cluster a chunk would be assigned to, without indexing it.
+
+        A chunk joins the cluster of its closest near-duplicate; otherwise it
+        starts a cluster named after its own ID. An indexed chunk with an
+        unchanged signature keeps its cluster.
+        """
+        with self._lock:
+            current = self._signatures.get(doc_id)
+            if current is not None and np.array_equal(current, signature):
+                return self._clusters[doc_id]
+            match = self.find(signature, exclude=doc_id)
+            return match[1] if match else doc_id
+
+    def assign(self, doc_id, text, signature=None):
+        """Index a chunk and return its cluster ID (see cluster_for)."""
+        if signature is None:
+            signature = minhash(text)
+        with self._lock:
+            cluster = self.cluster_for(doc_id, signature)
+            if self._clusters.get(doc_id) != cluster or doc_id not in self._signatures:
+                self.add(doc_id, signature, cluster)
+            return cluster
+
+    def cluster_of(self, doc_id):
+        return self._clusters.get(doc_id)
+
+    def remove(self, ids):
+        """Drop chunks from the index; unknown IDs are ignored."""
+        with self._lock:
+            for doc_id in ids:
+                signature = self._signatures.pop(doc_id, None)
+                if signature is None:
+                    continue
+                self._clusters.pop(doc_id, None)
+                for table, key in zip(self._bands, _band_keys(signature)):
+                    members = table.get(key)
+                    if members is not None:
+                        members.discard(doc_id)
+                        if not members:
+                            del table[key]
+                self.dirty = True
+
+    def save(self, force=False):
+        """Write the index atomically if it changed since it was loaded or saved."""
+        if self.path is None or not (self.dirty or force):
+            return
+        with self._lock:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix=".near-dup-", dir=directory)
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump({
+                        "version": INDEX_VERSION,
+                        "chunks": {
+                            doc_id: [_encode(signature), self._clusters[doc_id]]
+                            for doc_id, signature in self._signatures.items()
+                        },
+                    }, f)
+                os.replace(tmp_path, self.path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            self.dirty = False
+
+    @classmethod
+    def load(cls, path):
+        """Load an index file; a missing, outdated or unreadable file gives an empty index."""
+        index = cls(path)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != INDEX_VERSION:
+                logger.info(f"Near-duplicate index {path} has version {data.get('version')}, rebuilding it")
+                return index
+        except FileNotFoundError:
+            return index
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read near-duplicate index {path}, starting an empty one: {e}")
+            return index
+
+        for doc_id, (signature, cluster) in data["chunks"].items():
+            index.add(doc_id, _decode(signature), cluster)
+        index.dirty = False
+        return index
+
+
+def collapse_near_duplicates(documents):
+    """
+    Keep the first document of every near-duplicate cluster.
+
+    Documents are grouped by their 'dup_cluster' metadata, which makes this
+    a single pass. Documents ingested before clustering existed are
+    clustered on the fly against the other candidates.
+
+    Args:
+        documents (list): Ranked LangChain Documents
+
+    Returns:
+        tuple: (kept documents, removed documents), both in input order
+    """
+    local_index = None
+    seen = set()
+    kept, removed = [], []
+    for i, doc in enumerate(documents):
+        cluster = (doc.metadata or {}).get(CLUSTER_FIELD)
+        if cluster is None:
+            if local_index is None:
+                local_index = NearDuplicateIndex()
+            cluster = "local:" + local_index.assign(str(i), doc.page_content)
+        if cluster in seen:
+            removed.append(doc)
+        else:
+            seen.add(cluster)
+            kept.append(doc)
+    return kept, removed
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def index_path(collection_name):
+    """Near-duplicate index file of a collection, inside the Chroma persist directory."""
+    try:
+        from src.retriever import get_persist_directory
+    except ImportError:
+        from retriever import get_persist_directory
+    return os.path.join(get_persist_directory(), f"near_dup_{collection_name}.json")
+
+
+def get_near_duplicate_index_for(vectorstore):
+    """
+    Shared near-duplicate index of a LangChain Chroma store, or None if it has no accessible collection.
+
+    The index is reloaded when another process rewrote its file. A missing
+    index is rebuilt from the stored chunks, so chunks ingested before
+    clustering existed still get clusters.
+    """
+    collection = getattr(vectorstore, "_collection", None)
+    if collection is None:
+        return None
+    try:
+        path = index_path(collection.name)
+        mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        with _indexes_lock:
+            cached = _indexes.get(collection.name)
+            if cached is not None and (cached[1] == mtime or cached[0].dirty):
+                return cached[0]
+
+            index = NearDuplicateIndex.load(path)
+            if len(index) != collection.count():
+                index = NearDuplicateIndex(path)
+                stored = collection.get(include=["documents"])
+                for doc_id, text in zip(stored["ids"], stored["documents"]):
+                    index.assign(doc_id, text or "")
+                index.save(force=True)
+                mtime = os.path.getmtime(path)
+                logger.info(f"Built near-duplicate index over {len(index)} chunks of {collection.name}")
+            _indexes[collection.name] = (index, mtime)
+            return index
+    except Exception as e:
+        logger.warning(f"Near-duplicate index unavailable: {e}")
+        return None
+
+
+def save_near_duplicate_index(index):
+    """Persist an index and remember the new file version, so it is not reloaded needlessly."""
+    if index is None or not index.dirty:
+        return
+    index.save()
+    with _indexes_lock:
+        for name, (cached, _) in list(_indexes.items()):
+            if cached is index:
+                _indexes[name] = (index, os.path.getmtime(index.path))
@@ -0,0 +1,208 @@
+"""
+Parallel PDF text extraction.
+
+PDF pages are extracted with PyPDF2 in a process pool, in batches of
+pages so large files are spread over several workers. Results are yielded
+as page records in file and page order instead of being concatenated into
+one string. Extracted text is cached per (file hash, page), so unchanged
+files and pages are never parsed twice.
+"""
+
+import os
+import sqlite3
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
+
+try:
+    from src.ingestion import file_digest
+except ImportError:
+    from ingestion import file_digest
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Default location: CHATBOT-PY/cache/pdf_text (cache/ is git-ignored)
+DEFAULT_CACHE_DIR = os.getenv(
+    "PDF_TEXT_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "pdf_text")
+)
+DEFAULT_MAX_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+# Pages handed to one worker task; each task parses the PDF once
+PAGES_PER_TASK = int(os.getenv("PDF_EXTRACT_PAGES_PER_TASK", "8"))
+
+# One extracted page: file path, 0-based page number, extracted text ('' if none) and file hash
+PageRecord = namedtuple("PageRecord", ["path", "page", "text", "file_hash"])
+
+
+def _extractor_version():
+    import PyPDF2
+    return f"PyPDF2-{PyPDF2.__version__}"
+
+
+def _count_pages(pdf_path):
+    import PyPDF2
+    with open(pdf_path, "rb") as f:
+        return len(PyPDF2.PdfReader(f).pages)
+
+
+def _extract_pages(pdf_path, pages):
+    """Worker: extract the text of some pages of one PDF."""
+    import PyPDF2
+    results = []
+    with open(pdf_path, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        for page_num in pages:
+            try:
+                text = reader.pages[page_num].extract_text() or ""
+            except Exception as e:
+                logger.warning(f"Could not extract page {page_num} of {pdf_path}: {e}")
+                text = ""
+            results.append((page_num, text))
+    return results
+
+
+class PageTextCache:
+    """
+    SQLite cache of extracted page text keyed by (file hash, page).
+
+    Args:
+        cache_dir (str): Directory holding the cache database
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.extractor = _extractor_version()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(cache_dir, "pages.sqlite3"), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "file_hash TEXT, page INTEGER, extractor TEXT, text TEXT, PRIMARY KEY (file_hash, page, extractor))"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "file_hash TEXT PRIMARY KEY, page_count INTEGER NOT NULL)"
+        )
+        self._db.commit()
+
+    def page_count(self, file_hash):
+        with self._lock:
+            row = self._db.execute("SELECT page_count FROM files WHERE file_hash = ?", (file_hash,)).fetchone()
+        return None if row is None else row[0]
+
+    def set_page_count(self, file_hash, page_count):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO files VALUES (?, ?)", (file_hash, page_count))
+            self._db.commit()
+
+    def get_pages(self, file_hash):
+        """Cached texts of a file as a dict page -> text."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT page, text FROM pages WHERE file_hash = ? AND extractor = ?",
+                (file_hash, self.extractor)
+            ).fetchall()
+        return dict(rows)
+
+    def put_pages(self, file_hash, page_texts):
+        """Store (page, text) pairs of a file."""
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)",
+                [(file_hash, page, self.extractor, text) for page, text in page_texts]
+            )
+            self._db.commit()
+
+
+def iter_pdf_pages(pdf_paths, max_workers=DEFAULT_MAX_WORKERS, cache=None, use_cache=True):
+    """
+    Extract the pages of several PDFs in parallel.
+
+    Args:
+        pdf_paths (list): PDF files to extract
+        max_workers (int): Worker processes; 1 extracts in this process
+        cache (PageTextCache, optional): Cache to use, defaults to a cache in DEFAULT_CACHE_DIR
+        use_cache (bool): Set to False to extract without reading or writing the cache
+
+    Yields:
+        PageRecord: One record per page, in input file order and page order
+    """
+    pdf_paths = list(pdf_paths)
+    if use_cache and cache is None:
+        try:
+            cache = PageTextCache()
+        except Exception as e:
+            logger.warning(f"PDF text cache unavailable, extracting without it: {e}")
+            cache = None
+
+    # Work out which pages of which files still need extracting
+    plans = []
+    for pdf_path in pdf_paths:
+        file_hash = file_digest(pdf_path)
+        cached = cache.get_pages(file_hash) if cache else {}
+        page_count = cache.page_count(file_hash) if cache else None
+        if page_count is None:
+            page_count = _count_pages(pdf_path)
+            if cache:
+                cache.set_page_count(file_hash, page_count)
+        missing = [page for page in range(page_count) if page not in cached]
+        plans.append((pdf_path, file_hash, page_count, cached, missing))
+
+    tasks = [
+        (pdf_path, missing[i:i + PAGES_PER_TASK])
+        for pdf_path, _, _, _, missing in plans
+        for i in range(0, len(missing), PAGES_PER_TASK)
+    ]
+    if tasks:
+        logger.info(f"Extracting {sum(len(pages) for _, pages in tasks)} PDF pages in {len(tasks)} tasks")
+
+    executor = None
+    if len(tasks) > 1 and max_workers > 1:
+        try:
+            executor = ProcessPoolExecutor(max_workers=min(max_workers, len(tasks)))
+        except Exception as e:
+            logger.warning(f"Process pool unavailable, extracting in this process: {e}")
+
+    futures = {}
+    try:
+        for task in tasks:
+            futures.setdefault(task[0], []).append(
+                executor.submit(_extract_pages, *task) if executor else task
+            )
+
+        for pdf_path, file_hash, page_count, cached, missing in plans:
+            texts = dict(cached)
+            extracted = []
+            for future in futures.get(pdf_path, []):
+                extracted.extend(future.result() if executor else _extract_pages(*future))
+            texts.update(extracted)
+            if cache and extracted:
+                cache.put_pages(file_hash, extracted)
+
+            for page in range(page_count):
+                yield PageRecord(pdf_path, page, texts.get(page, ""), file_hash)
+    finally:
+        if executor:
+            # Drop the tasks that have not started when the caller stops early
+            # (shutdown(cancel_futures=True) needs Python 3.9)
+            for pending in futures.values():
+                for future in pending:
+                    future.cancel()
+            executor.shutdown()
+
+
+def iter_pdf_files(pdf_paths, **kwargs):
+    """
+    Extract several PDFs in parallel and group the pages per file.
+
+    Args:
+        pdf_paths (list): PDF files to extract
+        **kwargs: Passed to iter_pdf_pages
+
+    Yields:
+        tuple: (pdf_path, list of PageRecord) in input order
+    """
+    for pdf_path, records in groupby(iter_pdf_pages(pdf_paths, **kwargs), key=lambda record: record.path):
+        yield pdf_path, list(records)
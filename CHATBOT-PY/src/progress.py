@@ -0,0 +1,143 @@
+"""
+Stage events for the question answering pipeline.
+
+The pipeline reports when a real stage finishes (query analysis, ANN
+search, re-rank, first LLM token, LLM done) instead of showing timed
+progress bars. Listeners registered with ``stage_listener`` receive every
+event emitted in the same thread or async task, so the Streamlit UI can
+update a progress bar and the API can return or stream the stage timings.
+"""
+
+import time
+import logging
+import contextvars
+from contextlib import contextmanager
+
+try:
+    from langchain_core.callbacks import BaseCallbackHandler
+except ImportError:
+    # Fall back to a plain base class when langchain is not installed
+    BaseCallbackHandler = object
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+QUERY_ANALYSIS = "query_analysis"
+ANN_SEARCH = "ann_search"
+RERANK = "rerank"
+LLM_FIRST_TOKEN = "llm_first_token"
+LLM_DONE = "llm_done"
+
+# Tag of LLM calls that only rewrite a follow-up question; they are not answer stages
+CONDENSE_QUESTION_TAG = "condense_question"
+
+# Stages in pipeline order
+STAGES = [QUERY_ANALYSIS, ANN_SEARCH, RERANK, LLM_FIRST_TOKEN, LLM_DONE]
+
+STAGE_LABELS = {
+    QUERY_ANALYSIS: {"en": "Analyzing the question", "id": "Menganalisis pertanyaan"},
+    ANN_SEARCH: {"en": "Searching for relevant documents", "id": "Mencari dokumen yang relevan"},
+    RERANK: {"en": "Ranking the retrieved documents", "id": "Mengurutkan dokumen yang ditemukan"},
+    LLM_FIRST_TOKEN: {"en": "Writing the answer", "id": "Menyusun jawaban"},
+    LLM_DONE: {"en": "Answer ready", "id": "Jawaban siap"},
+}
+
+# Listeners of the current request (per thread / async task)
+_listeners = contextvars.ContextVar("stage_listeners", default=())
+_started_at = contextvars.ContextVar("stage_started_at", default=None)
+
+
+def stage_label(stage, language="en"):
+    """Human readable label of a stage in 'en' or 'id'."""
+    labels = STAGE_LABELS.get(stage, {})
+    return labels.get(language) or labels.get("en") or stage
+
+
+def stage_fraction(stage):
+    """Share of the pipeline that is done once this stage has finished."""
+    if stage not in STAGES:
+        return 0.0
+    return (STAGES.index(stage) + 1) / len(STAGES)
+
+
+@contextmanager
+def stage_listener(callback):
+    """
+    Send the stage events of this request to a callback.
+
+    Args:
+        callback (callable): Called with one event dict per stage:
+            stage, fraction, elapsed (seconds since the first listener was
+            registered) and details
+    """
+    outer = _started_at.get() is None
+    listeners_token = _listeners.set(_listeners.get() + (callback,))
+    started_token = _started_at.set(time.perf_counter()) if outer else None
+    try:
+        yield
+    finally:
+        _listeners.reset(listeners_token)
+        if started_token is not None:
+            _started_at.reset(started_token)
+
+
+def emit_stage(stage, **details):
+    """
+    Report that a pipeline stage has finished.
+
+    Does nothing when no listener is registered. Listener errors are logged
+    and never interrupt the pipeline.
+
+    Args:
+        stage (str): One of STAGES
+        **details: Extra information about the stage, e.g. document counts
+    """
+    listeners = _listeners.get()
+    if not listeners:
+        return
+
+    started_at = _started_at.get()
+    event = {
+        "stage": stage,
+        "fraction": stage_fraction(stage),
+        "elapsed": round(time.perf_counter() - started_at, 3) if started_at is not None else 0.0,
+        "details": details,
+    }
+    logger.debug(f"Stage {stage} finished after {event['elapsed']}s")
+
+    for callback in listeners:
+        try:
+            callback(event)
+        except Exception as e:
+            logger.warning(f"Stage listener failed for {stage}: {e}")
+
+
+class StageCallbackHandler(BaseCallbackHandler):
+    """
+    LangChain callback handler that reports the LLM stages.
+
+    Emits LLM_FIRST_TOKEN on the first streamed token (or when the answer
+    arrives, for non-streaming models) and LLM_DONE when the answer is
+    complete. LLM calls tagged with CONDENSE_QUESTION_TAG are ignored.
+    """
+
+    # Emit from the calling thread, also for async chains
+    run_inline = True
+
+    def __init__(self):
+        self.first_token_seen = False
+
+    def on_llm_new_token(self, token, **kwargs):
+        if CONDENSE_QUESTION_TAG in (kwargs.get("tags") or []):
+            return
+        if not self.first_token_seen and token:
+            self.first_token_seen = True
+            emit_stage(LLM_FIRST_TOKEN)
+
+    def on_llm_end(self, response, **kwargs):
+        if CONDENSE_QUESTION_TAG in (kwargs.get("tags") or []):
+            return
+        if not self.first_token_seen:
+            self.first_token_seen = True
+            emit_stage(LLM_FIRST_TOKEN)
+        emit_stage(LLM_DONE)
@@ -0,0 +1,167 @@
+"""
+Query expansion with weighted synonyms.
+
+The synonym table and the intent-specific expansion terms live in
+query_expansions.json and are loaded once into a token trie. A query is
+expanded in one pass over its tokens: at every position the trie is walked
+as far as the query allows, the longest matching phrase contributes its
+synonyms (so "cuti akademik" is expanded as a phrase, not as "cuti") and
+every marker phrase met on the way flags an intent. Expansions are returned
+as (term, weight) pairs rather than appended to the query, so the BM25 side
+of hybrid search can weight them while the dense query embedding stays
+that of the question.
+"""
+
+import os
+import re
+import json
+import logging
+import threading
+from functools import lru_cache
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+EXPANSIONS_FILE = os.getenv(
+    "QUERY_EXPANSIONS_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "query_expansions.json")
+)
+
+TOKEN_PATTERN = re.compile(r'[\w-]+')
+
+
+def _tokens(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class _TrieNode:
+    __slots__ = ("children", "synonyms", "intents")
+
+    def __init__(self):
+        self.children = {}
+        self.synonyms = None
+        self.intents = set()
+
+
+class QueryExpander:
+    """
+    Longest-match phrase expander over a token trie.
+
+    Args:
+        table (dict): Parsed query_expansions.json
+    """
+
+    def __init__(self, table):
+        self.weights = table["weights"]
+        self.limits = table["limits"]
+        self.intent_terms = {intent: spec["terms"] for intent, spec in table["intents"].items()}
+        self._root = _TrieNode()
+        for phrase, synonyms in table["synonyms"].items():
+            self._insert(phrase).synonyms = synonyms
+        for intent, spec in table["intents"].items():
+            for marker in spec["markers"]:
+                self._insert(marker).intents.add(intent)
+
+    def _insert(self, phrase):
+        node = self._root
+        for token in _tokens(phrase):
+            node = node.children.setdefault(token, _TrieNode())
+        return node
+
+    @classmethod
+    def from_file(cls, path=EXPANSIONS_FILE):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def _scan(self, tokens):
+        """
+        One pass over the tokens.
+
+        Returns:
+            tuple: (list of (phrase length, synonyms) for non-overlapping
+                longest matches, set of flagged intents)
+        """
+        matches, intents = [], set()
+        next_free = 0
+        for start in range(len(tokens)):
+            node, longest = self._root, None
+            for end in range(start, len(tokens)):
+                node = node.children.get(tokens[end])
+                if node is None:
+                    break
+                intents.update(node.intents)
+                if node.synonyms:
+                    longest = (end + 1 - start, node.synonyms)
+            if longest and start >= next_free:
+                matches.append(longest)
+                next_free = start + longest[0]
+        return matches, intents
+
+    def expand(self, query):
+        """
+        Weighted expansion terms of a query.
+
+        Args:
+            query (str): The query
+
+        Returns:
+            list: (term, weight) pairs in query order, without terms the query already contains
+        """
+        query_lower = query.lower()
+        matches, intents = self._scan(_tokens(query))
+        procedural = "procedural" in intents
+
+        expansions = {}
+
+        def add(term, weight):
+            if term.lower() not in query_lower and weight > expansions.get(term, 0.0):
+                expansions[term] = weight
+
+        for length, synonyms in matches:
+            if length > 1:
+                limit = self.limits["procedural_phrase_synonym" if procedural else "phrase_synonym"]
+                weight = self.weights["phrase_synonym"]
+            else:
+                limit = self.limits["procedural_synonym" if procedural else "synonym"]
+                weight = self.weights["synonym"]
+            for term in synonyms[:limit]:
+                add(term, weight)
+
+        for intent in sorted(intents):
+            for term in self.intent_terms.get(intent, ()):
+                add(term, self.weights["intent"])
+
+        return list(expansions.items())
+
+
+_expander = None
+_expander_lock = threading.Lock()
+
+
+def get_query_expander():
+    """The shared expander, loaded from EXPANSIONS_FILE on first use."""
+    global _expander
+    with _expander_lock:
+        if _expander is None:
+            _expander = QueryExpander.from_file()
+            logger.info(f"Loaded query expansions from {EXPANSIONS_FILE}")
+        return _expander
+
+
+@lru_cache(maxsize=256)
+def expand_query(query):
+    """
+    Expand the query with related terms to improve retrieval.
+
+    Args:
+        query (str): The original query
+
+    Returns:
+        tuple: (term, weight) pairs of related terms, weights in (0, 1]
+    """
+    return tuple(get_query_expander().expand(query))
+
+
+def format_expanded_query(query, expansions):
+    """The query followed by its expansion terms, for logs and display."""
+    return " ".join([query] + [term for term, _ in expansions])
@@ -207,11 +207,7 @@ Relevant Information:"""
         if corrections:
             print("\n=== DEBUG: Processing corrections ===")
             # Determine the style based on the language and formality of the question
-            style = "formal"
-            if any(word in question.lower() for word in ["aku", "gue", "gw", "lu", "km"]):
-                style = "casual"
-            elif all(ord(c) < 128 for c in question):  # If all characters are ASCII (likely English)
-                style = "english"
+            style = self.spell_checker.detect_language_style(question)
             
             print(f"Detected style: {style}")
             correction_text = self.spell_checker.format_corrections(corrections, style)
@@ -0,0 +1,288 @@
+"""
+Full re-index into a shadow collection.
+
+A re-index builds a new Chroma collection next to the live one, so queries
+keep being answered from the old index while it runs. The shadow collection
+has its own manifest, saved after every source, which is the checkpoint: an
+interrupted run picks up the same shadow from reindex_state.json and skips
+every source that was already written. When all sources are done, chunks of
+sources the re-index does not own (RSS posts, manual updates) are copied
+over with their vectors, and the active_collection.json pointer is swapped
+atomically. The replaced collection is kept for rollback.
+
+Usage:
+    python -m src.reindex [--fresh] [--no-web] [--rollback]
+"""
+
+import os
+import json
+import time
+import logging
+import argparse
+import tempfile
+
+try:
+    from src.answer_cache import invalidate_answer_cache
+    from src.retriever import (
+        get_persist_directory, get_active_collection, get_previous_collection,
+        set_active_collection, open_collection
+    )
+    from src.ingestion import IncrementalIndexer, MANIFEST_FILENAME, load_manifest, save_manifest
+    from src.embedding_writer import iter_batches, DEFAULT_BATCH_SIZE
+    from src.bm25_index import get_bm25_index_for, save_bm25_index, index_path
+    from src.vector_index import snapshot_path
+    from src.near_duplicates import (
+        get_near_duplicate_index_for, save_near_duplicate_index, CLUSTER_FIELD, index_path as near_duplicate_path
+    )
+    from src.split_document import ingest_dataset, is_dataset_source, DATASET_DIR, WEB_SOURCE
+except ImportError:
+    from answer_cache import invalidate_answer_cache
+    from retriever import (
+        get_persist_directory, get_active_collection, get_previous_collection,
+        set_active_collection, open_collection
+    )
+    from ingestion import IncrementalIndexer, MANIFEST_FILENAME, load_manifest, save_manifest
+    from embedding_writer import iter_batches, DEFAULT_BATCH_SIZE
+    from bm25_index import get_bm25_index_for, save_bm25_index, index_path
+    from vector_index import snapshot_path
+    from near_duplicates import (
+        get_near_duplicate_index_for, save_near_duplicate_index, CLUSTER_FIELD, index_path as near_duplicate_path
+    )
+    from split_document import ingest_dataset, is_dataset_source, DATASET_DIR, WEB_SOURCE
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+STATE_FILENAME = "reindex_state.json"
+SHADOW_PREFIX = "langchain_reindex_"
+
+
+def _state_path():
+    return os.path.join(get_persist_directory(), STATE_FILENAME)
+
+
+def manifest_path_for(collection_name):
+    """Manifest of a collection that is not live; the live one always uses ingest_manifest.json."""
+    return os.path.join(get_persist_directory(), f"ingest_manifest.{collection_name}.json")
+
+
+def load_state():
+    """The state of an unfinished re-index, or None."""
+    try:
+        with open(_state_path(), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable {STATE_FILENAME}: {e}")
+        return None
+
+
+def _save_state(state):
+    directory = get_persist_directory()
+    fd, tmp_path = tempfile.mkstemp(prefix=".reindex-", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, _state_path())
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _clear_state():
+    if os.path.exists(_state_path()):
+        os.remove(_state_path())
+
+
+def _drop_collection(collection_name):
+    """Delete a collection with its manifest and side indexes, ignoring ones that are already gone."""
+    try:
+        open_collection(collection_name).delete_collection()
+        logger.info(f"Deleted collection {collection_name}")
+    except Exception as e:
+        logger.warning(f"Could not delete collection {collection_name}: {e}")
+    snapshot = snapshot_path(collection_name)
+    for path in (manifest_path_for(collection_name), index_path(collection_name),
+                 near_duplicate_path(collection_name), snapshot, f"{snapshot}.json"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _is_owned(source):
+    """Sources the re-index rebuilds itself; everything else (RSS, updates, docs/ PDFs) is carried over."""
+    return is_dataset_source(source) or source == WEB_SOURCE
+
+
+def carry_over_sources(live_store, shadow_indexer, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Copy chunks of sources the re-index does not rebuild into the shadow collection.
+
+    Vectors are copied as they are, nothing is embedded again.
+
+    Args:
+        live_store: Vector store of the live collection
+        shadow_indexer (IncrementalIndexer): Indexer over the shadow collection
+
+    Returns:
+        int: Number of copied chunks
+    """
+    live = getattr(live_store, "_collection", None)
+    shadow = getattr(shadow_indexer.vectorstore, "_collection", None)
+    if live is None or shadow is None:
+        logger.warning("Collections not accessible, RSS and update chunks are not carried over")
+        return 0
+
+    stored = live.get(include=["metadatas"])
+    ids = [
+        doc_id for doc_id, metadata in zip(stored["ids"], stored["metadatas"])
+        if not _is_owned((metadata or {}).get("source", ""))
+    ]
+
+    lexical_index = get_bm25_index_for(shadow_indexer.vectorstore)
+    near_duplicates = get_near_duplicate_index_for(shadow_indexer.vectorstore)
+    copied = 0
+    for batch in iter_batches(ids, batch_size):
+        chunks = live.get(ids=batch, include=["embeddings", "documents", "metadatas"])
+        if near_duplicates is not None:
+            # Clusters are per collection, so carried-over chunks are clustered against the shadow
+            for doc_id, text, metadata in zip(chunks["ids"], chunks["documents"], chunks["metadatas"]):
+                if metadata is not None:
+                    metadata[CLUSTER_FIELD] = near_duplicates.assign(doc_id, text or "")
+        shadow.upsert(
+            ids=chunks["ids"],
+            embeddings=chunks["embeddings"],
+            documents=chunks["documents"],
+            metadatas=chunks["metadatas"]
+        )
+        if lexical_index is not None:
+            lexical_index.add_texts(chunks["ids"], chunks["documents"], chunks["metadatas"])
+        copied += len(chunks["ids"])
+    save_bm25_index(lexical_index)
+    save_near_duplicate_index(near_duplicates)
+
+    # Keep the manifest entries of carried-over sources, so incremental runs still know them
+    live_manifest = load_manifest(os.path.join(get_persist_directory(), MANIFEST_FILENAME))
+    for source, entry in live_manifest["sources"].items():
+        if not _is_owned(source):
+            shadow_indexer.sources[source] = entry
+    save_manifest(shadow_indexer.manifest_path, shadow_indexer.manifest)
+
+    logger.info(f"Carried over {copied} chunks of non-dataset sources")
+    return copied
+
+
+def swap_in(shadow_name, manifest_path):
+    """
+    Make a finished shadow collection live.
+
+    The live manifest is moved aside under the name of its collection and
+    the shadow manifest takes its place, then the pointer is swapped. The
+    collection that was kept for rollback by the previous swap is deleted.
+
+    Returns:
+        str: The collection that was live before
+    """
+    persist_directory = get_persist_directory()
+    live_name = get_active_collection()
+    stale_name = get_previous_collection()
+    live_manifest = os.path.join(persist_directory, MANIFEST_FILENAME)
+
+    if os.path.exists(live_manifest):
+        os.replace(live_manifest, manifest_path_for(live_name))
+    os.replace(manifest_path, live_manifest)
+    previous = set_active_collection(shadow_name)
+
+    if stale_name and stale_name not in (live_name, shadow_name):
+        _drop_collection(stale_name)
+    return previous
+
+
+def reindex(dataset_dir=DATASET_DIR, crawl_web=True, fresh=False):
+    """
+    Rebuild the whole index in a shadow collection and swap it in.
+
+    Args:
+        dataset_dir (str): Directory with the PDF files
+        crawl_web (bool): Also crawl and index the website
+        fresh (bool): Discard an unfinished re-index instead of resuming it
+
+    Returns:
+        str: Name of the new live collection
+    """
+    state = load_state()
+    if state and fresh:
+        logger.info(f"Discarding unfinished re-index into {state['shadow']}")
+        _drop_collection(state["shadow"])
+        _clear_state()
+        state = None
+
+    if state:
+        logger.info(f"Resuming re-index into {state['shadow']}")
+    else:
+        state = {
+            "shadow": f"{SHADOW_PREFIX}{time.strftime('%Y%m%d%H%M%S')}",
+            "started_at": time.time(),
+            "live": get_active_collection(),
+        }
+        _save_state(state)
+        logger.info(f"Starting re-index into {state['shadow']}")
+
+    shadow_name = state["shadow"]
+    manifest_path = manifest_path_for(shadow_name)
+    indexer = IncrementalIndexer(open_collection(shadow_name), manifest_path=manifest_path)
+
+    # Sources already in the shadow manifest are skipped, so this resumes from the last checkpoint
+    ingest_dataset(dataset_dir, crawl_web=crawl_web, indexer=indexer)
+
+    carry_over_sources(open_collection(get_active_collection()), indexer)
+    previous = swap_in(shadow_name, manifest_path)
+    _clear_state()
+
+    invalidate_answer_cache()
+    logger.info(f"Re-index finished: {shadow_name} is live, {previous} kept for rollback")
+    return shadow_name
+
+
+def rollback():
+    """
+    Make the collection that was live before the last swap live again.
+
+    Returns:
+        str: The collection that is live now
+    """
+    previous = get_previous_collection()
+    if not previous:
+        raise ValueError("No previous collection to roll back to")
+
+    current = get_active_collection()
+    previous_manifest = manifest_path_for(previous)
+    live_manifest = os.path.join(get_persist_directory(), MANIFEST_FILENAME)
+    if os.path.exists(live_manifest):
+        os.replace(live_manifest, manifest_path_for(current))
+    if os.path.exists(previous_manifest):
+        os.replace(previous_manifest, live_manifest)
+    set_active_collection(previous)
+
+    invalidate_answer_cache()
+    logger.info(f"Rolled back from {current} to {previous}")
+    return previous
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the vector index in a shadow collection and swap it in.")
+    parser.add_argument("--fresh", action="store_true", help="discard an unfinished re-index instead of resuming it")
+    parser.add_argument("--no-web", action="store_true", help="do not crawl the website")
+    parser.add_argument("--rollback", action="store_true", help="make the previously live collection live again")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.rollback:
+        rollback()
+    else:
+        reindex(crawl_web=not args.no_web, fresh=args.fresh)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Per-request analysis of the user's question.
+
+The language profile and the intents of a question are computed once when
+a request starts and are available to every stage of that request
+(retrieval, generation, progress labels, error messages) through
+``current_request`` while it is installed with ``use_request``. Like the
+stage listeners in src.progress, the context is scoped to the current
+thread or async task.
+"""
+
+import contextvars
+from contextlib import contextmanager
+
+try:
+    from src.language import detect_language_profile
+    from src.intents import classify_intents
+except ImportError:
+    from language import detect_language_profile
+    from intents import classify_intents
+
+_current = contextvars.ContextVar("request_context", default=None)
+
+
+class RequestContext:
+    """
+    Analysis of one question.
+
+    Args:
+        question (str): The user's question
+    """
+
+    def __init__(self, question):
+        self.question = question
+        self.profile = detect_language_profile(question)
+        self.intents = classify_intents(question)
+
+    @property
+    def language(self):
+        """'en' or 'id'."""
+        return self.profile.language
+
+    @property
+    def is_english(self):
+        return self.profile.language == "en"
+
+
+@contextmanager
+def use_request(context):
+    """Make a RequestContext the current one for the duration of the block."""
+    token = _current.set(context)
+    try:
+        yield context
+    finally:
+        _current.reset(token)
+
+
+def current_request(question):
+    """
+    The context of the current request if it is about this question, otherwise a new one.
+
+    Args:
+        question (str): The question being processed
+
+    Returns:
+        RequestContext: The analysis of the question
+    """
+    context = _current.get()
+    if context is not None and context.question == question:
+        return context
+    return RequestContext(question)
@@ -0,0 +1,238 @@
+"""
+Batched re-ranking of retrieved chunks.
+
+Scores a whole candidate list against a query in one pass: the query is
+embedded once, the chunks are embedded in a single batched ``encode`` call
+(or taken from precomputed vectors), and the keyword, phrase, list and link
+bonuses are combined as NumPy array operations.
+"""
+
+import re
+import logging
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Stopwords ignored when extracting query keywords
+STOPWORDS = {
+    'and', 'or', 'the', 'a', 'an', 'in', 'on', 'at', 'by', 'for', 'with', 'about',
+    'dan', 'atau', 'di', 'ke', 'dari', 'yang', 'pada', 'untuk', 'dengan', 'tentang',
+    'is', 'are', 'am', 'was', 'were', 'be', 'being', 'been',
+    'ada', 'adalah', 'merupakan', 'ini', 'itu'
+}
+
+# Terms that mark a query as being about accessing documents or curriculum
+DOCUMENT_QUERY_TERMS = [
+    'dokumen', 'document', 'kurikulum', 'curriculum', 'akses', 'access',
+    'link', 'tautan', 'unduh', 'download', 'file', 'buku', 'buku pedoman',
+    'panduan', 'guide', 'manual', 'handbook', 'sillabus', 'silabus'
+]
+
+# Words that indicate instructive content (answers, steps, procedures)
+ANSWER_TERMS = ["langkah-langkah", "prosedur", "tahapan"]
+
+NUMBERED_POINT_PATTERN = re.compile(r'\d+[\.\)]')
+TRAILING_QUESTION_PATTERN = re.compile(r'\?\s*$')
+
+
+def is_low_quality_chunk(chunk, query):
+    """Detect if a chunk is low quality (too short or just contains the query)"""
+    # If chunk is extremely short (less than 100 chars), it's probably low quality
+    if len(chunk.strip()) < 100:
+        return True
+
+    # If the chunk is just the query or very similar to it
+    chunk_lower = chunk.lower().strip()
+    query_lower = query.lower().strip()
+
+    # Check if chunk is just the query
+    if chunk_lower == query_lower:
+        return True
+
+    # Check if chunk contains mostly just the query
+    # First normalize both by removing whitespace
+    normalized_chunk = ' '.join(chunk_lower.split())
+    normalized_query = ' '.join(query_lower.split())
+
+    # If the chunk is less than 30% longer than the query, it's probably just the query
+    if len(normalized_chunk) < len(normalized_query) * 1.3:
+        return True
+
+    # Check if chunk starts with the query and doesn't have much more content
+    if normalized_chunk.startswith(normalized_query) and len(normalized_chunk) < len(normalized_query) * 1.5:
+        return True
+
+    return False
+
+
+def extract_query_keywords(query):
+    """
+    Extract the keywords used for the keyword bonus.
+
+    Args:
+        query (str): The user's query
+
+    Returns:
+        set: Lowercased query words without stopwords and words of 2 chars or less
+    """
+    return {kw for kw in query.lower().split() if kw not in STOPWORDS and len(kw) > 2}
+
+
+def extract_query_phrases(query):
+    """
+    Build the 2-5 word query phrases checked for the exact match bonus.
+
+    Args:
+        query (str): The user's query
+
+    Returns:
+        list: Phrases longer than 5 characters, empty if the query has fewer than 2 keywords
+    """
+    if len(extract_query_keywords(query)) < 2:
+        return []
+
+    query_words = query.lower().split()
+    phrases = []
+    for i in range(len(query_words) - 1):  # Need at least 2 words for a phrase
+        end_idx = min(i + 5, len(query_words))  # Look at up to 5 words at a time
+        for j in range(i + 1, end_idx):
+            phrase = ' '.join(query_words[i:j+1])
+            if len(phrase) > 5:  # Only count meaningful phrases
+                phrases.append(phrase)
+    return phrases
+
+
+def cosine_scores(query_embedding, chunk_embeddings):
+    """
+    Cosine similarity between one query vector and a matrix of chunk vectors.
+
+    Args:
+        query_embedding (array-like): Query vector of shape (dim,)
+        chunk_embeddings (array-like): Chunk matrix of shape (n, dim)
+
+    Returns:
+        np.ndarray: Similarities of shape (n,), zero for all-zero vectors
+    """
+    query_vector = np.asarray(query_embedding, dtype=np.float32).ravel()
+    matrix = np.asarray(chunk_embeddings, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+
+    # Normalize first, like sklearn's cosine_similarity, so zero vectors stay zero
+    query_norm = np.linalg.norm(query_vector)
+    if query_norm > 0:
+        query_vector = query_vector / query_norm
+    row_norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    row_norms[row_norms == 0] = 1.0
+
+    return (matrix / row_norms) @ query_vector
+
+
+def resolve_chunk_embeddings(chunks, stored_embeddings, model):
+    """
+    Look up stored vectors for chunks, encoding only the ones that are missing.
+
+    Args:
+        chunks (list): Chunk texts
+        stored_embeddings (dict): Stripped chunk text -> stored vector
+        model: Sentence-transformers model used for chunks without a stored vector
+
+    Returns:
+        np.ndarray: Matrix with one row per chunk, in input order
+    """
+    stored_embeddings = stored_embeddings or {}
+    vectors = [stored_embeddings.get(chunk.strip()) for chunk in chunks]
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+
+    if missing:
+        # Synthetic and placeholder chunks have no stored vector
+        encoded = model.encode([chunks[i] for i in missing], batch_size=64)
+        for i, vector in zip(missing, encoded):
+            vectors[i] = vector
+
+    if not vectors:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.vstack([np.asarray(vector, dtype=np.float32) for vector in vectors])
+
+
+def rerank_scores(chunks, query, model=None, query_embedding=None, chunk_embeddings=None):
+    """
+    Score every candidate chunk against the query in a single batch.
+
+    Produces the same scores as scoring each chunk on its own: cosine
+    similarity plus keyword, exact phrase, answer, numbered list and
+    document link bonuses, minus length and question-only penalties,
+    floored at 0.1.
+
+    Args:
+        chunks (list): Candidate chunk texts
+        query (str): The user's query
+        model: Sentence-transformers model, needed when an embedding is not given
+        query_embedding (array-like, optional): Precomputed query vector
+        chunk_embeddings (array-like, optional): Precomputed chunk vectors, one row per chunk
+
+    Returns:
+        np.ndarray: Relevance scores, one per chunk, in input order
+    """
+    if not chunks:
+        return np.zeros(0, dtype=np.float64)
+
+    if query_embedding is None:
+        query_embedding = model.encode(query)
+    if chunk_embeddings is None:
+        chunk_embeddings = model.encode(list(chunks), batch_size=64)
+
+    similarity = cosine_scores(query_embedding, chunk_embeddings).astype(np.float64)
+
+    # Everything that depends only on the query is computed once
+    query_lower = query.lower()
+    query_keywords = sorted(extract_query_keywords(query))
+    query_phrases = extract_query_phrases(query)
+    is_document_query = any(term in query_lower for term in DOCUMENT_QUERY_TERMS)
+
+    n = len(chunks)
+    keyword_matches = np.zeros(n, dtype=np.float64)
+    phrase_hits = np.zeros(n, dtype=bool)
+    answer_hits = np.zeros(n, dtype=bool)
+    numbered_points = np.zeros(n, dtype=np.int64)
+    link_counts = np.zeros(n, dtype=np.int64)
+    curriculum_hits = np.zeros(n, dtype=bool)
+    stripped_lengths = np.zeros(n, dtype=np.int64)
+    question_only = np.zeros(n, dtype=bool)
+    low_quality = np.zeros(n, dtype=bool)
+
+    # Per-chunk text features (substring tests cannot be vectorized further)
+    for i, chunk in enumerate(chunks):
+        chunk_lower = chunk.lower()
+        stripped = chunk.strip()
+        keyword_matches[i] = sum(1 for keyword in query_keywords if keyword in chunk_lower)
+        phrase_hits[i] = any(phrase in chunk_lower for phrase in query_phrases)
+        answer_hits[i] = any(term in chunk_lower for term in ANSWER_TERMS)
+        numbered_points[i] = len(NUMBERED_POINT_PATTERN.findall(chunk_lower))
+        if is_document_query:
+            link_counts[i] = chunk_lower.count("drive.google.com")
+            curriculum_hits[i] = "kurikulum" in chunk_lower or "curriculum" in chunk_lower
+        stripped_lengths[i] = len(stripped)
+        question_only[i] = bool(TRAILING_QUESTION_PATTERN.search(stripped))
+        if not question_only[i]:
+            low_quality[i] = is_low_quality_chunk(chunk, query)
+
+    keyword_bonus = 0.5 * (keyword_matches / len(query_keywords)) if query_keywords else np.zeros(n)
+    exact_match_bonus = np.where(phrase_hits, 0.5, 0.0)
+    answer_bonus = np.where(answer_hits, 0.3, 0.0)
+    numbered_list_bonus = np.where(numbered_points >= 3, 0.4, np.where(numbered_points > 0, 0.2, 0.0))
+    document_link_bonus = np.where(
+        link_counts > 0,
+        1.0 + 0.2 * np.minimum(link_counts, 5) + np.where(curriculum_hits, 0.5, 0.0),
+        0.0
+    )
+    length_penalty = np.where(stripped_lengths < 200, 0.5, np.where(stripped_lengths < 400, 0.2, 0.0))
+    question_only_penalty = np.where(question_only, 0.6, np.where(low_quality, 0.8, 0.0))
+
+    final_scores = (similarity + keyword_bonus + exact_match_bonus + answer_bonus
+                    + numbered_list_bonus + document_link_bonus
+                    - length_penalty - question_only_penalty)
+
+    # Ensure the score is positive (minimum score of 0.1 to avoid complete filtering)
+    return np.maximum(0.1, final_scores)
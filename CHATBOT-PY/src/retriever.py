@@ -1,58 +1,60 @@
 import os
 import sys
 import logging
+import json
+import tempfile
+import threading
+from collections import OrderedDict
 from dotenv import load_dotenv
 
+try:
+    from src.model_registry import get_embeddings
+    from src.bm25_index import get_bm25_index
+    from src.fusion import reciprocal_rank_fusion
+    from src.vector_index import get_vector_index
+    from src.mmr import MMRSelector
+except ImportError:
+    from model_registry import get_embeddings
+    from bm25_index import get_bm25_index
+    from fusion import reciprocal_rank_fusion
+    from vector_index import get_vector_index
+    from mmr import MMRSelector
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Try to fix sqlite3 version issues by using pysqlite3 if available
-try:
-    __import__('pysqlite3')
-    import sys
-    sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
-    
-    # Now import sqlite3 again to verify it's been replaced
-    import sqlite3
-    logger.info(f"Successfully replaced sqlite3 with pysqlite3 (version: {sqlite3.sqlite_version})")
-except ImportError:
-    # If pysqlite3 is not available, check the existing SQLite version
-    import sqlite3
-    sqlite_version = sqlite3.sqlite_version_info
-    if sqlite_version < (3, 35, 0):
-        logger.warning(f"SQLite version {sqlite3.sqlite_version} is too old for ChromaDB (needs 3.35.0+)")
-        logger.warning("Please add pysqlite3-binary to your requirements.txt")
-        logger.warning("Attempting to continue with the existing SQLite version...")
-except Exception as e:
-    logger.error(f"Error handling sqlite3: {e}")
-    raise ImportError(f"Failed to initialize database dependencies: {e}")
-
-# Now try to import langchain_chroma
-try:
-    from langchain_community.embeddings import HuggingFaceEmbeddings
-    from langchain_chroma import Chroma
-    import chromadb
-    logger.info("Successfully imported langchain_chroma and chromadb")
-except Exception as e:
-    logger.error(f"Error importing langchain_chroma: {e}")
-    raise ImportError(f"Failed to import langchain_chroma: {e}")
-
 # Load environment variables from .env file
 load_dotenv()
 
-# Set the persist_directory for Chroma
-if os.path.exists("./chroma_db"):
-    persist_directory = "./chroma_db"
-elif os.path.exists("../chroma_db"):
-    persist_directory = "../chroma_db"
-elif os.path.exists("/mount/src/rag-journey/CHATBOT-PY/chroma_db"):
-    persist_directory = "/mount/src/rag-journey/CHATBOT-PY/chroma_db"
-else:
-    # Create the directory if it doesn't exist
-    persist_directory = "./chroma_db"
-    os.makedirs(persist_directory, exist_ok=True)
-    logger.warning(f"Created new chroma_db directory at {persist_directory}")
+# Built on first use by get_retriever(); importing this module does no heavy work
+_lock = threading.RLock()
+_persist_directory = None
+_vectorstore = None
+_retriever = None
+_warm_up_thread = None
+_sqlite_patched = False
+# Modification time of the collection pointer the retriever was opened with
+_pointer_version = None
+
+# Fuse BM25 keyword results into get_relevant_documents_with_embeddings (HYBRID_SEARCH=0 for dense only)
+HYBRID_SEARCH_ENABLED = os.getenv("HYBRID_SEARCH", "1") != "0"
+# Weights of the vector and the BM25 ranking in the reciprocal-rank fusion
+RRF_VECTOR_WEIGHT = float(os.getenv("RRF_VECTOR_WEIGHT", "1.0"))
+RRF_BM25_WEIGHT = float(os.getenv("RRF_BM25_WEIGHT", "1.0"))
+
+# "chroma" searches Chroma's HNSW index; "numpy" keeps an exact in-process index of the collection
+VECTOR_SEARCH_BACKEND = os.getenv("VECTOR_SEARCH_BACKEND", "chroma").lower()
+
+# Recent MMR candidate pools, so asking again for a query with a larger k reuses its similarity matrix
+MMR_CACHE_SIZE = int(os.getenv("MMR_CACHE_SIZE", "8"))
+_mmr_cache = OrderedDict()
+_mmr_lock = threading.Lock()
+
+# Collection LangChain's Chroma uses when none is named
+DEFAULT_COLLECTION_NAME = "langchain"
+# Names the live collection; re-indexing swaps it atomically
+ACTIVE_COLLECTION_FILE = "active_collection.json"
 
 # Initialize a dummy retriever as fallback
 class DummyRetriever:
@@ -63,15 +65,157 @@ class DummyRetriever:
             'metadata': {'source': 'dummy'}
         })]
 
-# Initialize the real retriever
-try:
-    # Initialize HuggingFace embeddings
-    # Using all-MiniLM-L6-v2 which has 384 dimensions
-    logger.info(f"Initializing embeddings and vector store from {persist_directory}")
-    embeddings = HuggingFaceEmbeddings(
-        model_name="all-MiniLM-L6-v2"
+def _patch_sqlite():
+    """Swap in pysqlite3 if available, ChromaDB needs SQLite 3.35.0+."""
+    global _sqlite_patched
+    if _sqlite_patched:
+        return
+    _sqlite_patched = True
+
+    # Try to fix sqlite3 version issues by using pysqlite3 if available
+    try:
+        __import__('pysqlite3')
+        sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
+        
+        # Now import sqlite3 again to verify it's been replaced
+        import sqlite3
+        logger.info(f"Successfully replaced sqlite3 with pysqlite3 (version: {sqlite3.sqlite_version})")
+    except ImportError:
+        # If pysqlite3 is not available, check the existing SQLite version
+        import sqlite3
+        sqlite_version = sqlite3.sqlite_version_info
+        if sqlite_version < (3, 35, 0):
+            logger.warning(f"SQLite version {sqlite3.sqlite_version} is too old for ChromaDB (needs 3.35.0+)")
+            logger.warning("Please add pysqlite3-binary to your requirements.txt")
+            logger.warning("Attempting to continue with the existing SQLite version...")
+    except Exception as e:
+        logger.error(f"Error handling sqlite3: {e}")
+        raise ImportError(f"Failed to initialize database dependencies: {e}")
+
+def get_persist_directory():
+    """
+    Return the Chroma persist directory, creating it if none exists yet.
+
+    Returns:
+        str: Path of the chroma_db directory
+    """
+    global _persist_directory
+    if _persist_directory is not None:
+        return _persist_directory
+
+    # Set the persist_directory for Chroma
+    if os.path.exists("./chroma_db"):
+        persist_directory = "./chroma_db"
+    elif os.path.exists("../chroma_db"):
+        persist_directory = "../chroma_db"
+    elif os.path.exists("/mount/src/rag-journey/CHATBOT-PY/chroma_db"):
+        persist_directory = "/mount/src/rag-journey/CHATBOT-PY/chroma_db"
+    else:
+        # Create the directory if it doesn't exist
+        persist_directory = "./chroma_db"
+        os.makedirs(persist_directory, exist_ok=True)
+        logger.warning(f"Created new chroma_db directory at {persist_directory}")
+
+    _persist_directory = persist_directory
+    return persist_directory
+
+def _pointer_path():
+    return os.path.join(get_persist_directory(), ACTIVE_COLLECTION_FILE)
+
+def _pointer_mtime():
+    try:
+        return os.path.getmtime(_pointer_path())
+    except OSError:
+        return None
+
+def _read_pointer():
+    try:
+        with open(_pointer_path(), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read {ACTIVE_COLLECTION_FILE}, using the default collection: {e}")
+        return {}
+
+def get_active_collection():
+    """
+    Return the name of the live Chroma collection.
+
+    Returns:
+        str: The collection named in active_collection.json, or the default collection
+    """
+    return _read_pointer().get("collection") or DEFAULT_COLLECTION_NAME
+
+def set_active_collection(collection_name):
+    """
+    Atomically make a collection the live one.
+
+    Running retrievers notice the change on their next call and reopen.
+    The replaced collection is remembered as 'previous' so it can still
+    be used for rollback.
+
+    Args:
+        collection_name (str): Collection to serve from now on
+
+    Returns:
+        str: The collection that was live before
+    """
+    previous = get_active_collection()
+    directory = get_persist_directory()
+    fd, tmp_path = tempfile.mkstemp(prefix=".active-", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"collection": collection_name, "previous": previous}, f)
+        os.replace(tmp_path, _pointer_path())
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    logger.info(f"Live collection switched from {previous} to {collection_name}")
+    return previous
+
+def get_previous_collection():
+    """Name of the collection that was live before the last swap, or None."""
+    return _read_pointer().get("previous")
+
+def open_collection(collection_name):
+    """
+    Open a named collection in the persist directory without touching the live retriever.
+
+    Args:
+        collection_name (str): Collection to open, created if it does not exist
+
+    Returns:
+        Chroma: Vector store over that collection
+    """
+    _patch_sqlite()
+    from langchain_chroma import Chroma
+    import chromadb
+    return Chroma(
+        collection_name=collection_name,
+        embedding_function=get_embeddings(),
+        persist_directory=get_persist_directory(),
+        client_settings=chromadb.Settings(anonymized_telemetry=False, allow_reset=True)
     )
 
+def _open_vectorstore(persist_directory, collection_name=DEFAULT_COLLECTION_NAME):
+    """Open a collection of the persisted Chroma store; raises if it cannot be opened."""
+    _patch_sqlite()
+
+    # Now try to import langchain_chroma
+    try:
+        from langchain_chroma import Chroma
+        import chromadb
+        logger.info("Successfully imported langchain_chroma and chromadb")
+    except Exception as e:
+        logger.error(f"Error importing langchain_chroma: {e}")
+        raise ImportError(f"Failed to import langchain_chroma: {e}")
+
+    # Use the shared all-MiniLM-L6-v2 embeddings (384 dimensions)
+    logger.info(f"Initializing embeddings and vector store from {persist_directory}")
+    embeddings = get_embeddings()
+
     # Handle potential schema mismatch by creating client settings
     client_settings = chromadb.Settings(
         anonymized_telemetry=False,
@@ -88,67 +232,390 @@ try:
             logger.warning(f"Created chroma_db directory in Streamlit environment at {persist_directory}")
         else:
             logger.info(f"Using existing chroma_db in Streamlit environment at {persist_directory}")
-    
-    try:
-        # First try with allow_reset=True to handle schema migrations
-        vectorstore = Chroma(
-            embedding_function=embeddings,
-            persist_directory=persist_directory,
-            client_settings=client_settings
+
+    # Errors propagate: the persist directory also holds the other collections,
+    # the manifests and the side indexes, so it is never wiped to recover
+    vectorstore = Chroma(
+        collection_name=collection_name,
+        embedding_function=embeddings,
+        persist_directory=persist_directory,
+        client_settings=client_settings
+    )
+    logger.info(f"Successfully initialized Chroma collection {collection_name}")
+    return vectorstore
+
+def get_retriever():
+    """
+    Return the shared retriever, opening the vector store on first use.
+
+    Serves the collection named by active_collection.json and reopens it
+    after a re-index swapped the pointer. If the live collection cannot be
+    opened, the store that is already open keeps serving; on first use the
+    previous collection is tried, then a DummyRetriever is used.
+
+    Returns:
+        The MMR retriever over the Chroma store, or a DummyRetriever
+    """
+    global _vectorstore, _retriever, _pointer_version
+    pointer_version = _pointer_mtime()
+    if _retriever is not None and pointer_version == _pointer_version:
+        return _retriever
+
+    with _lock:
+        if _retriever is not None and pointer_version == _pointer_version:
+            return _retriever
+        if _retriever is not None:
+            logger.info("Live collection changed, reopening the retriever")
+
+        # Open the live collection; if that fails keep the open store, or try the previous collection
+        candidates = [get_active_collection()]
+        if _retriever is None and get_previous_collection():
+            candidates.append(get_previous_collection())
+        vectorstore = None
+        for collection_name in candidates:
+            try:
+                vectorstore = _open_vectorstore(get_persist_directory(), collection_name)
+                break
+            except Exception as e:
+                logger.error(f"Error opening collection {collection_name}: {e}")
+
+        if vectorstore is not None:
+            # Configure the retriever with more comprehensive settings
+            retriever = vectorstore.as_retriever(
+                search_type="mmr",  # Use Maximum Marginal Relevance for better diversity
+                search_kwargs={
+                    "k": 12,  # Increase number of retrieved documents further
+                    "fetch_k": 20,  # Fetch more documents initially before filtering
+                    "lambda_mult": 0.5,  # Better balance between relevance and diversity (lower value = more diversity)
+                }
+            )
+            _vectorstore = vectorstore
+            logger.info("Successfully initialized retriever from Chroma with enhanced retrieval settings")
+        elif _retriever is not None:
+            # The pointer version is not recorded, so the next call tries to reopen again
+            logger.warning("Keeping the currently open collection")
+            return _retriever
+        else:
+            # Use the dummy retriever instead of re-raising
+            logger.warning("Falling back to DummyRetriever")
+            retriever = DummyRetriever()
+
+        _retriever = retriever
+        _pointer_version = pointer_version
+        return retriever
+
+def get_vectorstore():
+    """
+    Return the shared Chroma vector store, opening it on first use.
+
+    Returns:
+        Chroma: The vector store, or None if it could not be opened
+    """
+    get_retriever()
+    return _vectorstore
+
+def warm_up(background=True):
+    """
+    Open the vector store and load the embedding model ahead of the first query.
+
+    Safe to call repeatedly; the work runs once per process.
+
+    Args:
+        background (bool): Run in a daemon thread instead of blocking the caller
+
+    Returns:
+        threading.Thread: The warm-up thread, or None when run in the foreground
+    """
+    global _warm_up_thread
+
+    def run():
+        try:
+            get_retriever()
+            # Load the model weights now rather than on the first question
+            get_embeddings().embed_query("warm up")
+            logger.info("Retriever warm-up finished")
+        except Exception as e:
+            logger.warning(f"Retriever warm-up failed: {e}")
+
+    if not background:
+        run()
+        return None
+
+    with _lock:
+        if _warm_up_thread is None:
+            _warm_up_thread = threading.Thread(target=run, name="retriever-warm-up", daemon=True)
+            _warm_up_thread.start()
+    return _warm_up_thread
+
+def get_index_version():
+    """
+    Return a value that changes whenever the persisted vector store is written.
+
+    Returns:
+        tuple: Modification times of chroma.sqlite3 and of the live collection
+            pointer (0.0 for a missing file)
+    """
+    index_file = os.path.join(get_persist_directory(), "chroma.sqlite3")
+    index_mtime = os.path.getmtime(index_file) if os.path.exists(index_file) else 0.0
+    return (index_mtime, _pointer_mtime() or 0.0)
+
+def _chroma_candidates(collection, query_embedding, n_results, where=None):
+    """Nearest chunks from Chroma's HNSW index as parallel lists of IDs, texts, metadata and vectors."""
+    results = collection.query(
+        query_embeddings=[query_embedding],
+        n_results=n_results,
+        where=where or None,
+        include=["documents", "metadatas", "embeddings"]
+    )
+    # Chroma returns the embeddings as numpy arrays, which have no truth value
+    embeddings = results.get("embeddings")
+    if embeddings is None or len(embeddings) == 0 or embeddings[0] is None or len(embeddings[0]) == 0:
+        return [], [], [], []
+    return results["ids"][0], results["documents"][0], results["metadatas"][0], embeddings[0]
+
+def _exact_candidates(index, query_embedding, n_results, where=None):
+    """Nearest chunks from the in-process exact index, in the same form as _chroma_candidates."""
+    rows, _ = index.search(query_embedding, k=n_results, where=where)
+    return _rows_as_candidates(index, rows)
+
+def _rows_as_candidates(index, rows):
+    rows = list(rows)
+    return (
+        [index.ids[row] for row in rows],
+        [index.documents[row] for row in rows],
+        [index.metadatas[row] for row in rows],
+        list(index.vectors(rows)) if rows else []
+    )
+
+def _matches(metadata, where):
+    return all((metadata or {}).get(field) == value for field, value in (where or {}).items())
+
+def get_relevant_documents_with_embeddings(query, k=12, fetch_k=20, lambda_mult=0.5, where=None, expansions=None):
+    """
+    Retrieve documents with MMR and return the vectors stored for them in Chroma.
+
+    Queries the collection with include=["embeddings"] so callers can score,
+    export or display the chunks without encoding them again. MMR runs on
+    a cached candidate pool per query (see src.mmr), so repeating a query
+    with a larger k only fetches and compares the new candidates. With
+    VECTOR_SEARCH_BACKEND=numpy the candidates come from an in-process exact
+    index (see src.vector_index) instead of Chroma's HNSW index. With hybrid
+    search enabled, the MMR ranking is fused with a BM25 ranking of the
+    collection's inverted index, so exact names, NIP numbers and course
+    codes are found even when their embeddings are not close to the query.
+    Query expansion terms only weight the BM25 ranking; the query is
+    embedded as it is.
+
+    Args:
+        query (str): The query to search for
+        k (int): Number of documents to return
+        fetch_k (int): Number of candidates fetched before MMR (raised to k if smaller)
+        lambda_mult (float): MMR balance between relevance (1) and diversity (0), per call
+        where (dict, optional): Metadata equality filter, e.g. {"source": "Pedoman.pdf"}
+        expansions (list, optional): Weighted (term, weight) expansions of the query
+            (see src.query_expansion), used by the BM25 ranking
+
+    Returns:
+        list: (Document, np.ndarray or None) pairs, in MMR (or fused) order
+    """
+    retriever = get_retriever()
+    collection = getattr(_vectorstore, "_collection", None)
+    if collection is None or isinstance(retriever, DummyRetriever):
+        # No real collection to read vectors from, use the plain retriever
+        return [(doc, None) for doc in retriever.get_relevant_documents(query)]
+
+    import numpy as np
+    from langchain_core.documents import Document
+
+    index_version = get_index_version()
+    exact_index = None
+    if VECTOR_SEARCH_BACKEND == "numpy":
+        try:
+            exact_index = get_vector_index(collection, index_version)
+        except Exception as e:
+            logger.warning(f"Exact vector index unavailable, searching Chroma instead: {e}")
+
+    n_results = max(fetch_k, k)
+    cache_key = (query, json.dumps(where, sort_keys=True), index_version, exact_index is not None)
+    # Take the pool out of the cache: this call owns it until it is put back, so
+    # embedding, search and MMR run without holding the process-wide lock
+    with _mmr_lock:
+        pool = _mmr_cache.pop(cache_key, None)
+
+    if pool is None or len(pool["ids"]) < n_results:
+        query_embedding = get_embeddings().embed_query(query)
+        if exact_index is not None:
+            candidates = _exact_candidates(exact_index, query_embedding, n_results, where)
+        else:
+            candidates = _chroma_candidates(collection, query_embedding, n_results, where)
+        if pool is None:
+            pool = {"selector": MMRSelector(query_embedding), "ids": [], "texts": [], "metadatas": [], "vectors": []}
+
+        # Only candidates this pool has not seen yet extend the similarity matrix
+        known = set(pool["ids"])
+        new = [i for i, doc_id in enumerate(candidates[0]) if doc_id not in known]
+        for field, values in zip(("ids", "texts", "metadatas", "vectors"), candidates):
+            pool[field].extend(values[i] for i in new)
+        if new:
+            pool["selector"].extend([candidates[3][i] for i in new])
+
+    # A pool from an earlier, larger fetch only offers its n_results candidates closest to the query
+    selected = pool["selector"].select(k, lambda_mult, fetch_k=n_results) if pool["ids"] else []
+    ids, texts, metadatas, candidate_embeddings = pool["ids"], pool["texts"], pool["metadatas"], pool["vectors"]
+    ranking = [ids[i] for i in selected]
+    found = {
+        ids[i]: (
+            Document(page_content=texts[i], metadata=dict(metadatas[i] or {})),
+            np.asarray(candidate_embeddings[i], dtype=np.float32)
         )
-        logger.info("Successfully initialized Chroma with client settings")
-    except Exception as e:
-        logger.warning(f"Failed to initialize Chroma with existing DB, trying to recreate: {e}")
-        
-        # If that fails, try to create a clean database by deleting and recreating
+        for i in selected
+    }
+
+    with _mmr_lock:
+        # A concurrent call for the same key may have put its own pool back; keep the larger one
+        other = _mmr_cache.get(cache_key)
+        if other is None or len(other["ids"]) <= len(pool["ids"]):
+            _mmr_cache[cache_key] = pool
+        _mmr_cache.move_to_end(cache_key)
+        while len(_mmr_cache) > MMR_CACHE_SIZE:
+            _mmr_cache.popitem(last=False)
+
+    if not ranking:
+        return []
+
+    if HYBRID_SEARCH_ENABLED:
         try:
-            import shutil
-            # Backup the old directory first
-            if os.path.exists(persist_directory):
-                backup_dir = f"{persist_directory}_backup"
-                logger.info(f"Backing up existing chroma_db to {backup_dir}")
-                if os.path.exists(backup_dir):
-                    shutil.rmtree(backup_dir)
-                shutil.copytree(persist_directory, backup_dir)
-                
-                # Remove the problematic directory
-                shutil.rmtree(persist_directory)
-                os.makedirs(persist_directory, exist_ok=True)
-            
-            # Initialize a fresh Chroma instance
-            vectorstore = Chroma(
-                embedding_function=embeddings,
-                persist_directory=persist_directory
-            )
-            logger.info("Successfully initialized Chroma with a fresh database")
-        except Exception as e2:
-            logger.error(f"Could not recreate Chroma database: {e2}")
-            # Last resort - try memory-only database
-            try:
-                logger.warning("Attempting to create in-memory ChromaDB as last resort")
-                vectorstore = Chroma(
-                    embedding_function=embeddings
+            lexical_index = get_bm25_index(collection)
+            lexical = [
+                doc_id for doc_id, _ in lexical_index.search(query, k=max(fetch_k, k), expansions=expansions)
+                if not where or _matches(lexical_index.document(doc_id)[1], where)
+            ]
+            fused = reciprocal_rank_fusion([ranking, lexical], weights=[RRF_VECTOR_WEIGHT, RRF_BM25_WEIGHT])
+            ranking = [doc_id for doc_id, _ in fused[:k]]
+
+            # Keyword-only hits still need their stored text and vectors
+            missing = [doc_id for doc_id in ranking if doc_id not in found]
+            for doc_id, text, metadata, vector in zip(*_stored_chunks(collection, exact_index, missing)):
+                found[doc_id] = (
+                    Document(page_content=text, metadata=metadata or {}),
+                    np.asarray(vector, dtype=np.float32)
                 )
-                logger.info("Created in-memory ChromaDB instance")
-            except Exception as e3:
-                logger.error(f"Even in-memory DB failed: {e3}")
-                raise
-
-    # Configure the retriever with more comprehensive settings
-    retriever = vectorstore.as_retriever(
-        search_type="mmr",  # Use Maximum Marginal Relevance for better diversity
-        search_kwargs={
-            "k": 12,  # Increase number of retrieved documents further
-            "fetch_k": 20,  # Fetch more documents initially before filtering
-            "lambda_mult": 0.5,  # Better balance between relevance and diversity (lower value = more diversity)
-        }
-    )
-    logger.info("Successfully initialized retriever from Chroma with enhanced retrieval settings")
-except Exception as e:
-    logger.error(f"Error initializing retriever: {e}")
-    # Use the dummy retriever instead of re-raising
-    logger.warning("Falling back to DummyRetriever")
-    retriever = DummyRetriever()
+        except Exception as e:
+            logger.warning(f"BM25 search failed, using vector results only: {e}")
+
+    return [found[doc_id] for doc_id in ranking if doc_id in found]
+
+def _stored_chunks(collection, exact_index, ids):
+    """Stored IDs, texts, metadata and vectors of some chunks, in the same form as _chroma_candidates."""
+    if not ids:
+        return [], [], [], []
+    if exact_index is not None:
+        return _rows_as_candidates(exact_index, exact_index.rows_for(ids))
+    stored = collection.get(ids=ids, include=["documents", "metadatas", "embeddings"])
+    return stored["ids"], stored["documents"], stored["metadatas"], stored["embeddings"]
+
+def get_multi_query_documents_with_embeddings(queries, k=12, fetch_k=20, where=None, expansions=None):
+    """
+    Retrieve documents for several queries at once and fuse their rankings.
+
+    All queries are embedded in one batch and searched in one call: a
+    single batched Chroma query, or one matrix product with
+    VECTOR_SEARCH_BACKEND=numpy. Their similarity rankings, and with hybrid
+    search the BM25 ranking of the first query, are fused with
+    reciprocal-rank fusion. The fused ranking replaces MMR in this mode.
+
+    Args:
+        queries (list): (query, weight) pairs, the question first (see src.multi_query)
+        k (int): Number of documents to return
+        fetch_k (int): Number of candidates fetched per query (raised to k if smaller)
+        where (dict, optional): Metadata equality filter, e.g. {"source": "Pedoman.pdf"}
+        expansions (list, optional): Weighted (term, weight) expansions of the first query for BM25
+
+    Returns:
+        list: (Document, np.ndarray or None) pairs, in fused order
+    """
+    retriever = get_retriever()
+    collection = getattr(_vectorstore, "_collection", None)
+    if collection is None or isinstance(retriever, DummyRetriever):
+        return [(doc, None) for doc in retriever.get_relevant_documents(queries[0][0])]
+
+    import numpy as np
+    from langchain_core.documents import Document
+
+    exact_index = None
+    if VECTOR_SEARCH_BACKEND == "numpy":
+        try:
+            exact_index = get_vector_index(collection, get_index_version())
+        except Exception as e:
+            logger.warning(f"Exact vector index unavailable, searching Chroma instead: {e}")
+
+    n_results = max(fetch_k, k)
+    texts = [query for query, _ in queries]
+    query_embeddings = get_embeddings().embed_documents(texts)
+
+    if exact_index is not None:
+        per_query = [
+            _rows_as_candidates(exact_index, rows)
+            for rows, _ in exact_index.search_many(query_embeddings, k=n_results, where=where)
+        ]
+    else:
+        results = collection.query(
+            query_embeddings=query_embeddings,
+            n_results=n_results,
+            where=where or None,
+            include=["documents", "metadatas", "embeddings"]
+        )
+        per_query = [
+            (results["ids"][i], results["documents"][i], results["metadatas"][i], results["embeddings"][i])
+            for i in range(len(texts))
+        ]
+
+    found = {}
+    rankings, weights = [], []
+    for (_, weight), (ids, documents, metadatas, vectors) in zip(queries, per_query):
+        for doc_id, text, metadata, vector in zip(ids, documents, metadatas, vectors):
+            if doc_id not in found:
+                found[doc_id] = (
+                    Document(page_content=text, metadata=dict(metadata or {})),
+                    np.asarray(vector, dtype=np.float32)
+                )
+        rankings.append(list(ids))
+        weights.append(weight * RRF_VECTOR_WEIGHT)
+
+    if HYBRID_SEARCH_ENABLED:
+        try:
+            lexical_index = get_bm25_index(collection)
+            rankings.append([
+                doc_id for doc_id, _ in lexical_index.search(texts[0], k=n_results, expansions=expansions)
+                if not where or _matches(lexical_index.document(doc_id)[1], where)
+            ])
+            weights.append(RRF_BM25_WEIGHT)
+        except Exception as e:
+            logger.warning(f"BM25 search failed, using vector results only: {e}")
+
+    ranking = [doc_id for doc_id, _ in reciprocal_rank_fusion(rankings, weights=weights)[:k]]
+    missing = [doc_id for doc_id in ranking if doc_id not in found]
+    for doc_id, text, metadata, vector in zip(*_stored_chunks(collection, exact_index, missing)):
+        found[doc_id] = (
+            Document(page_content=text, metadata=metadata or {}),
+            np.asarray(vector, dtype=np.float32)
+        )
+
+    return [found[doc_id] for doc_id in ranking if doc_id in found]
+
+def __getattr__(name):
+    """Keep `from src.retriever import retriever` working; it initializes on first access."""
+    if name == "retriever":
+        return get_retriever()
+    if name == "vectorstore":
+        return get_vectorstore()
+    if name == "persist_directory":
+        return get_persist_directory()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Export retriever for easy import
-__all__ = ['retriever']
\ No newline at end of file
+__all__ = [
+    'get_retriever', 'get_vectorstore', 'get_persist_directory', 'warm_up',
+    'get_active_collection', 'set_active_collection', 'get_previous_collection', 'open_collection',
+    'get_relevant_documents_with_embeddings', 'get_index_version'
+]
\ No newline at end of file
@@ -1,6 +1,12 @@
 import logging
 from typing import Dict, Tuple, List
-from textdistance import levenshtein
+
+try:
+    from src.language import detect_language_profile
+    from src.fuzzy_index import FuzzyIndex, levenshtein_distance
+except ImportError:
+    from language import detect_language_profile
+    from fuzzy_index import FuzzyIndex, levenshtein_distance
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -12,6 +18,8 @@ class SpellChecker:
         self.max_distance = 2  # Maximum Levenshtein distance for suggestions
         self.min_word_length = 3  # Minimum word length to consider for correction
         self.context_aware = True  # Enable context-aware corrections
+        # Deletion index over the correct forms, built once; lookups are memoized per word
+        self.vocabulary = FuzzyIndex(self.common_words.values(), max_distance=self.max_distance)
 
     def _load_common_words(self) -> Dict[str, str]:
         """
@@ -137,23 +145,7 @@ class SpellChecker:
         Detect the language style (formal Indonesian, informal Indonesian, or English)
         based on the text content and common patterns
         """
-        text = text.lower()
-        words = text.split()
-        
-        # Count indicators for each style
-        informal_indicators = sum(1 for word in words if word in ["aku", "gue", "gw", "lu", "km", "kamu", "nih", "dong", "sih"])
-        english_indicators = sum(1 for word in words if all(ord(c) < 128 for c in word))
-        
-        # Calculate proportions
-        total_words = len(words)
-        informal_ratio = informal_indicators / total_words if total_words > 0 else 0
-        english_ratio = english_indicators / total_words if total_words > 0 else 0
-        
-        if english_ratio > 0.7:
-            return "english"
-        elif informal_ratio > 0.3:
-            return "casual"
-        return "formal"
+        return detect_language_profile(text).style
 
     def get_context_aware_suggestions(self, word: str, context: List[str]) -> List[str]:
         """Get spelling suggestions considering surrounding context"""
@@ -161,32 +153,25 @@ class SpellChecker:
         if not context or not base_suggestions:
             return base_suggestions
             
-        # Weight suggestions based on context
+        # Weight suggestions based on context; only context words that are correct forms count
+        known_context = [ctx_word.split() for ctx_word in context if ctx_word in self.vocabulary]
         weighted_suggestions = []
         for suggestion in base_suggestions:
-            weight = sum(1 for ctx_word in context 
-                        if ctx_word in self.common_words.values() 
-                        and any(w in suggestion for w in ctx_word.split()))
+            weight = sum(1 for parts in known_context if any(w in suggestion for w in parts))
             weighted_suggestions.append((suggestion, weight))
             
         return [s for s, _ in sorted(weighted_suggestions, key=lambda x: (-x[1], len(x[0])))]
 
     def get_suggestions(self, word: str) -> List[str]:
         """Get spelling suggestions for a word using Levenshtein distance"""
-        suggestions = []
         word = word.lower()
         
         # First check if it's a common misspelling
         if word in self.common_words:
             return [self.common_words[word]]
         
-        # Then check for similar words using Levenshtein distance
-        for correct_word in set(self.common_words.values()):
-            distance = levenshtein.distance(word, correct_word)
-            if distance <= self.max_distance:
-                suggestions.append(correct_word)
-        
-        return sorted(suggestions, key=lambda x: levenshtein.distance(word, x))
+        # Then look up similar words in the deletion index, closest first
+        return [correct_word for correct_word, _ in self.vocabulary.lookup(word)]
 
     def correct_text(self, text: str) -> Tuple[str, List[Tuple[str, str]]]:
         """
@@ -216,7 +201,7 @@ class SpellChecker:
                 else:
                     suggestions = self.get_suggestions(word)
                     
-                if suggestions and levenshtein.distance(word, suggestions[0]) <= self.max_distance:
+                if suggestions and levenshtein_distance(word, suggestions[0], self.max_distance) <= self.max_distance:
                     correction = (word, suggestions[0])
                     corrections.append(correction)
                     corrected_words.append(suggestions[0])
@@ -2,12 +2,21 @@ import os
 import logging
 from dotenv import load_dotenv
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.vectorstores import Chroma
-from langchain.embeddings import HuggingFaceEmbeddings
 from langchain.docstore.document import Document
-from web_crawler import get_crawled_content
-import PyPDF2
-import re
+try:
+    from src.answer_cache import invalidate_answer_cache
+    from src.retriever import get_vectorstore
+    from src.ingestion import IncrementalIndexer, file_digest, text_digest
+    from src.web_crawler import get_crawled_content
+    from src.pdf_extraction import iter_pdf_pages, iter_pdf_files
+    from src.chunker import iter_chunk_documents
+except ImportError:
+    from answer_cache import invalidate_answer_cache
+    from retriever import get_vectorstore
+    from ingestion import IncrementalIndexer, file_digest, text_digest
+    from web_crawler import get_crawled_content
+    from pdf_extraction import iter_pdf_pages, iter_pdf_files
+    from chunker import iter_chunk_documents
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -16,54 +25,22 @@ logger = logging.getLogger(__name__)
 # Load environment variables from .env file
 load_dotenv()
 
-openai_api_key = os.getenv("OPENAI_API_KEY")
+# Get all PDF files from the dataset directory
+DATASET_DIR = os.path.join(os.path.dirname(__file__), '..', 'dataset')
 
-if not openai_api_key:
-    logger.error("OpenAI API key not set. Please set it in the .env file")
-    raise ValueError("OpenAI API key not set. Please set it in the .env file")
+# Bump when the chunking or chunk metadata changes, so every source is re-synced once
+CHUNKING_VERSION = "3"
 
-try:
-    # Get all PDF files from the dataset directory
-    dataset_dir = os.path.join(os.path.dirname(__file__), '..', 'dataset')
-    if not os.path.exists(dataset_dir):
-        logger.error(f"Dataset directory not found at path: {dataset_dir}")
-        raise FileNotFoundError(f"Dataset directory not found at path: {dataset_dir}")
+# Source name of the crawled website content
+WEB_SOURCE = "web_content"
+
+def is_dataset_source(source):
+    """Check whether a source is a dataset PDF; populate_db.py names the docs/ PDFs 'docs/<file>'."""
+    return source.endswith('.pdf') and '/' not in source
 
-    # Initialize combined text
-    combined_text = ""
-
-    # Process each PDF file in the dataset directory
-    for filename in os.listdir(dataset_dir):
-        if filename.endswith('.pdf'):
-            pdf_path = os.path.join(dataset_dir, filename)
-            logger.info(f"Processing PDF file: {filename}")
-            
-            with open(pdf_path, "rb") as file:
-                reader = PyPDF2.PdfReader(file)
-                for page_num in range(len(reader.pages)):
-                    page = reader.pages[page_num]
-                    extracted_text = page.extract_text()
-                    if extracted_text:
-                        combined_text += f"\n=== Start of {filename} ===\n"
-                        combined_text += extracted_text
-                        combined_text += f"\n=== End of {filename} ===\n"
-
-    logger.info("Successfully extracted text from all PDF files.")
-
-    # Crawl the website
-    logger.info("Starting to crawl the website...")
-    web_content = get_crawled_content()
-    
-    if not web_content:
-        logger.warning("No content fetched from the website.")
-    else:
-        logger.info("Successfully crawled the website.")
-        combined_text += "\n=== Start of Web Content ===\n"
-        combined_text += web_content
-        combined_text += "\n=== End of Web Content ===\n"
-
-    # Split the combined text
-    text_splitter = RecursiveCharacterTextSplitter(
+def build_text_splitter():
+    """Splitter used for the dataset PDFs and the crawled website."""
+    return RecursiveCharacterTextSplitter(
         chunk_size=1500,         # Reduced chunk size to avoid splitting important information
         chunk_overlap=500,       # Substantial overlap to maintain context between chunks
         separators=[
@@ -85,79 +62,118 @@ try:
         keep_separator=True
     )
 
-    # Pre-process text to protect Google Drive links
-    drive_pattern = r'(https://drive\.google\.com/\S+)'
-    
-    # Find all drive links and replace them with special markers
-    drive_links = re.findall(drive_pattern, combined_text)
-    marked_text = combined_text
-    for idx, link in enumerate(drive_links):
-        marker = f"[DRIVE_LINK_{idx}]"
-        marked_text = marked_text.replace(link, marker)
-    
-    # Split the text
-    split_texts = text_splitter.split_text(marked_text)
-    logger.info(f"Split the combined text into {len(split_texts)} chunks.")
-
-    # Restore drive links in chunks
-    restored_texts = []
-    for chunk in split_texts:
-        restored_chunk = chunk
-        for idx, link in enumerate(drive_links):
-            marker = f"[DRIVE_LINK_{idx}]"
-            if marker in chunk:
-                restored_chunk = restored_chunk.replace(marker, link)
-        restored_texts.append(restored_chunk)
-
-    # Create document objects with metadata
-    docs = []
-    for chunk in restored_texts:
-        # Try to determine the source file from the chunk content
-        source = "unknown"
-        for filename in os.listdir(dataset_dir):
-            if filename.endswith('.pdf') and f"=== Start of {filename} ===" in chunk:
-                source = filename
-                break
-        if "=== Start of Web Content ===" in chunk:
-            source = "web_content"
-            
-        # Extract any drive links in this chunk for metadata
-        chunk_links = re.findall(drive_pattern, chunk)
-        
-        docs.append(Document(
-            page_content=chunk,
-            metadata={
-                "source": source,
-                "drive_links": ','.join(chunk_links) if chunk_links else ""  # Join links into a string
-            }
-        ))
-    logger.info("Created document objects from split texts.")
-
-    # Initialize embeddings
-    embeddings = HuggingFaceEmbeddings(
-        model_name="all-MiniLM-L6-v2"
-    )
-    logger.info("Initialized HuggingFace embeddings.")
-
-    # Initialize Chroma vector store
-    persist_directory = "./chroma_db"
-    vectorstore = Chroma.from_documents(
-        documents=docs,
-        embedding=embeddings,
-        persist_directory=persist_directory
-    )
-    logger.info(f"Initialized Chroma vector store at '{persist_directory}'.")
+def iter_pdf_documents(pdf_path, text_splitter, records=None):
+    """
+    Chunks of one PDF as Documents with source, page and offset metadata.
+
+    Args:
+        pdf_path (str): The PDF file
+        text_splitter: Splitter from build_text_splitter()
+        records (list, optional): Already extracted PageRecords of this file
+    """
+    if records is None:
+        records = iter_pdf_pages([pdf_path])
+    filename = os.path.basename(pdf_path)
+    pages = ((record.page + 1, record.text) for record in records)
+    return iter_chunk_documents(pages, filename, text_splitter)
+
+def ingest_dataset(dataset_dir=DATASET_DIR, crawl_web=True, indexer=None):
+    """
+    Bring the vector store in line with the dataset PDFs and the website.
+
+    Unchanged PDFs are skipped without being read, changed ones only have
+    their new chunks embedded, and chunks of removed PDFs are deleted.
 
-    print("Success!")
-except Exception as e:
-    logger.error(f"An error occurred: {e}")
-    print(f"An error occurred: {e}")
+    Args:
+        dataset_dir (str): Directory with the PDF files
+        crawl_web (bool): Also crawl and index the website
+        indexer (IncrementalIndexer, optional): Indexer to write through, e.g. one over
+            a shadow collection; defaults to an indexer over the live vector store
+
+    Returns:
+        dict: Per-source sync statistics; skipped sources map to None
+    """
+    if not os.path.exists(dataset_dir):
+        logger.error(f"Dataset directory not found at path: {dataset_dir}")
+        raise FileNotFoundError(f"Dataset directory not found at path: {dataset_dir}")
+
+    if indexer is None:
+        vectorstore = get_vectorstore()
+        if vectorstore is None:
+            raise ValueError("Vector store is not available")
+        indexer = IncrementalIndexer(vectorstore)
+
+    text_splitter = build_text_splitter()
+    results = {}
+
+    # Find the PDF files in the dataset directory that changed since the last run
+    pdf_sources = []
+    changed = {}
+    for filename in sorted(os.listdir(dataset_dir)):
+        if not filename.endswith('.pdf'):
+            continue
+        pdf_sources.append(filename)
+        pdf_path = os.path.join(dataset_dir, filename)
+
+        fingerprint = f"{file_digest(pdf_path)}:{CHUNKING_VERSION}"
+        if indexer.is_current(filename, fingerprint):
+            logger.info(f"Skipping unchanged PDF file: {filename}")
+            results[filename] = None
+        else:
+            changed[pdf_path] = fingerprint
+
+    # Extract the changed files in parallel and index each one as soon as it is ready
+    indexed = set()
+    for pdf_path, records in iter_pdf_files(list(changed)):
+        indexed.add(pdf_path)
+        filename = os.path.basename(pdf_path)
+        logger.info(f"Processing PDF file: {filename}")
+        docs = iter_pdf_documents(pdf_path, text_splitter, records)
+        results[filename] = indexer.sync_source(filename, changed[pdf_path], docs)
+
+    # Files without pages still replace what was indexed for them
+    for pdf_path in changed.keys() - indexed:
+        filename = os.path.basename(pdf_path)
+        results[filename] = indexer.sync_source(filename, changed[pdf_path], [])
+
+    # Delete the chunks of PDFs that were removed from the dataset
+    indexer.remove_missing(pdf_sources, candidates=[source for source in indexer.sources if is_dataset_source(source)])
+    logger.info("Successfully indexed all PDF files.")
+
+    if crawl_web:
+        # Crawl the website
+        logger.info("Starting to crawl the website...")
+        web_content = get_crawled_content()
+        
+        if not web_content:
+            logger.warning("No content fetched from the website.")
+        else:
+            logger.info("Successfully crawled the website.")
+            fingerprint = f"{text_digest(web_content)}:{CHUNKING_VERSION}"
+            if indexer.is_current(WEB_SOURCE, fingerprint):
+                results[WEB_SOURCE] = None
+            else:
+                docs = iter_chunk_documents([(None, web_content)], WEB_SOURCE, text_splitter, marker_name="Web Content")
+                results[WEB_SOURCE] = indexer.sync_source(WEB_SOURCE, fingerprint, docs)
+
+    # Cached answers may be outdated now that the vector store changed
+    if indexer.changed:
+        invalidate_answer_cache()
+
+    return results
 
 def update_vectorstore(new_content):
     """
     Updates the vector store with new content
+
+    Replaces the chunks of the previous update, so running it again with
+    the same content changes nothing.
     """
     try:
+        if not new_content:
+            logger.warning("No new content to add to the vector store")
+            return
+
         # Create new document objects from the content
         text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=1000,
@@ -172,10 +188,34 @@ def update_vectorstore(new_content):
             metadata={"source": "update"}
         ) for chunk in split_texts]
         
-        # Add new documents to the existing vector store
-        vectorstore.add_documents(new_docs)
-        logger.info(f"Added {len(new_docs)} new documents to vector store")
+        # Sync the documents with the existing vector store
+        indexer = IncrementalIndexer(get_vectorstore())
+        stats = indexer.sync_source("update", text_digest(new_content), new_docs)
+        logger.info(f"Added {stats['added']} new documents to vector store")
+        
+        # Cached answers may be outdated now that the vector store changed
+        if indexer.changed:
+            invalidate_answer_cache()
         
     except Exception as e:
         logger.error(f"Error updating vector store: {e}")
-        raise
\ No newline at end of file
+        raise
+
+def main():
+    openai_api_key = os.getenv("OPENAI_API_KEY")
+
+    if not openai_api_key:
+        logger.error("OpenAI API key not set. Please set it in the .env file")
+        raise ValueError("OpenAI API key not set. Please set it in the .env file")
+
+    try:
+        results = ingest_dataset()
+        changed = [source for source, stats in results.items() if stats]
+        logger.info(f"Vector store is up to date ({len(changed)} of {len(results)} sources changed).")
+        print("Success!")
+    except Exception as e:
+        logger.error(f"An error occurred: {e}")
+        print(f"An error occurred: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Token streaming for the chat UI and the API.
+
+The answer LLM streams its tokens through a LangChain callback. In
+Streamlit the tokens are written straight into the assistant message
+placeholder; the API runs the chain on the event loop and turns tokens,
+stage events and the final answer into Server-Sent Events. Post-processing
+that needs the whole answer still runs once at the end and replaces the
+streamed draft.
+"""
+
+import json
+import asyncio
+import logging
+
+try:
+    from langchain_core.callbacks import BaseCallbackHandler
+except ImportError:
+    # Fall back to a plain base class when langchain is not installed
+    BaseCallbackHandler = object
+
+try:
+    from src.progress import stage_listener, CONDENSE_QUESTION_TAG
+except ImportError:
+    from progress import stage_listener, CONDENSE_QUESTION_TAG
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Cursor shown after the streamed draft while the answer is still coming in
+STREAMING_CURSOR = "▌"
+
+
+class TokenCallbackHandler(BaseCallbackHandler):
+    """LangChain callback handler that passes every new answer token to on_token."""
+
+    # Deliver tokens from the calling thread, also for async chains
+    run_inline = True
+
+    def __init__(self, on_token):
+        self.on_token = on_token
+
+    def on_llm_new_token(self, token, **kwargs):
+        if CONDENSE_QUESTION_TAG in (kwargs.get("tags") or []):
+            return
+        if token:
+            self.on_token(token)
+
+
+class PlaceholderWriter:
+    """
+    Writes a streamed answer into a Streamlit placeholder.
+
+    Args:
+        placeholder: An st.empty() placeholder, e.g. inside st.chat_message
+    """
+
+    def __init__(self, placeholder):
+        self.placeholder = placeholder
+        self.text = ""
+
+    def write(self, token):
+        self.text += token
+        self.placeholder.markdown(self.text + STREAMING_CURSOR)
+
+
+def format_sse(event, data):
+    """Encode one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def astream_events(arun):
+    """
+    Run an async answer function and yield its progress as SSE.
+
+    Yields 'stage' events as pipeline stages finish, 'token' events while
+    the LLM streams, then one 'answer' event with the final result (or an
+    'error' event).
+
+    Args:
+        arun (callable): Async function called with an on_token callback; returns
+            the final answer or a dict that is sent as the 'answer' event
+    """
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    done = object()
+
+    def put(item):
+        # Stage events can come from executor threads (e.g. sync retrievers)
+        loop.call_soon_threadsafe(events.put_nowait, item)
+
+    async def worker():
+        try:
+            with stage_listener(lambda event: put(("stage", event))):
+                answer = await arun(lambda token: put(("token", {"token": token})))
+            put(("answer", answer if isinstance(answer, dict) else {"answer": answer}))
+        except Exception as e:
+            logger.error(f"Error while streaming an answer: {e}", exc_info=True)
+            put(("error", {"detail": str(e)}))
+        finally:
+            put(done)
+
+    task = asyncio.create_task(worker())
+    try:
+        while True:
+            item = await events.get()
+            if item is done:
+                break
+            yield format_sse(*item)
+    finally:
+        # Stop generating when the client disconnects
+        if not task.done():
+            task.cancel()
@@ -0,0 +1,252 @@
+"""
+In-process exact vector search for small corpora.
+
+The whole collection (a few thousand MiniLM vectors) is kept as one
+contiguous float32 matrix of L2-normalized rows, saved next to chroma_db
+and memory-mapped on load. A query is a single matrix-vector product over
+all rows, optionally masked by metadata, which at this size takes well
+under a millisecond and makes asking again for a larger k free. Chunk
+texts and metadata are kept alongside, so a search never touches Chroma.
+The snapshot is rebuilt from the Chroma collection whenever the persisted
+store changed since it was taken.
+"""
+
+import os
+import json
+import logging
+import tempfile
+import threading
+
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _atomic_write(path, write):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".vectors-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class ExactVectorIndex:
+    """
+    Brute-force cosine search over a memory-mapped matrix.
+
+    Args:
+        ids (list): Chunk IDs, one per row
+        matrix (np.ndarray): float32 matrix of L2-normalized vectors, shape (n, dim)
+        documents (list): Chunk texts, one per row
+        metadatas (list): Chunk metadata dicts, one per row
+        source_version (optional): Version of the Chroma store the snapshot was taken from
+    """
+
+    def __init__(self, ids, matrix, documents, metadatas, source_version=None):
+        self.ids = list(ids)
+        self.matrix = matrix
+        self.documents = list(documents)
+        self.metadatas = [metadata or {} for metadata in metadatas]
+        self.source_version = source_version
+        self._field_values = {}
+        self._rows = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _mask(self, where):
+        """Boolean row mask for a {field: value} equality filter."""
+        mask = np.ones(len(self.ids), dtype=bool)
+        for field, value in (where or {}).items():
+            values = self._field_values.get(field)
+            if values is None:
+                values = np.array([metadata.get(field) for metadata in self.metadatas], dtype=object)
+                self._field_values[field] = values
+            mask &= values == value
+        return mask
+
+    def similarities(self, query_vector):
+        """Cosine similarity of the query to every row."""
+        query = np.asarray(query_vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+        return self.matrix @ query
+
+    def search(self, query_vector, k=10, where=None):
+        """
+        Exact top-k search.
+
+        Args:
+            query_vector (array-like): Query embedding
+            k (int): Number of results
+            where (dict, optional): Metadata equality filter, e.g. {"source": "Pedoman.pdf"}
+
+        Returns:
+            tuple: (row indices, similarities), best first
+        """
+        if not self.ids or k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        scores = self.similarities(query_vector)
+        if where:
+            scores = np.where(self._mask(where), scores, -np.inf)
+        k = min(k, len(scores))
+
+        # Partial sort: only the top k are ordered
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        top = top[np.isfinite(scores[top])]
+        return top, scores[top]
+
+    def search_many(self, query_vectors, k=10, where=None):
+        """
+        Exact top-k search for several queries with one matrix product.
+
+        Args:
+            query_vectors (array-like): Query embeddings, one row per query
+            k (int): Number of results per query
+            where (dict, optional): Metadata equality filter applied to every query
+
+        Returns:
+            list: (row indices, similarities) per query, best first
+        """
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        if not self.ids or k <= 0 or not len(queries):
+            return [(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)) for _ in range(len(queries))]
+
+        scores = self.matrix @ _normalize_rows(queries).T
+        if where:
+            scores = np.where(self._mask(where)[:, None], scores, -np.inf)
+        k = min(k, scores.shape[0])
+
+        top = np.argpartition(-scores, k - 1, axis=0)[:k]
+        results = []
+        for column in range(scores.shape[1]):
+            rows = top[:, column]
+            rows = rows[np.argsort(-scores[rows, column], kind="stable")]
+            rows = rows[np.isfinite(scores[rows, column])]
+            results.append((rows, scores[rows, column]))
+        return results
+
+    def rows_for(self, ids):
+        """Row indices of the given chunk IDs; unknown IDs are skipped."""
+        if self._rows is None:
+            self._rows = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        return [self._rows[doc_id] for doc_id in ids if doc_id in self._rows]
+
+    def vectors(self, rows):
+        """Stored (normalized) vectors of some rows."""
+        return np.asarray(self.matrix[rows], dtype=np.float32)
+
+    def save(self, path):
+        """Write the matrix as .npy and the rows' IDs, texts and metadata as a JSON sidecar."""
+        matrix = np.ascontiguousarray(self.matrix, dtype=np.float32)
+        _atomic_write(path, lambda f: np.save(f, matrix))
+        sidecar = json.dumps({
+            "version": SNAPSHOT_VERSION,
+            "source_version": self.source_version,
+            "ids": self.ids,
+            "documents": self.documents,
+            "metadatas": self.metadatas,
+        }, ensure_ascii=False).encode("utf-8")
+        _atomic_write(f"{path}.json", lambda f: f.write(sidecar))
+
+    @classmethod
+    def load(cls, path):
+        """Load a snapshot with the matrix memory-mapped, or return None if it is missing or unreadable."""
+        try:
+            with open(f"{path}.json", "r", encoding="utf-8") as f:
+                sidecar = json.load(f)
+            if sidecar.get("version") != SNAPSHOT_VERSION:
+                return None
+            matrix = np.load(path, mmap_mode="r")
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load vector snapshot {path}: {e}")
+            return None
+
+        if matrix.shape[0] != len(sidecar["ids"]):
+            logger.warning(f"Vector snapshot {path} is inconsistent, ignoring it")
+            return None
+        return cls(sidecar["ids"], matrix, sidecar["documents"], sidecar["metadatas"],
+                   source_version=sidecar.get("source_version"))
+
+    @classmethod
+    def from_collection(cls, collection, source_version=None, batch_size=1000):
+        """Snapshot every vector, text and metadata of a Chroma collection."""
+        ids, vectors, documents, metadatas = [], [], [], []
+        offset = 0
+        while True:
+            batch = collection.get(include=["embeddings", "documents", "metadatas"], limit=batch_size, offset=offset)
+            if not batch["ids"]:
+                break
+            ids.extend(batch["ids"])
+            vectors.extend(batch["embeddings"])
+            documents.extend(batch["documents"])
+            metadatas.extend(batch["metadatas"])
+            offset += len(batch["ids"])
+
+        matrix = np.asarray(vectors, dtype=np.float32)
+        matrix = _normalize_rows(matrix) if len(matrix) else np.zeros((0, 0), dtype=np.float32)
+        logger.info(f"Built exact vector index over {len(ids)} chunks of {collection.name}")
+        return cls(ids, matrix, documents, metadatas, source_version=source_version)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def snapshot_path(collection_name):
+    """Vector snapshot file of a collection, inside the Chroma persist directory."""
+    try:
+        from src.retriever import get_persist_directory
+    except ImportError:
+        from retriever import get_persist_directory
+    return os.path.join(get_persist_directory(), f"vectors_{collection_name}.npy")
+
+
+def get_vector_index(collection, source_version):
+    """
+    Return the exact index of a Chroma collection, rebuilding it if the store changed.
+
+    Args:
+        collection: The chromadb collection (e.g. vectorstore._collection)
+        source_version: Current version of the persisted store (see retriever.get_index_version)
+
+    Returns:
+        ExactVectorIndex: Index matching source_version
+    """
+    # JSON turns tuples into lists, compare in that form
+    source_version = json.loads(json.dumps(source_version))
+    with _indexes_lock:
+        index = _indexes.get(collection.name)
+        if index is not None and index.source_version == source_version:
+            return index
+
+        path = snapshot_path(collection.name)
+        index = ExactVectorIndex.load(path)
+        if index is None or index.source_version != source_version:
+            index = ExactVectorIndex.from_collection(collection, source_version=source_version)
+            try:
+                index.save(path)
+            except OSError as e:
+                logger.warning(f"Could not save vector snapshot {path}: {e}")
+        _indexes[collection.name] = index
+        return index
@@ -0,0 +1,91 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Make the src package importable when pytest is run from any directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def cosine(a, b):
+    norm = np.linalg.norm(a) * np.linalg.norm(b)
+    return float(np.dot(a, b) / norm) if norm else 0.0
+
+
+class FakeCollection:
+    """In-memory stand-in for the chromadb collection behind a LangChain Chroma store."""
+
+    def __init__(self, name="test"):
+        self.name = name
+        self.rows = {}  # ID -> (embedding, document, metadata)
+        self.upserted = []
+
+    def count(self):
+        return len(self.rows)
+
+    def get(self, ids=None, where=None, include=None, limit=None, offset=None):
+        selected = [
+            doc_id for doc_id in self.rows
+            if (ids is None or doc_id in ids)
+            and all(self.rows[doc_id][2].get(key) == value for key, value in (where or {}).items())
+        ]
+        selected = selected[offset or 0:][:limit]
+        return {
+            "ids": selected,
+            "embeddings": [self.rows[doc_id][0] for doc_id in selected],
+            "documents": [self.rows[doc_id][1] for doc_id in selected],
+            "metadatas": [self.rows[doc_id][2] for doc_id in selected],
+        }
+
+    def query(self, query_embeddings, n_results=10, where=None, include=None):
+        """Nearest rows by cosine similarity, one result list per query like chromadb."""
+        selected = self.get(where=where)["ids"]
+        results = {"ids": [], "documents": [], "metadatas": [], "embeddings": []}
+        for query in np.asarray(query_embeddings, dtype=np.float32):
+            scores = [cosine(self.rows[doc_id][0], query) for doc_id in selected]
+            top = [selected[i] for i in np.argsort(-np.array(scores), kind="stable")[:n_results]]
+            results["ids"].append(top)
+            results["documents"].append([self.rows[doc_id][1] for doc_id in top])
+            results["metadatas"].append([self.rows[doc_id][2] for doc_id in top])
+            results["embeddings"].append([self.rows[doc_id][0] for doc_id in top])
+        return results
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self.upserted.extend(ids)
+        for row in zip(ids, embeddings, documents, metadatas):
+            self.rows[row[0]] = (row[1], row[2], dict(row[3]))
+
+    def update(self, ids, metadatas):
+        for doc_id, metadata in zip(ids, metadatas):
+            embedding, document, _ = self.rows[doc_id]
+            self.rows[doc_id] = (embedding, document, dict(metadata))
+
+
+class FakeVectorStore:
+    def __init__(self, name="test"):
+        self._collection = FakeCollection(name)
+        self.deleted = []
+
+    def delete(self, ids):
+        self.deleted.extend(ids)
+        for doc_id in ids:
+            self._collection.rows.pop(doc_id, None)
+
+
+class FakeEncoder:
+    def encode(self, texts, batch_size=32):
+        return np.array([[float(len(text)), 1.0] for text in texts], dtype=np.float32)
+
+
+@pytest.fixture
+def vectorstore():
+    return FakeVectorStore()
+
+
+@pytest.fixture
+def fake_encoder(monkeypatch):
+    """Route ingestion-time embedding to a tiny deterministic encoder."""
+    from src import embedding_writer
+
+    monkeypatch.setattr(embedding_writer, "get_encoder", lambda model_name=None: FakeEncoder())
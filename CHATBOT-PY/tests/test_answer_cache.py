@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from src import answer_cache
+from src.answer_cache import SemanticAnswerCache, normalize_question
+
+
+class WordEncoder:
+    """Bag-of-words encoder over a fixed vocabulary."""
+
+    VOCABULARY = ["cara", "daftar", "kkn", "jadwal", "sidang", "skripsi"]
+
+    def encode(self, text):
+        words = text.split()
+        return np.array([words.count(word) for word in self.VOCABULARY], dtype=np.float32)
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(answer_cache.time, "time", clock)
+    return clock
+
+
+def make_cache(**kwargs):
+    return SemanticAnswerCache(encoder=WordEncoder(), threshold=0.9, **kwargs)
+
+
+def test_normalize_question():
+    assert normalize_question("  Cara DAFTAR kkn?!  ") == "cara daftar kkn"
+
+
+def test_similar_question_in_the_same_language_hits(clock):
+    cache = make_cache()
+    cache.store("Cara daftar KKN?", "id", "Isi formulir.", sources=["kkn.pdf"])
+
+    hit = cache.lookup("cara daftar kkn", "id")
+    assert hit["answer"] == "Isi formulir."
+    assert hit["sources"] == ["kkn.pdf"]
+    assert hit["similarity"] == pytest.approx(1.0)
+    assert cache.lookup("cara daftar kkn", "en") is None
+    assert cache.lookup("jadwal sidang skripsi", "id") is None
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = make_cache(ttl_seconds=60)
+    cache.store("cara daftar kkn", "id", "Isi formulir.")
+
+    clock.now += 60
+    assert cache.lookup("cara daftar kkn", "id") is not None
+    clock.now += 1
+    assert cache.lookup("cara daftar kkn", "id") is None
+
+
+def test_expired_entries_are_dropped_on_store(clock):
+    cache = make_cache(ttl_seconds=60)
+    cache.store("cara daftar kkn", "id", "Isi formulir.")
+    clock.now += 61
+    cache.store("jadwal sidang skripsi", "id", "Setiap bulan.")
+    assert [entry["question"] for entry in cache._entries] == ["jadwal sidang skripsi"]
+
+
+def test_vector_store_version_change_invalidates_entries(clock):
+    version = {"value": 1}
+    cache = make_cache(version_fn=lambda: version["value"])
+    cache.store("cara daftar kkn", "id", "Isi formulir.")
+
+    version["value"] = 2
+    assert cache.lookup("cara daftar kkn", "id") is None
+    cache.store("cara daftar kkn", "id", "Daftar online.")
+    assert cache.lookup("cara daftar kkn", "id")["answer"] == "Daftar online."
+    assert len(cache._entries) == 1
+
+
+def test_invalidate_forgets_every_answer(clock):
+    cache = make_cache()
+    cache.store("cara daftar kkn", "id", "Isi formulir.")
+    cache.invalidate()
+    assert cache.lookup("cara daftar kkn", "id") is None
+
+
+def test_oldest_entries_are_dropped_beyond_max_entries(clock):
+    cache = make_cache(max_entries=2)
+    for question in ["cara daftar kkn", "jadwal sidang", "sidang skripsi"]:
+        clock.now += 1
+        cache.store(question, "id", question.upper())
+    assert [entry["question"] for entry in cache._entries] == ["jadwal sidang", "sidang skripsi"]
+    assert cache._matrix.shape == (2, len(WordEncoder.VOCABULARY))
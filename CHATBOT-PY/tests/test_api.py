@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("langchain_openai")
+pytest.importorskip("langchain_community")
+
+from fastapi import HTTPException
+
+from src.api import api
+from src.api.chat_history import SessionHistoryStore
+from src.api.models import ChatMessage, QueryRequest
+from src.progress import LLM_DONE, LLM_FIRST_TOKEN
+
+
+class StubChain:
+    """Answers every query after a short await, driving the callbacks like a streaming LLM."""
+
+    def __init__(self, answer="Pendaftaran KKN dibuka bulan Mei."):
+        self.answer = answer
+        self.calls = []
+        self.running = 0
+        self.max_running = 0
+
+    async def ainvoke(self, inputs, config):
+        self.calls.append((inputs, config))
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(0.01)
+            for handler in config["callbacks"]:
+                handler.on_llm_new_token("Pendaftaran")
+            for handler in config["callbacks"]:
+                if hasattr(handler, "on_llm_end"):
+                    handler.on_llm_end(None)
+        finally:
+            self.running -= 1
+        return {"answer": self.answer} if self.answer is not None else {}
+
+
+@pytest.fixture
+def chain(monkeypatch):
+    stub = StubChain()
+    monkeypatch.setattr(api, "get_conversational_chain", lambda: stub)
+    monkeypatch.setattr(api, "session_store", SessionHistoryStore())
+    return stub
+
+
+def run_with_slots(monkeypatch, slots, *requests):
+    """Answer the requests concurrently on a fresh event loop with its own LLM slots."""
+    async def run():
+        # The module semaphore is bound to the first loop that waits on it
+        monkeypatch.setattr(api, "llm_slots", asyncio.Semaphore(slots))
+        return await asyncio.gather(*(api.answer_query(request) for request in requests))
+    return asyncio.run(run())
+
+
+def test_query_returns_the_answer_with_session_and_stages(chain, monkeypatch):
+    response, = run_with_slots(monkeypatch, 4, QueryRequest(query="kapan kkn?", session_id="s1"))
+
+    assert response["answer"] == chain.answer
+    assert response["session_id"] == "s1"
+    assert [event["stage"] for event in response["stages"]] == [LLM_FIRST_TOKEN, LLM_DONE]
+    inputs, config = chain.calls[0]
+    assert inputs == {"input": "kapan kkn?"}
+    assert config["configurable"] == {"session_id": "s1"}
+
+
+def test_query_without_session_id_starts_a_seeded_session(chain, monkeypatch):
+    history = [ChatMessage(type="human", content="halo"), ChatMessage(type="ai", content="hai")]
+    response, = run_with_slots(monkeypatch, 4, QueryRequest(query="kapan kkn?", chat_history=history))
+
+    session_id = response["session_id"]
+    assert session_id
+    assert [m.content for m in api.session_store.get(session_id).messages] == ["halo", "hai"]
+
+
+def test_missing_answer_is_a_server_error(chain, monkeypatch):
+    chain.answer = None
+
+    with pytest.raises(HTTPException) as error:
+        run_with_slots(monkeypatch, 4, QueryRequest(query="kapan kkn?"))
+    assert error.value.status_code == 500
+
+
+def test_llm_slots_bound_the_concurrent_chain_runs(chain, monkeypatch):
+    responses = run_with_slots(monkeypatch, 2, *(QueryRequest(query=f"q{i}") for i in range(6)))
+    assert [response["answer"] for response in responses] == [chain.answer] * 6
+    assert chain.max_running == 2
+
+
+def test_stream_sends_tokens_then_the_answer(chain, monkeypatch):
+    async def run():
+        monkeypatch.setattr(api, "llm_slots", asyncio.Semaphore(1))
+        response = await api.stream_query(QueryRequest(query="kapan kkn?", session_id="s1"))
+        return [chunk async for chunk in response.body_iterator]
+
+    chunks = asyncio.run(run())
+    assert [chunk.split("\n")[0] for chunk in chunks] == [
+        "event: stage", "event: token", "event: stage", "event: answer"
+    ]
+    assert f'"answer": "{chain.answer}"' in chunks[-1]
+    assert '"session_id": "s1"' in chunks[-1]
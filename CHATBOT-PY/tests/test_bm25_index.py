@@ -0,0 +1,116 @@
+import math
+from collections import Counter
+
+import pytest
+
+from src.bm25_index import BM25Index, build_from_collection, tokenize
+from src.fusion import reciprocal_rank_fusion
+
+TEXTS = {
+    "a": "Kurikulum SI-2011 berlaku untuk angkatan 2011 dan 2012.",
+    "b": "Kurikulum 2020 program studi sistem informasi, lihat pasal 1.2.3.",
+    "c": "Jadwal sidang skripsi diumumkan oleh program studi setiap bulan.",
+    "d": "Pendaftaran KKN dibuka setiap semester; syarat KKN ada di pedoman KKN.",
+}
+
+
+def reference_bm25(texts, query, k1=1.5, b=0.75):
+    """Textbook BM25 over the same tokenizer, scoring every document."""
+    docs = {doc_id: Counter(tokenize(text)) for doc_id, text in texts.items()}
+    average_length = sum(sum(terms.values()) for terms in docs.values()) / len(docs)
+    scores = {}
+    for doc_id, terms in docs.items():
+        length = sum(terms.values())
+        score = 0.0
+        for term, query_frequency in Counter(tokenize(query)).items():
+            containing = sum(1 for other in docs.values() if term in other)
+            if not terms[term]:
+                continue
+            idf = math.log(1 + (len(docs) - containing + 0.5) / (containing + 0.5))
+            norm = k1 * (1 - b + b * length / average_length)
+            score += query_frequency * idf * terms[term] * (k1 + 1) / (terms[term] + norm)
+        if score:
+            scores[doc_id] = score
+    return scores
+
+
+@pytest.fixture
+def index():
+    index = BM25Index()
+    index.add_texts(list(TEXTS), list(TEXTS.values()))
+    return index
+
+
+def test_tokenize_keeps_identifiers_and_their_parts():
+    assert tokenize("Kurikulum SI-2011") == ["kurikulum", "si-2011", "si2011", "si", "2011"]
+    assert tokenize("pasal 1.2.3") == ["pasal", "1.2.3", "123", "1", "2", "3"]
+    assert tokenize("https://drive.google.com/x") == ["https", "drive.google.com/x", "drivegooglecomx",
+                                                    "drive", "google", "com", "x"]
+
+
+def test_tokenize_drops_stopwords_and_punctuation():
+    assert tokenize("Apa itu KKN, dan untuk siapa?") == ["apa", "kkn", "siapa"]
+
+
+@pytest.mark.parametrize("query", ["kurikulum si-2011", "SI2011", "kkn", "program studi sistem informasi", "1.2.3"])
+def test_search_matches_reference_bm25(index, query):
+    expected = reference_bm25(TEXTS, query)
+    results = index.search(query, k=10)
+    assert dict(results) == pytest.approx(expected)
+    assert [score for _, score in results] == sorted(expected.values(), reverse=True)
+
+
+def test_identifier_query_finds_the_chunk_with_that_identifier(index):
+    assert index.search("si-2011", k=1)[0][0] == "a"
+    assert index.search("si2011", k=1)[0][0] == "a"
+
+
+def test_expansions_add_weighted_terms(index):
+    assert index.search("tugas akhir") == []
+    results = index.search("tugas akhir", expansions=[("skripsi", 0.5)])
+    assert [doc_id for doc_id, _ in results] == ["c"]
+    assert results[0][1] == pytest.approx(0.5 * index.search("skripsi")[0][1])
+
+
+def test_removed_and_replaced_chunks_leave_no_postings(index):
+    index.remove(["d"])
+    assert index.search("kkn") == []
+    index.add_texts(["c"], ["KKN tematik"])
+    assert [doc_id for doc_id, _ in index.search("kkn")] == ["c"]
+    assert index.search("skripsi") == []
+    remaining = {"a": TEXTS["a"], "b": TEXTS["b"], "c": "KKN tematik"}
+    assert dict(index.search("kurikulum")) == pytest.approx(reference_bm25(remaining, "kurikulum"))
+
+
+def test_save_and_load_round_trip(index, tmp_path):
+    index.path = str(tmp_path / "bm25.json")
+    index.update_metadata(["a"], [{"source": "kurikulum.pdf"}])
+    index.save()
+    assert not index.dirty
+
+    loaded = BM25Index.load(index.path)
+    assert len(loaded) == len(TEXTS)
+    assert loaded.document("a") == (TEXTS["a"], {"source": "kurikulum.pdf"})
+    assert loaded.search("kurikulum si-2011") == index.search("kurikulum si-2011")
+
+
+def test_build_from_collection_reads_every_batch(vectorstore, tmp_path):
+    collection = vectorstore._collection
+    collection.upsert(list(TEXTS), [[0.0]] * len(TEXTS), list(TEXTS.values()), [{}] * len(TEXTS))
+    index = build_from_collection(BM25Index(str(tmp_path / "bm25.json")), collection, batch_size=3)
+    assert len(index) == len(TEXTS)
+    assert (tmp_path / "bm25.json").exists()
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a"]], k=60)
+    assert fused == [
+        ("a", pytest.approx(1 / 61 + 1 / 62)),
+        ("c", pytest.approx(1 / 63 + 1 / 61)),
+        ("b", pytest.approx(1 / 62)),
+    ]
+
+
+def test_reciprocal_rank_fusion_weights_and_ties():
+    assert reciprocal_rank_fusion([["a"], ["b"]], k=1) == [("a", 0.5), ("b", 0.5)]
+    assert reciprocal_rank_fusion([["a"], ["b"]], k=1, weights=[0.0, 2.0]) == [("b", 1.0)]
@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("langchain_community")
+pytest.importorskip("pydantic")
+
+from src.api import chat_history
+from src.api.chat_history import SessionHistoryStore
+from src.api.models import ChatMessage
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.time of the session store."""
+    now = [1000.0]
+    monkeypatch.setattr(chat_history, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def test_each_session_has_its_own_history():
+    store = SessionHistoryStore()
+    store.get("a").add_user_message("kapan kkn?")
+    store.get("b").add_user_message("syarat wisuda?")
+
+    assert store.get("a") is store.get("a")
+    assert [m.content for m in store.get("a").messages] == ["kapan kkn?"]
+    assert [m.content for m in store.get("b").messages] == ["syarat wisuda?"]
+
+
+def test_seed_only_fills_an_empty_session():
+    store = SessionHistoryStore()
+    store.seed("a", [ChatMessage(type="human", content="halo"), ChatMessage(type="ai", content="hai")])
+    store.seed("a", [ChatMessage(type="human", content="lagi")])
+    store.seed("b", [])
+
+    assert [(m.type, m.content) for m in store.get("a").messages] == [("human", "halo"), ("ai", "hai")]
+    assert store.get("b").messages == []
+
+
+def test_idle_session_expires_after_the_ttl(clock):
+    store = SessionHistoryStore(ttl_seconds=60)
+    store.get("a").add_user_message("halo")
+
+    clock[0] += 60
+    assert len(store.get("a").messages) == 1
+
+    clock[0] += 61
+    assert store.get("a").messages == []
+
+
+def test_expired_sessions_are_dropped_on_access(clock):
+    store = SessionHistoryStore(ttl_seconds=60)
+    store.get("a")
+    clock[0] += 30
+    store.get("b")
+    clock[0] += 40
+    store.get("c")
+
+    assert list(store._sessions) == ["b", "c"]
+
+
+def test_least_recently_used_session_is_evicted(clock):
+    store = SessionHistoryStore(max_sessions=2)
+    store.get("a").add_user_message("halo")
+    store.get("b")
+    store.get("a")
+    store.get("c")
+
+    assert list(store._sessions) == ["a", "c"]
+    assert len(store.get("a").messages) == 1
+    assert store.get("b").messages == []
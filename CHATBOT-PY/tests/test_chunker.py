@@ -0,0 +1,65 @@
+import pytest
+
+pytest.importorskip("langchain")
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from src.chunker import iter_chunk_documents, original_offset, protect_links, restore_links
+
+LINK_A = "https://drive.google.com/file/d/aaaaaaaaaaaaaaaaaaaaaaaa/view"
+LINK_B = "https://drive.google.com/file/d/bbbbbbbbbbbbbbbbbbbbbbbb/view"
+
+
+def document_text(pages, marker_name):
+    """The text iter_chunk_documents splits, rebuilt to check the offsets against."""
+    return "".join(
+        f"\n=== Start of {marker_name} ===\n{text}\n=== End of {marker_name} ===\n"
+        for _, text in pages if text
+    )
+
+
+def test_protect_links_round_trip():
+    text = f"Kurikulum: {LINK_A} dan pedoman {LINK_B} ."
+    marked, links, anchors = protect_links(text)
+    assert marked == "Kurikulum: [DRIVE_LINK_0] dan pedoman [DRIVE_LINK_1] ."
+    assert links == [LINK_A, LINK_B]
+    assert restore_links(marked, links) == text
+
+    anchor_offsets = [marked_offset for marked_offset, _ in anchors]
+    for word in ("dan", "pedoman", "."):
+        marked_start = marked.index(word)
+        assert text[original_offset(marked_start, anchors, anchor_offsets):].startswith(word)
+
+
+def test_chunk_offsets_pages_and_links_point_into_the_original_text():
+    pages = [
+        (1, "Pendaftaran KKN dilakukan secara online. " * 8),
+        (2, ""),
+        (3, f"Dokumen kurikulum tersedia di {LINK_A} dan buku pedoman di {LINK_B}. " * 3),
+        (4, "Sidang skripsi dijadwalkan setiap bulan oleh program studi. " * 8),
+    ]
+    splitter = RecursiveCharacterTextSplitter(chunk_size=200, chunk_overlap=40)
+    text = document_text(pages, "kkn.pdf")
+
+    chunks = list(iter_chunk_documents(pages, "kkn.pdf", splitter))
+    assert len(chunks) > 4
+    for chunk in chunks:
+        start = chunk.metadata["start_index"]
+        assert text[start:start + len(chunk.page_content)] == chunk.page_content
+        assert chunk.metadata["source"] == "kkn.pdf"
+        assert chunk.metadata["page"] in (1, 3, 4)
+        assert chunk.metadata["page"] <= chunk.metadata["page_end"]
+        assert "DRIVE_LINK" not in chunk.page_content
+        for link in filter(None, chunk.metadata["drive_links"].split(",")):
+            assert link in (LINK_A, LINK_B) and link in chunk.page_content
+
+    assert {chunk.metadata["page"] for chunk in chunks} == {1, 3, 4}
+
+
+def test_documents_without_pages_or_text():
+    splitter = RecursiveCharacterTextSplitter(chunk_size=200, chunk_overlap=0)
+    assert list(iter_chunk_documents([(None, "")], "web", splitter)) == []
+
+    chunks = list(iter_chunk_documents([(None, "Profil program studi.")], "web", splitter, marker_name="Web Content"))
+    assert "=== Start of Web Content ===" in chunks[0].page_content
+    assert "page" not in chunks[0].metadata
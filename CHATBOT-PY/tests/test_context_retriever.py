@@ -0,0 +1,48 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+pytest.importorskip("dotenv")
+
+from langchain_core.documents import Document
+
+from src.context_retriever import ContextInjectionRetriever, injected_context
+
+
+class RecordingRetriever:
+    def __init__(self, documents):
+        self.documents = documents
+        self.queries = []
+
+    def get_relevant_documents(self, query):
+        self.queries.append(query)
+        return self.documents
+
+
+def test_injected_documents_replace_the_search():
+    base = RecordingRetriever([Document(page_content="searched")])
+    retriever = ContextInjectionRetriever(base_retriever=base)
+    ranked = [Document(page_content="ranked 1"), Document(page_content="ranked 2")]
+
+    with injected_context(ranked):
+        assert retriever.get_relevant_documents("cara daftar kkn") == ranked
+    assert base.queries == []
+
+
+def test_base_retriever_is_used_without_injected_documents():
+    searched = [Document(page_content="searched")]
+    base = RecordingRetriever(searched)
+    retriever = ContextInjectionRetriever(base_retriever=base)
+
+    with injected_context([]):
+        assert retriever.get_relevant_documents("q1") == searched
+    assert retriever.get_relevant_documents("q2") == searched
+    assert base.queries == ["q1", "q2"]
+
+
+def test_injection_ends_with_the_block():
+    base = RecordingRetriever([])
+    retriever = ContextInjectionRetriever(base_retriever=base)
+    with injected_context([Document(page_content="ranked")]):
+        pass
+    retriever.get_relevant_documents("q")
+    assert base.queries == ["q"]
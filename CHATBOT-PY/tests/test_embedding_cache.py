@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+
+from src.embedding_cache import EmbeddingCache, cache_key, cached_encode
+
+DIM = 4
+
+
+def vector(value):
+    return np.full(DIM, value, dtype=np.float32)
+
+
+@pytest.fixture
+def make_cache(tmp_path):
+    caches = []
+
+    def make(**kwargs):
+        cache = EmbeddingCache("test/model", DIM, cache_dir=str(tmp_path), **kwargs)
+        caches.append(cache)
+        return cache
+
+    yield make
+    for cache in caches:
+        cache.close()
+
+
+class CountingEncoder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return np.vstack([vector(len(text)) for text in texts])
+
+
+def test_cache_key_ignores_whitespace_differences():
+    assert cache_key("m", "a  b\n c") == cache_key("m", " a b c ")
+    assert cache_key("m", "a b") != cache_key("other", "a b")
+
+
+def test_pending_vectors_are_served_before_they_are_written(make_cache):
+    cache = make_cache(write_batch=100, write_interval=3600)
+    cache.put_many(["one"], [vector(1)])
+    cache._memory.clear()
+    np.testing.assert_array_equal(cache.get_many(["one", "two"])[0], vector(1))
+    assert cache.get_many(["two"]) == [None]
+
+
+def test_flushed_vectors_survive_a_new_instance(make_cache):
+    cache = make_cache(write_batch=100, write_interval=3600)
+    cache.put_many(["one", "two"], [vector(1), vector(2)])
+    cache.flush()
+
+    reopened = make_cache()
+    one, two, three = reopened.get_many(["one", "two", "three"])
+    np.testing.assert_array_equal(one, vector(1))
+    np.testing.assert_array_equal(two, vector(2))
+    assert three is None
+
+
+def test_batch_size_triggers_a_write(make_cache):
+    cache = make_cache(write_batch=2, write_interval=3600)
+    cache.put_many(["one"], [vector(1)])
+    assert len(cache._pending) == 1
+    cache.put_many(["two"], [vector(2)])
+    assert not cache._pending
+    assert cache._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0] == 2
+
+
+def test_full_cache_evicts_the_least_recently_used_entry(make_cache):
+    cache = make_cache(max_entries=2, memory_entries=0, write_batch=1)
+    cache.put_many(["old"], [vector(1)])
+    cache.put_many(["recent"], [vector(2)])
+    # Reading "old" makes "recent" the least recently used entry
+    cache.get_many(["old"])
+    cache.flush()
+    cache.put_many(["new"], [vector(3)])
+
+    old, recent, new = cache.get_many(["old", "recent", "new"])
+    np.testing.assert_array_equal(old, vector(1))
+    assert recent is None
+    np.testing.assert_array_equal(new, vector(3))
+
+
+def test_cached_encode_only_encodes_missing_texts(make_cache):
+    cache = make_cache()
+    encoder = CountingEncoder()
+    first = cached_encode(cache, ["a", "bb"], encoder)
+    second = cached_encode(cache, ["bb", "ccc"], encoder)
+
+    assert encoder.calls == [["a", "bb"], ["ccc"]]
+    np.testing.assert_array_equal(first, np.vstack([vector(1), vector(2)]))
+    np.testing.assert_array_equal(second, np.vstack([vector(2), vector(3)]))
+
+
+def test_cached_encode_falls_back_to_encoding_when_the_cache_fails():
+    class BrokenCache:
+        dim = DIM
+
+        def get_many(self, texts):
+            raise RuntimeError("database is locked")
+
+        def put_many(self, texts, vectors):
+            raise RuntimeError("database is locked")
+
+    encoder = CountingEncoder()
+    result = cached_encode(BrokenCache(), ["a", "bb"], encoder)
+    assert encoder.calls == [["a", "bb"]]
+    np.testing.assert_array_equal(result, np.vstack([vector(1), vector(2)]))
+
+
+def test_cached_encode_without_cache():
+    encoder = CountingEncoder()
+    np.testing.assert_array_equal(cached_encode(None, ["a"], encoder), vector(1).reshape(1, -1))
@@ -0,0 +1,58 @@
+import itertools
+
+import pytest
+
+from src import embedding_writer
+from src.embedding_writer import EmbeddingWriter, iter_batches
+
+
+class Doc:
+    def __init__(self, page_content, **metadata):
+        self.page_content = page_content
+        self.metadata = metadata
+
+
+@pytest.fixture(autouse=True)
+def no_side_indexes(monkeypatch):
+    monkeypatch.setattr(embedding_writer, "get_bm25_index_for", lambda store: None)
+    monkeypatch.setattr(embedding_writer, "get_near_duplicate_index_for", lambda store: None)
+
+
+def test_iter_batches_pulls_items_lazily():
+    consumed = []
+    items = (consumed.append(i) or i for i in itertools.count())
+    batches = iter_batches(items, 3)
+    assert next(batches) == [0, 1, 2]
+    assert consumed == [0, 1, 2]
+    assert list(iter_batches(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+
+def test_write_upserts_in_batches(vectorstore, fake_encoder, monkeypatch):
+    batches = []
+    upsert = vectorstore._collection.upsert
+    monkeypatch.setattr(vectorstore._collection, "upsert",
+                        lambda ids, **kwargs: batches.append(list(ids)) or upsert(ids, **kwargs))
+
+    items = ((f"id{i}", Doc(f"chunk\n{i}", source="a.pdf")) for i in range(5))
+    stats = EmbeddingWriter(vectorstore, batch_size=2).write(items)
+
+    assert stats["written"] == 5
+    assert batches == [["id0", "id1"], ["id2", "id3"], ["id4"]]
+    embedding, document, metadata = vectorstore._collection.rows["id3"]
+    assert document == "chunk\n3"
+    assert embedding == [7.0, 1.0]  # encoded from "chunk 3"
+    assert metadata == {"source": "a.pdf"}
+
+
+def test_write_lets_the_store_embed_without_collection_access():
+    class PlainStore:
+        def __init__(self):
+            self.calls = []
+
+        def add_documents(self, documents, ids):
+            self.calls.append(ids)
+
+    store = PlainStore()
+    items = [(f"id{i}", Doc(f"chunk {i}")) for i in range(3)]
+    EmbeddingWriter(store, batch_size=2).write(items)
+    assert store.calls == [["id0", "id1"], ["id2"]]
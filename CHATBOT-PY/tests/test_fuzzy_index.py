@@ -0,0 +1,67 @@
+import random
+
+import pytest
+
+from src.fuzzy_index import FuzzyIndex, levenshtein_distance
+from src.spell_checker import SpellChecker
+
+
+def reference_distance(a, b):
+    """Full dynamic-programming Levenshtein distance."""
+    table = [[i + j if i * j == 0 else 0 for j in range(len(b) + 1)] for i in range(len(a) + 1)]
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            table[i][j] = min(table[i - 1][j] + 1, table[i][j - 1] + 1, table[i - 1][j - 1] + (a[i - 1] != b[j - 1]))
+    return table[-1][-1]
+
+
+def brute_force_lookup(vocabulary, word, max_distance):
+    matches = [(entry, reference_distance(word, entry)) for entry in vocabulary]
+    return tuple(sorted(((entry, d) for entry, d in matches if d <= max_distance), key=lambda m: (m[1], m[0])))
+
+
+def random_words(rng, count, alphabet="aeiknrstu", max_length=7):
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, max_length))) for _ in range(count)]
+
+
+def test_levenshtein_distance_matches_reference():
+    rng = random.Random(25)
+    for a, b in zip(random_words(rng, 500), random_words(rng, 500)):
+        expected = reference_distance(a, b)
+        assert levenshtein_distance(a, b) == expected
+        for max_distance in (0, 1, 2):
+            assert levenshtein_distance(a, b, max_distance) == min(expected, max_distance + 1)
+
+
+@pytest.mark.parametrize("max_distance", [1, 2])
+def test_lookup_matches_brute_force(max_distance):
+    rng = random.Random(max_distance)
+    vocabulary = set(random_words(rng, 300)) | {"program studi", "dosen pembimbing", "kartu rencana studi"}
+    index = FuzzyIndex(vocabulary, max_distance=max_distance)
+    queries = random_words(rng, 300) + ["program stdi", "dosen pembimbng", "", "kartu rencana"]
+    for word in queries:
+        assert index.lookup(word) == brute_force_lookup(vocabulary, word, max_distance), word
+
+
+def test_lookups_are_memoized_and_bounded():
+    index = FuzzyIndex(["saya", "semester"], cache_size=2)
+    first = index.lookup("sya")
+    assert index.lookup("sya") is first
+    index.lookup("smester")
+    index.lookup("x")
+    assert list(index._cache) == ["smester", "x"]
+    assert "saya" in index and "sya" not in index
+
+
+def test_spell_checker_suggestions_match_brute_force():
+    checker = SpellChecker()
+    vocabulary = set(checker.common_words.values())
+    for word in ["jurusn", "semster", "pembimbng", "kurikulm", "wisda", "zzzzzz", "informasi"]:
+        expected = [entry for entry, _ in brute_force_lookup(vocabulary, word, checker.max_distance)]
+        assert checker.get_suggestions(word) == expected
+
+
+def test_spell_checker_corrects_text():
+    corrected, corrections = SpellChecker().correct_text("Kapan jadwal sempro smt ini")
+    assert "seminar proposal" in corrected and "semester" in corrected
+    assert ("sempro", "seminar proposal") in corrections
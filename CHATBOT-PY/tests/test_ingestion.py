@@ -0,0 +1,85 @@
+import pytest
+
+from src import embedding_writer, ingestion
+from src.ingestion import IncrementalIndexer, chunk_id, load_manifest
+
+
+class Doc:
+    def __init__(self, page_content, **metadata):
+        self.page_content = page_content
+        self.metadata = metadata
+
+
+@pytest.fixture
+def indexer(vectorstore, fake_encoder, monkeypatch, tmp_path):
+    # Only the vector store is synced here; the side indexes have their own tests
+    for module in (ingestion, embedding_writer):
+        monkeypatch.setattr(module, "get_bm25_index_for", lambda store: None)
+        monkeypatch.setattr(module, "get_near_duplicate_index_for", lambda store: None)
+    return IncrementalIndexer(vectorstore, manifest_path=str(tmp_path / "manifest.json"), batch_size=2)
+
+
+def docs(*texts):
+    return [Doc(text, page=i) for i, text in enumerate(texts)]
+
+
+def test_chunk_id_is_stable_and_source_scoped():
+    assert chunk_id("a.pdf", "Isi  formulir\n") == chunk_id("a.pdf", "Isi formulir")
+    assert chunk_id("a.pdf", "Isi formulir") != chunk_id("b.pdf", "Isi formulir")
+
+
+def test_first_sync_adds_every_distinct_chunk(indexer, vectorstore):
+    stats = indexer.sync_source("a.pdf", "v1", docs("satu", "dua", "tiga", "dua"))
+    assert stats == {"added": 3, "deleted": 0, "unchanged": 0, "dropped": 0}
+    assert vectorstore._collection.count() == 3
+    stored = vectorstore._collection.get(ids=[chunk_id("a.pdf", "satu")])["metadatas"][0]
+    assert stored["source"] == "a.pdf"
+    assert stored["chunk_id"] == chunk_id("a.pdf", "satu")
+
+
+def test_sync_is_idempotent(indexer, vectorstore):
+    indexer.sync_source("a.pdf", "v1", docs("satu", "dua", "tiga"))
+    upserted = list(vectorstore._collection.upserted)
+    indexer.changed = False
+
+    stats = indexer.sync_source("a.pdf", "v1", docs("satu", "dua", "tiga"))
+    assert stats == {"added": 0, "deleted": 0, "unchanged": 3, "dropped": 0}
+    assert vectorstore._collection.upserted == upserted
+    assert vectorstore.deleted == []
+    assert not indexer.changed
+
+
+def test_changed_source_only_embeds_new_chunks(indexer, vectorstore):
+    indexer.sync_source("a.pdf", "v1", docs("satu", "dua", "tiga"))
+    vectorstore._collection.upserted.clear()
+
+    stats = indexer.sync_source("a.pdf", "v2", docs("satu", "dua", "empat"))
+    assert stats == {"added": 1, "deleted": 1, "unchanged": 2, "dropped": 0}
+    assert vectorstore._collection.upserted == [chunk_id("a.pdf", "empat")]
+    assert vectorstore.deleted == [chunk_id("a.pdf", "tiga")]
+    assert indexer.is_current("a.pdf", "v2")
+
+
+def test_lost_manifest_does_not_duplicate_stored_chunks(indexer, vectorstore, tmp_path):
+    indexer.sync_source("a.pdf", "v1", docs("satu", "dua"))
+    vectorstore._collection.upserted.clear()
+
+    fresh = IncrementalIndexer(vectorstore, manifest_path=str(tmp_path / "other.json"))
+    stats = fresh.sync_source("a.pdf", "v1", docs("satu", "dua"))
+    assert stats["added"] == 0
+    assert vectorstore._collection.upserted == []
+
+
+def test_manifest_is_persisted(indexer, tmp_path):
+    indexer.sync_source("a.pdf", "v1", docs("satu"))
+    manifest = load_manifest(str(tmp_path / "manifest.json"))
+    assert manifest["sources"]["a.pdf"] == {"fingerprint": "v1", "chunks": [chunk_id("a.pdf", "satu")]}
+
+
+def test_remove_missing_deletes_sources_that_disappeared(indexer, vectorstore):
+    indexer.sync_source("a.pdf", "v1", docs("satu"))
+    indexer.sync_source("b.pdf", "v1", docs("dua"))
+
+    assert indexer.remove_missing(["b.pdf"]) == ["a.pdf"]
+    assert set(vectorstore._collection.rows) == {chunk_id("b.pdf", "dua")}
+    assert set(indexer.sources) == {"b.pdf"}
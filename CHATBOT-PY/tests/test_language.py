@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+from src.language import ENGLISH_WORDS, INDONESIAN_WORDS, detect_language, detect_language_profile
+from src.request_context import RequestContext, current_request, use_request
+
+
+def baseline_detect_language(text):
+    """main.detect_language before the shared detector, with the same word tables."""
+    text_lower = text.lower()
+    english_count = sum(1 for word in ENGLISH_WORDS if f" {word} " in f" {text_lower} ")
+    indonesian_count = sum(1 for word in INDONESIAN_WORDS if f" {word} " in f" {text_lower} ")
+    if any(pattern in text_lower for pattern in ["apa itu", "siapa itu", "bagaimana cara", "kapan waktu", "dimana tempat"]):
+        indonesian_count += 2
+    if any(pattern in text_lower for pattern in ["what is", "who is", "how to", "when is", "where is"]):
+        english_count += 2
+    return "en" if english_count > indonesian_count else "id"
+
+
+@pytest.mark.parametrize("text, language", [
+    ("What is the KKN schedule", "en"),
+    ("How to apply for an internship?", "en"),
+    ("Apa itu sistem informasi", "id"),
+    ("Bagaimana cara daftar KKN?", "id"),
+    ("KKN", "id"),
+    ("", "id"),
+    ("Who is the koorprodi di SI", "en"),
+])
+def test_detect_language(text, language):
+    assert detect_language(text) == language
+
+
+def test_space_separated_questions_match_the_baseline_detector():
+    rng = random.Random(24)
+    vocabulary = sorted(ENGLISH_WORDS | INDONESIAN_WORDS) + ["kkn", "skripsi", "prodi", "cara", "waktu", "tempat", "to"]
+    for _ in range(3000):
+        text = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(1, 8)))
+        if "how tolong" in text:
+            # The baseline also counted "how to" inside "how tolong"
+            continue
+        assert detect_language(text) == baseline_detect_language(text), text
+
+
+def test_punctuation_does_not_hide_words():
+    assert detect_language("what? is, the: schedule") == "en"
+    assert baseline_detect_language("what? is, the: schedule") == "id"
+
+
+@pytest.mark.parametrize("text, style", [
+    ("What is the schedule", "english"),
+    ("gw mau tanya jadwal kkn dong", "casual"),
+    ("Kapan syarat lulus skripsi?", "formal"),
+    ("Apakah kamu tahu jadwal wisuda", "casual"),
+])
+def test_style(text, style):
+    assert detect_language_profile(text).style == style
+
+
+def test_request_context_is_shared_within_the_request():
+    context = RequestContext("Bagaimana cara daftar KKN?")
+    assert context.language == "id" and not context.is_english
+    assert context.intents.kkn
+
+    with use_request(context):
+        assert current_request("Bagaimana cara daftar KKN?") is context
+        other = current_request("What is the schedule")
+        assert other is not context and other.is_english
+    assert current_request("Bagaimana cara daftar KKN?") is not context
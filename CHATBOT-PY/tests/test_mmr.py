@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from src.mmr import MMRSelector, maximal_marginal_relevance
+
+
+def langchain_mmr(query_embedding, embedding_list, lambda_mult=0.5, k=4):
+    """LangChain's maximal_marginal_relevance, with its cosine_similarity inlined."""
+    def cosine_similarity(x, y):
+        x_norm = np.linalg.norm(x, axis=1)
+        y_norm = np.linalg.norm(y, axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            similarity = np.dot(x, y.T) / np.outer(x_norm, y_norm)
+        similarity[np.isnan(similarity) | np.isinf(similarity)] = 0.0
+        return similarity
+
+    if min(k, len(embedding_list)) <= 0:
+        return []
+    if query_embedding.ndim == 1:
+        query_embedding = np.expand_dims(query_embedding, axis=0)
+    similarity_to_query = cosine_similarity(query_embedding, embedding_list)[0]
+    most_similar = int(np.argmax(similarity_to_query))
+    idxs = [most_similar]
+    selected = np.array([embedding_list[most_similar]])
+    while len(idxs) < min(k, len(embedding_list)):
+        best_score = -np.inf
+        idx_to_add = -1
+        similarity_to_selected = cosine_similarity(embedding_list, selected)
+        for i, query_score in enumerate(similarity_to_query):
+            if i in idxs:
+                continue
+            redundant_score = max(similarity_to_selected[i])
+            equation_score = lambda_mult * query_score - (1 - lambda_mult) * redundant_score
+            if equation_score > best_score:
+                best_score = equation_score
+                idx_to_add = i
+        idxs.append(idx_to_add)
+        selected = np.append(selected, [embedding_list[idx_to_add]], axis=0)
+    return idxs
+
+
+def random_case(seed, n=30, dim=12):
+    rng = np.random.default_rng(seed)
+    return rng.normal(size=dim), rng.normal(size=(n, dim))
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("lambda_mult", [0.0, 0.25, 0.5, 1.0])
+@pytest.mark.parametrize("k", [1, 4, 12, 40])
+def test_selection_matches_langchain(seed, lambda_mult, k):
+    query, candidates = random_case(seed)
+    expected = langchain_mmr(query, candidates, lambda_mult=lambda_mult, k=k)
+    assert maximal_marginal_relevance(query, candidates, k=k, lambda_mult=lambda_mult) == expected
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_larger_k_resumes_the_previous_selection(seed):
+    query, candidates = random_case(seed)
+    selector = MMRSelector(query, candidates)
+    first = list(selector.select(4))
+    assert selector.select(12) == langchain_mmr(query, candidates, k=12)
+    assert selector.select(12)[:4] == first
+    # Another lambda_mult starts over
+    assert selector.select(6, lambda_mult=0.8) == langchain_mmr(query, candidates, lambda_mult=0.8, k=6)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_extending_the_pool_matches_a_fresh_selector(seed):
+    query, candidates = random_case(seed, n=40)
+    selector = MMRSelector(query, candidates[:15])
+    selector.select(5)
+    selector.extend(candidates[15:])
+    assert len(selector) == 40
+    assert selector.select(10) == langchain_mmr(query, candidates, k=10)
+
+
+def test_empty_and_zero_vectors():
+    query, candidates = random_case(0, n=3)
+    assert maximal_marginal_relevance(query, candidates, k=0) == []
+    assert maximal_marginal_relevance(query, np.zeros((0, 12))) == []
+    selector = MMRSelector(query)
+    assert len(selector) == 0 and selector.select(3) == []
+
+    with_zero = np.vstack([np.zeros(12), candidates])
+    assert maximal_marginal_relevance(query, with_zero, k=4) == langchain_mmr(query, with_zero, k=4)
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("fetch_k", [1, 8, 20, 30, 50])
+def test_fetch_k_restricts_the_pool_to_the_most_similar_candidates(seed, fetch_k):
+    query, candidates = random_case(seed)
+    similarity = candidates @ query / np.linalg.norm(candidates, axis=1)
+    top = list(np.argsort(-similarity, kind="stable")[:fetch_k])
+    expected = [top[i] for i in langchain_mmr(query, candidates[top], k=6)]
+
+    selector = MMRSelector(query, candidates)
+    selector.select(10)
+    assert selector.select(6, fetch_k=fetch_k) == expected
+    # Going back to the whole pool starts over as well
+    assert selector.select(6) == langchain_mmr(query, candidates, k=6)
@@ -0,0 +1,127 @@
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src import model_registry
+from src.embedding_cache import EmbeddingCache
+
+DIM = 3
+
+
+class FakeSentenceTransformer:
+    """Encodes a text as (length, 1, 0); normalize_embeddings scales it to unit length."""
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self.encoded = []
+
+    def get_sentence_embedding_dimension(self):
+        return DIM
+
+    def encode(self, texts, batch_size=32, normalize_embeddings=False):
+        self.encoded.append(list(texts))
+        vectors = np.array([[len(text), 1.0, 0.0] for text in texts], dtype=np.float32)
+        if normalize_embeddings:
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Empty registry whose models are FakeSentenceTransformers."""
+    monkeypatch.setattr(model_registry, "_sentence_transformers", {})
+    monkeypatch.setattr(model_registry, "_encoders", {})
+    monkeypatch.setattr(model_registry, "_embeddings", {})
+    loaded = []
+
+    def load(model_name):
+        loaded.append(model_name)
+        return FakeSentenceTransformer(model_name)
+
+    monkeypatch.setitem(sys.modules, "sentence_transformers", SimpleNamespace(SentenceTransformer=load))
+    return loaded
+
+
+@pytest.fixture
+def encoder(registry, tmp_path):
+    encoder = model_registry.get_encoder()
+    encoder._cache = EmbeddingCache(encoder.model_name, DIM, cache_dir=str(tmp_path))
+    encoder._cache_ready = True
+    yield encoder
+    encoder._cache.close()
+
+
+def test_repeated_texts_come_from_the_cache(encoder):
+    encoder.encode(["kkn", "wisuda"])
+    vectors = encoder.encode(["wisuda", "kkn", "krs"])
+
+    assert encoder.model.encoded == [["kkn", "wisuda"], ["krs"]]
+    np.testing.assert_array_equal(vectors, [[6, 1, 0], [3, 1, 0], [3, 1, 0]])
+
+
+def test_encode_options_bypass_the_cache(encoder):
+    plain = encoder.encode("kkn")
+    normalized = encoder.encode("kkn", normalize_embeddings=True)
+
+    np.testing.assert_allclose(normalized, plain / np.linalg.norm(plain))
+    np.testing.assert_array_equal(encoder.encode("kkn"), plain)
+    assert encoder.model.encoded == [["kkn"], ["kkn"]]
+
+
+def test_encoder_and_embeddings_share_one_model(registry):
+    encoder = model_registry.get_encoder()
+    embeddings = model_registry.get_embeddings()
+
+    assert model_registry.get_encoder() is encoder
+    assert model_registry.get_embeddings() is embeddings
+    assert embeddings.client is encoder
+    assert encoder.model is model_registry.get_sentence_transformer()
+    assert registry == [model_registry.DEFAULT_EMBEDDING_MODEL]
+
+
+def test_models_are_loaded_lazily_per_name(registry):
+    model_registry.get_encoder()
+    model_registry.get_embeddings("other-model")
+    assert registry == []
+
+    assert model_registry.get_sentence_transformer("other-model").model_name == "other-model"
+    model_registry.get_sentence_transformer()
+    assert registry == ["other-model", model_registry.DEFAULT_EMBEDDING_MODEL]
+
+
+def test_racing_threads_load_the_model_once(registry, monkeypatch):
+    threads = 8
+    barrier = threading.Barrier(threads)
+    load = sys.modules["sentence_transformers"].SentenceTransformer
+
+    def slow_load(model_name):
+        # Give the other threads time to miss the registry too
+        time.sleep(0.05)
+        return load(model_name)
+
+    monkeypatch.setattr(sys.modules["sentence_transformers"], "SentenceTransformer", slow_load)
+    models, encoders, embeddings = [], [], []
+
+    def worker(i):
+        barrier.wait()
+        if i % 2:
+            models.append(model_registry.get_embeddings().client.model)
+            embeddings.append(model_registry.get_embeddings())
+        else:
+            models.append(model_registry.get_encoder().model)
+            encoders.append(model_registry.get_encoder())
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    assert registry == [model_registry.DEFAULT_EMBEDDING_MODEL]
+    assert len({id(model) for model in models}) == 1
+    assert len({id(encoder) for encoder in encoders}) == 1
+    assert len({id(embedding) for embedding in embeddings}) == 1
@@ -0,0 +1,30 @@
+import pytest
+
+from src.intents import classify_intents
+from src.multi_query import INTENT_FOCUS, INTENT_QUERY_WEIGHT, build_sub_queries
+
+
+def test_question_alone_without_intents_or_expansions():
+    assert build_sub_queries("Apa itu SI?", classify_intents("Apa itu SI?")) == [("Apa itu SI?", 1.0)]
+
+
+def test_one_focused_query_per_intent():
+    question = "Template surat magang dan jadwal KKN"
+    queries = build_sub_queries(question, classify_intents(question), max_queries=10)
+    assert queries == [
+        (question, 1.0),
+        (INTENT_FOCUS["internship_document"], INTENT_QUERY_WEIGHT),
+        (INTENT_FOCUS["kkn"], INTENT_QUERY_WEIGHT),
+    ]
+
+
+def test_expansions_are_grouped_strongest_first():
+    expansions = [("a", 0.4), ("b", 0.6), ("c", 0.5), ("d", 0.6), ("e", 0.5)]
+    queries = build_sub_queries("q", classify_intents("q"), expansions)
+    assert [query for query, _ in queries] == ["q", "b d c", "e a"]
+    assert [weight for _, weight in queries[1:]] == [pytest.approx(17 / 30), pytest.approx(0.45)]
+
+
+def test_number_of_queries_is_capped():
+    expansions = [(f"term{i}", 0.5) for i in range(30)]
+    assert len(build_sub_queries("q", classify_intents("q"), expansions, max_queries=3)) == 3
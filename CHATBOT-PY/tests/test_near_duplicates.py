@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+
+from src import embedding_writer, ingestion
+from src.embedding_writer import EmbeddingWriter
+from src.ingestion import IncrementalIndexer, chunk_id
+from src.near_duplicates import (
+    CLUSTER_FIELD, NearDuplicateIndex, collapse_near_duplicates, estimated_similarity, minhash, shingles
+)
+
+WORDS = ("mahasiswa wajib mengisi formulir pendaftaran kkn melalui portal akademik lalu mengunggah "
+         "transkrip nilai surat izin orang tua serta bukti pembayaran sebelum batas waktu yang "
+         "ditetapkan oleh lembaga penelitian dan pengabdian kepada masyarakat setiap semester ganjil "
+         "dan genap peserta kemudian mengikuti pembekalan wajib selama dua hari di kampus utama").split()
+PASSAGE = " ".join(WORDS)
+# One word changed: the same content, e.g. a header block repeated with another date
+VARIANT = " ".join(WORDS[:20] + ["lampiran"] + WORDS[21:])
+OTHER = ("Sidang skripsi dijadwalkan oleh program studi setelah pembimbing menyetujui naskah dan "
+         "mahasiswa menyerahkan berkas ke bagian administrasi paling lambat dua minggu sebelumnya.")
+
+
+class Doc:
+    def __init__(self, page_content, **metadata):
+        self.page_content = page_content
+        self.metadata = metadata
+
+
+def test_collapse_keeps_the_first_document_of_each_cluster():
+    docs = [Doc("a", **{CLUSTER_FIELD: "x"}), Doc("b", **{CLUSTER_FIELD: "y"}),
+            Doc("c", **{CLUSTER_FIELD: "x"}), Doc("d", **{CLUSTER_FIELD: "z"})]
+    kept, removed = collapse_near_duplicates(docs)
+    assert [doc.page_content for doc in kept] == ["a", "b", "d"]
+    assert [doc.page_content for doc in removed] == ["c"]
+
+
+def test_collapse_clusters_documents_without_a_cluster_on_the_fly():
+    docs = [Doc(PASSAGE), Doc(OTHER, **{CLUSTER_FIELD: "x"}), Doc(VARIANT), Doc(PASSAGE)]
+    kept, removed = collapse_near_duplicates(docs)
+    assert kept == docs[:2]
+    assert removed == docs[2:]
+
+
+def test_writer_stores_the_cluster_of_every_chunk(vectorstore, fake_encoder, monkeypatch):
+    index = NearDuplicateIndex()
+    monkeypatch.setattr(embedding_writer, "get_bm25_index_for", lambda store: None)
+    monkeypatch.setattr(embedding_writer, "get_near_duplicate_index_for", lambda store: index)
+
+    EmbeddingWriter(vectorstore).write([("p", Doc(PASSAGE)), ("o", Doc(OTHER)), ("v", Doc(VARIANT))])
+    clusters = {doc_id: row[2][CLUSTER_FIELD] for doc_id, row in vectorstore._collection.rows.items()}
+    assert clusters == {"p": "p", "o": "o", "v": "p"}
+    assert index.cluster_of("v") == "p"
+
+
+def jaccard(a, b):
+    a, b = shingles(a), shingles(b)
+    return len(a & b) / len(a | b)
+
+
+def test_shingles():
+    assert shingles("Apa itu KKN?") == {"apa itu kkn"}
+    assert shingles("a b c d") == {"a b c", "b c d"}
+    assert shingles("...") == set()
+
+
+def test_minhash_estimates_jaccard_similarity():
+    np.testing.assert_array_equal(minhash(PASSAGE), minhash(PASSAGE.upper()))
+    for a, b in [(PASSAGE, VARIANT), (PASSAGE, OTHER), (PASSAGE, " ".join(WORDS[:30]))]:
+        assert estimated_similarity(minhash(a), minhash(b)) == pytest.approx(jaccard(a, b), abs=0.12)
+
+
+def test_index_clusters_near_duplicates_only():
+    index = NearDuplicateIndex()
+    assert index.assign("p", PASSAGE) == "p"
+    assert index.assign("o", OTHER) == "o"
+    assert index.assign("v", VARIANT) == "p"
+    assert index.find(minhash(OTHER), exclude="o") is None
+    # Re-assigning an unchanged chunk keeps its cluster
+    assert index.assign("v", VARIANT) == "p"
+
+
+def test_removed_chunks_are_no_longer_found():
+    index = NearDuplicateIndex()
+    index.assign("p", PASSAGE)
+    index.remove(["p", "unknown"])
+    assert len(index) == 0
+    assert all(not table for table in index._bands)
+    assert index.assign("v", VARIANT) == "v"
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "near_dup.json")
+    index = NearDuplicateIndex(path)
+    index.assign("p", PASSAGE)
+    index.assign("o", OTHER)
+    index.save()
+
+    loaded = NearDuplicateIndex.load(path)
+    assert not loaded.dirty
+    assert {doc_id: loaded.cluster_of(doc_id) for doc_id in ("p", "o")} == {"p": "p", "o": "o"}
+    assert loaded.assign("v", VARIANT) == "p"
+
+
+def test_sync_drops_near_duplicates_within_a_source(vectorstore, fake_encoder, monkeypatch, tmp_path):
+    index = NearDuplicateIndex()
+    for module in (ingestion, embedding_writer):
+        monkeypatch.setattr(module, "get_bm25_index_for", lambda store: None)
+        monkeypatch.setattr(module, "get_near_duplicate_index_for", lambda store: index)
+    indexer = IncrementalIndexer(vectorstore, manifest_path=str(tmp_path / "manifest.json"))
+
+    stats = indexer.sync_source("a.pdf", "v1", [Doc(PASSAGE), Doc(OTHER), Doc(VARIANT)])
+    assert stats["added"] == 2 and stats["dropped"] == 1
+
+    # In another source the near-duplicate is kept and joins the existing cluster
+    indexer.sync_source("b.pdf", "v1", [Doc(VARIANT)])
+    rows = vectorstore._collection.rows
+    assert rows[chunk_id("b.pdf", VARIANT)][2][CLUSTER_FIELD] == chunk_id("a.pdf", PASSAGE)
@@ -0,0 +1,144 @@
+from concurrent.futures import Future
+
+import pytest
+
+pytest.importorskip("PyPDF2")
+
+from src import pdf_extraction
+from src.pdf_extraction import PageTextCache, iter_pdf_files, iter_pdf_pages
+
+
+def write_pdf(path, page_texts):
+    """Write a minimal PDF with one line of Helvetica text per page."""
+    page_count = len(page_texts)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        ("<< /Type /Pages /Kids [%s] /Count %d >>" % (
+            " ".join(f"{4 + 2 * i} 0 R" for i in range(page_count)), page_count)).encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, text in enumerate(page_texts):
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+        objects.append(("<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                        "/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (5 + 2 * i)).encode())
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+
+    data = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(data)
+    data += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    data += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    data += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(data)
+    return str(path)
+
+
+@pytest.fixture
+def pdfs(tmp_path):
+    return [
+        write_pdf(tmp_path / "kkn.pdf", [f"KKN halaman {i}" for i in range(5)]),
+        write_pdf(tmp_path / "wisuda.pdf", [f"Wisuda halaman {i}" for i in range(3)]),
+    ]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PageTextCache(cache_dir=str(tmp_path / "cache"))
+
+
+def texts(records):
+    return [(record.path, record.page, record.text.strip()) for record in records]
+
+
+def expected(pdfs):
+    return ([(pdfs[0], i, f"KKN halaman {i}") for i in range(5)]
+            + [(pdfs[1], i, f"Wisuda halaman {i}") for i in range(3)])
+
+
+def test_single_worker_extracts_in_this_process_in_page_order(pdfs, monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError("a process pool was started")
+
+    monkeypatch.setattr(pdf_extraction, "ProcessPoolExecutor", no_pool)
+    assert texts(iter_pdf_pages(pdfs, max_workers=1, use_cache=False)) == expected(pdfs)
+
+
+def test_unavailable_pool_falls_back_to_this_process(pdfs, monkeypatch):
+    def broken_pool(*args, **kwargs):
+        raise OSError("no semaphores")
+
+    monkeypatch.setattr(pdf_extraction, "ProcessPoolExecutor", broken_pool)
+    monkeypatch.setattr(pdf_extraction, "PAGES_PER_TASK", 2)
+    assert texts(iter_pdf_pages(pdfs, max_workers=4, use_cache=False)) == expected(pdfs)
+
+
+def test_process_pool_keeps_file_and_page_order(pdfs, monkeypatch):
+    monkeypatch.setattr(pdf_extraction, "PAGES_PER_TASK", 2)
+    assert texts(iter_pdf_pages(pdfs, max_workers=3, use_cache=False)) == expected(pdfs)
+
+    grouped = [(path, len(records)) for path, records in iter_pdf_files(pdfs, max_workers=3, use_cache=False)]
+    assert grouped == [(pdfs[0], 5), (pdfs[1], 3)]
+
+
+def test_cached_pages_are_not_extracted_again(pdfs, cache, monkeypatch):
+    assert texts(iter_pdf_pages(pdfs, max_workers=1, cache=cache)) == expected(pdfs)
+
+    def extract(*args):
+        raise AssertionError("a cached page was extracted again")
+
+    monkeypatch.setattr(pdf_extraction, "_extract_pages", extract)
+    assert texts(iter_pdf_pages(pdfs, max_workers=1, cache=cache)) == expected(pdfs)
+
+
+def test_changed_file_misses_the_cache(pdfs, cache, tmp_path, monkeypatch):
+    list(iter_pdf_pages(pdfs, max_workers=1, cache=cache))
+    write_pdf(tmp_path / "kkn.pdf", ["KKN diperbarui"])
+
+    extracted = []
+    extract_pages = pdf_extraction._extract_pages
+
+    def extract(pdf_path, pages):
+        extracted.append((pdf_path, list(pages)))
+        return extract_pages(pdf_path, pages)
+
+    monkeypatch.setattr(pdf_extraction, "_extract_pages", extract)
+    records = texts(iter_pdf_pages(pdfs, max_workers=1, cache=cache))
+
+    assert records == [(pdfs[0], 0, "KKN diperbarui")] + expected(pdfs)[5:]
+    assert extracted == [(pdfs[0], [0])]
+
+
+class RecordingExecutor:
+    """Runs the first task right away and leaves the others pending."""
+
+    def __init__(self, max_workers):
+        self.futures = []
+        self.shut_down = False
+
+    def submit(self, fn, *args):
+        future = Future()
+        if not self.futures:
+            future.set_result(fn(*args))
+        self.futures.append(future)
+        return future
+
+    def shutdown(self, wait=True):
+        self.shut_down = True
+
+
+def test_stopping_early_cancels_the_pending_tasks(pdfs, monkeypatch):
+    executors = []
+    monkeypatch.setattr(pdf_extraction, "ProcessPoolExecutor",
+                        lambda max_workers: executors.append(RecordingExecutor(max_workers)) or executors[-1])
+    monkeypatch.setattr(pdf_extraction, "PAGES_PER_TASK", 5)
+
+    records = iter_pdf_pages(pdfs, max_workers=2, use_cache=False)
+    assert next(records).page == 0
+    records.close()
+
+    executor, = executors
+    assert executor.shut_down
+    assert [future.cancelled() for future in executor.futures] == [False, True]
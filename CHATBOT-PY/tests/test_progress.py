@@ -0,0 +1,113 @@
+import asyncio
+import threading
+
+from src.progress import (
+    ANN_SEARCH, CONDENSE_QUESTION_TAG, LLM_DONE, LLM_FIRST_TOKEN, QUERY_ANALYSIS, RERANK, STAGES,
+    StageCallbackHandler, emit_stage, stage_fraction, stage_listener
+)
+
+
+def stages(events):
+    return [event["stage"] for event in events]
+
+
+def test_emit_without_listener_does_nothing():
+    emit_stage(ANN_SEARCH, documents=3)
+
+
+def test_listener_receives_the_events_emitted_inside_its_scope():
+    events = []
+    with stage_listener(events.append):
+        emit_stage(QUERY_ANALYSIS)
+        emit_stage(ANN_SEARCH, documents=3)
+    emit_stage(RERANK)
+
+    assert stages(events) == [QUERY_ANALYSIS, ANN_SEARCH]
+    assert events[1]["details"] == {"documents": 3}
+    assert events[1]["fraction"] == stage_fraction(ANN_SEARCH) == 2 / len(STAGES)
+    assert 0.0 <= events[0]["elapsed"] <= events[1]["elapsed"]
+
+
+def test_nested_listeners_share_the_outer_start_and_unwind():
+    outer, inner = [], []
+    with stage_listener(outer.append):
+        with stage_listener(inner.append):
+            emit_stage(QUERY_ANALYSIS)
+        emit_stage(ANN_SEARCH)
+
+    assert stages(outer) == [QUERY_ANALYSIS, ANN_SEARCH]
+    assert stages(inner) == [QUERY_ANALYSIS]
+
+
+def test_failing_listener_does_not_stop_the_others():
+    events = []
+
+    def broken(event):
+        raise RuntimeError("listener down")
+
+    with stage_listener(broken), stage_listener(events.append):
+        emit_stage(RERANK)
+
+    assert stages(events) == [RERANK]
+
+
+def test_other_threads_do_not_reach_the_listener():
+    events = []
+    with stage_listener(events.append):
+        thread = threading.Thread(target=emit_stage, args=(RERANK,))
+        thread.start()
+        thread.join()
+        emit_stage(ANN_SEARCH)
+
+    assert stages(events) == [ANN_SEARCH]
+
+
+def test_concurrent_tasks_only_see_their_own_events():
+    async def request(stage, events):
+        with stage_listener(events.append):
+            await asyncio.sleep(0)
+            emit_stage(stage)
+            await asyncio.sleep(0)
+
+    async def main():
+        first, second = [], []
+        await asyncio.gather(request(ANN_SEARCH, first), request(RERANK, second))
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert stages(first) == [ANN_SEARCH]
+    assert stages(second) == [RERANK]
+
+
+def test_handler_emits_the_first_token_once_then_done():
+    events = []
+    handler = StageCallbackHandler()
+    with stage_listener(events.append):
+        handler.on_llm_new_token("")
+        handler.on_llm_new_token("Jadwal")
+        handler.on_llm_new_token(" KKN")
+        handler.on_llm_end(None)
+
+    assert stages(events) == [LLM_FIRST_TOKEN, LLM_DONE]
+
+
+def test_handler_emits_the_first_token_for_non_streaming_models():
+    events = []
+    with stage_listener(events.append):
+        StageCallbackHandler().on_llm_end(None)
+
+    assert stages(events) == [LLM_FIRST_TOKEN, LLM_DONE]
+
+
+def test_handler_skips_condense_question_calls():
+    events = []
+    handler = StageCallbackHandler()
+    with stage_listener(events.append):
+        handler.on_llm_new_token("Kapan", tags=[CONDENSE_QUESTION_TAG])
+        handler.on_llm_end(None, tags=["other", CONDENSE_QUESTION_TAG])
+        assert events == []
+
+        handler.on_llm_new_token("Jadwal", tags=["answer"])
+        handler.on_llm_end(None, tags=None)
+
+    assert stages(events) == [LLM_FIRST_TOKEN, LLM_DONE]
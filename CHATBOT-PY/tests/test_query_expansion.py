@@ -0,0 +1,57 @@
+import pytest
+
+from src.query_expansion import QueryExpander, expand_query, format_expanded_query
+
+TABLE = {
+    "weights": {"synonym": 0.5, "phrase_synonym": 0.6, "intent": 0.4},
+    "limits": {"synonym": 2, "procedural_synonym": 3, "phrase_synonym": 1, "procedural_phrase_synonym": 2},
+    "synonyms": {
+        "cuti": ["izin", "libur", "rehat", "jeda"],
+        "cuti akademik": ["penundaan studi", "stop out", "terminal"],
+        "dosen": ["pengajar", "staf pengajar", "pendidik", "lektor"],
+        "sidang": ["ujian", "seminar"],
+    },
+    "intents": {
+        "procedural": {"markers": ["bagaimana", "cara"], "terms": []},
+        "kkn": {"markers": ["kkn", "kuliah kerja nyata"], "terms": ["jadwal kkn", "mekanisme kkn"]},
+    },
+}
+
+
+@pytest.fixture
+def expander():
+    return QueryExpander(TABLE)
+
+
+def test_longest_phrase_wins_over_its_first_word(expander):
+    assert expander.expand("Cuti akademik semester ini") == [("penundaan studi", 0.6)]
+    assert expander.expand("cuti sakit") == [("izin", 0.5), ("libur", 0.5)]
+
+
+def test_procedural_questions_get_more_synonyms(expander):
+    assert expander.expand("bagaimana cara cuti akademik") == [("penundaan studi", 0.6), ("stop out", 0.6)]
+    assert expander.expand("bagaimana cuti") == [("izin", 0.5), ("libur", 0.5), ("rehat", 0.5)]
+
+
+def test_terms_already_in_the_query_are_skipped(expander):
+    assert expander.expand("dosen pengajar") == [("staf pengajar", 0.5)]
+    assert expander.expand("sidang atau ujian") == [("seminar", 0.5)]
+
+
+def test_multi_token_markers_flag_intents(expander):
+    assert expander.expand("kapan kuliah kerja nyata") == [("jadwal kkn", 0.4), ("mekanisme kkn", 0.4)]
+    assert expander.expand("kuliah kerja") == []
+    assert expander.expand("Dosen KKN") == [("pengajar", 0.5), ("staf pengajar", 0.5),
+                                             ("jadwal kkn", 0.4), ("mekanisme kkn", 0.4)]
+
+
+def test_shipped_table_expands_queries():
+    expansions = expand_query("Bagaimana mekanisme KKN?")
+    assert isinstance(expansions, tuple)
+    assert ("jadwal kkn", 0.4) in expansions
+    assert all(0 < weight <= 1 for _, weight in expansions)
+    assert expand_query("Bagaimana mekanisme KKN?") is expansions
+
+
+def test_format_expanded_query():
+    assert format_expanded_query("cuti", [("izin", 0.5), ("libur", 0.5)]) == "cuti izin libur"
@@ -0,0 +1,150 @@
+import re
+
+import numpy as np
+import pytest
+
+from src.reranker import (
+    STOPWORDS, cosine_scores, is_low_quality_chunk, rerank_scores, resolve_chunk_embeddings
+)
+
+
+class HashingModel:
+    """Deterministic stand-in for a sentence-transformers model."""
+
+    def __init__(self, dim=16):
+        self.dim = dim
+        self.calls = []
+
+    def _vector(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in text.lower().split():
+            vector[sum(map(ord, word)) % self.dim] += 1.0
+        return vector
+
+    def encode(self, texts, batch_size=32):
+        self.calls.append(texts)
+        if isinstance(texts, str):
+            return self._vector(texts)
+        return np.vstack([self._vector(text) for text in texts])
+
+
+def baseline_relevance_score(chunk, query, model):
+    """The per-chunk scorer that rerank_scores replaced."""
+    chunk_embedding = model.encode(chunk)
+    query_embedding = model.encode(query)
+    norms = np.linalg.norm(chunk_embedding) * np.linalg.norm(query_embedding)
+    similarity = float(np.dot(chunk_embedding, query_embedding) / norms) if norms else 0.0
+
+    query_keywords = {kw for kw in query.lower().split() if kw not in STOPWORDS and len(kw) > 2}
+    chunk_lower = chunk.lower()
+    keyword_matches = sum(1 for keyword in query_keywords if keyword in chunk_lower)
+    keyword_bonus = 0.5 * (keyword_matches / len(query_keywords)) if query_keywords else 0
+
+    exact_match_bonus = 0
+    if len(query_keywords) >= 2:
+        query_words = query.lower().split()
+        for i in range(len(query_words) - 1):
+            end_idx = min(i + 5, len(query_words))
+            for j in range(i + 1, end_idx):
+                phrase = ' '.join(query_words[i:j+1])
+                if len(phrase) > 5 and phrase in chunk_lower:
+                    exact_match_bonus = 0.5
+                    break
+            if exact_match_bonus > 0:
+                break
+
+    answer_bonus = 0
+    if "langkah-langkah" in chunk_lower or "prosedur" in chunk_lower or "tahapan" in chunk_lower:
+        answer_bonus += 0.3
+
+    numbered_list_bonus = 0
+    if re.search(r'\d+[\.\)]', chunk_lower):
+        numbered_points = len(re.findall(r'\d+[\.\)]', chunk_lower))
+        if numbered_points >= 3:
+            numbered_list_bonus = 0.4
+        elif numbered_points > 0:
+            numbered_list_bonus = 0.2
+
+    document_link_bonus = 0
+    document_query_terms = ['dokumen', 'document', 'kurikulum', 'curriculum', 'akses', 'access',
+                            'link', 'tautan', 'unduh', 'download', 'file', 'buku', 'buku pedoman',
+                            'panduan', 'guide', 'manual', 'handbook', 'sillabus', 'silabus']
+    if any(term in query.lower() for term in document_query_terms) and "drive.google.com" in chunk_lower:
+        document_link_bonus = 1.0 + (0.2 * min(chunk_lower.count("drive.google.com"), 5))
+        if "kurikulum" in chunk_lower or "curriculum" in chunk_lower:
+            document_link_bonus += 0.5
+
+    length_penalty = 0
+    if len(chunk.strip()) < 200:
+        length_penalty = 0.5
+    elif len(chunk.strip()) < 400:
+        length_penalty = 0.2
+
+    question_only_penalty = 0
+    if re.search(r'\?\s*$', chunk.strip()):
+        question_only_penalty = 0.6
+    elif is_low_quality_chunk(chunk, query):
+        question_only_penalty = 0.8
+
+    final_score = (similarity + keyword_bonus + exact_match_bonus + answer_bonus + numbered_list_bonus
+                   + document_link_bonus - length_penalty - question_only_penalty)
+    return max(0.1, final_score)
+
+
+CHUNKS = [
+    "Prosedur pendaftaran KKN: 1. Isi formulir 2. Unggah berkas 3. Tunggu verifikasi. " * 3,
+    "Bagaimana cara mendaftar KKN?",
+    "Dokumen kurikulum dapat diunduh di https://drive.google.com/a dan https://drive.google.com/b "
+    "beserta buku pedoman program studi sistem informasi. " * 2,
+    "cara mendaftar kkn",
+    "Tahapan sidang skripsi meliputi pengajuan judul, seminar proposal, dan sidang akhir. " * 6,
+    "",
+]
+
+QUERIES = [
+    "bagaimana cara mendaftar kkn",
+    "link dokumen kurikulum sistem informasi",
+    "the and of",
+    "prosedur sidang skripsi",
+]
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_rerank_scores_match_baseline_scorer(query):
+    model = HashingModel()
+    expected = [baseline_relevance_score(chunk, query, model) for chunk in CHUNKS]
+    np.testing.assert_allclose(rerank_scores(CHUNKS, query, model=model), expected, rtol=1e-5, atol=1e-6)
+
+
+def test_rerank_scores_encode_chunks_in_one_batch():
+    model = HashingModel()
+    rerank_scores(CHUNKS, QUERIES[0], model=model)
+    assert model.calls == [QUERIES[0], CHUNKS]
+
+
+def test_rerank_scores_use_precomputed_embeddings():
+    model = HashingModel()
+    query_embedding = model.encode(QUERIES[1])
+    chunk_embeddings = model.encode(CHUNKS)
+    model.calls.clear()
+    scores = rerank_scores(CHUNKS, QUERIES[1], query_embedding=query_embedding, chunk_embeddings=chunk_embeddings)
+    assert model.calls == []
+    np.testing.assert_allclose(scores, rerank_scores(CHUNKS, QUERIES[1], model=model))
+
+
+def test_rerank_scores_of_no_chunks():
+    assert rerank_scores([], "query").shape == (0,)
+
+
+def test_cosine_scores_keep_zero_vectors_at_zero():
+    scores = cosine_scores([1.0, 0.0], [[2.0, 0.0], [0.0, 0.0], [0.0, 3.0]])
+    np.testing.assert_allclose(scores, [1.0, 0.0, 0.0])
+
+
+def test_resolve_chunk_embeddings_only_encodes_missing_chunks():
+    model = HashingModel()
+    stored = {"a b": np.ones(16, dtype=np.float32)}
+    matrix = resolve_chunk_embeddings([" a b ", "c d"], stored, model)
+    assert model.calls == [["c d"]]
+    np.testing.assert_array_equal(matrix[0], np.ones(16))
+    np.testing.assert_array_equal(matrix[1], model._vector("c d"))
@@ -0,0 +1,200 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("dotenv")
+
+from src import retriever
+from src.reranker import resolve_chunk_embeddings
+
+
+class FakeVectorStore:
+    def __init__(self, collection_name):
+        self.collection_name = collection_name
+
+    def as_retriever(self, **kwargs):
+        return ("retriever", self.collection_name)
+
+
+@pytest.fixture
+def opened(monkeypatch, tmp_path):
+    """Isolate the module state; records the collections that were opened."""
+    monkeypatch.setattr(retriever, "_persist_directory", str(tmp_path))
+    monkeypatch.setattr(retriever, "_vectorstore", None)
+    monkeypatch.setattr(retriever, "_retriever", None)
+    monkeypatch.setattr(retriever, "_pointer_version", None)
+    opened = []
+
+    def open_vectorstore(persist_directory, collection_name):
+        opened.append(collection_name)
+        return FakeVectorStore(collection_name)
+
+    monkeypatch.setattr(retriever, "_open_vectorstore", open_vectorstore)
+    return opened
+
+
+def test_import_does_not_open_the_vector_store(opened):
+    assert retriever._vectorstore is None
+    assert opened == []
+
+
+def test_vector_store_is_opened_once_on_first_use(opened):
+    first = retriever.get_retriever()
+    assert retriever.get_retriever() is first
+    assert retriever.get_vectorstore().collection_name == retriever.DEFAULT_COLLECTION_NAME
+    assert opened == [retriever.DEFAULT_COLLECTION_NAME]
+
+
+def test_unopenable_store_falls_back_to_the_dummy_retriever(opened, monkeypatch):
+    def fail(persist_directory, collection_name):
+        raise RuntimeError("no such collection")
+
+    monkeypatch.setattr(retriever, "_open_vectorstore", fail)
+    assert isinstance(retriever.get_retriever(), retriever.DummyRetriever)
+    assert retriever.get_vectorstore() is None
+
+
+def bump_pointer(seconds):
+    """Make the pointer look rewritten even within the file system's mtime resolution."""
+    path = retriever._pointer_path()
+    mtime = retriever.os.path.getmtime(path) + seconds
+    retriever.os.utime(path, (mtime, mtime))
+
+
+def test_set_active_collection_remembers_the_previous_one(opened):
+    assert retriever.get_active_collection() == retriever.DEFAULT_COLLECTION_NAME
+    assert retriever.set_active_collection("shadow_1") == retriever.DEFAULT_COLLECTION_NAME
+    assert retriever.get_active_collection() == "shadow_1"
+    assert retriever.get_previous_collection() == retriever.DEFAULT_COLLECTION_NAME
+
+
+def test_retriever_reopens_after_the_pointer_was_swapped(opened):
+    assert retriever.get_retriever() == ("retriever", retriever.DEFAULT_COLLECTION_NAME)
+    retriever.set_active_collection("shadow_1")
+    assert retriever.get_retriever() == ("retriever", "shadow_1")
+    assert retriever.get_retriever() == ("retriever", "shadow_1")
+    assert opened == [retriever.DEFAULT_COLLECTION_NAME, "shadow_1"]
+
+
+def test_failed_reopen_keeps_serving_the_open_collection(opened, monkeypatch, tmp_path):
+    retriever.set_active_collection("shadow_1")
+    current = retriever.get_retriever()
+
+    def fail(persist_directory, collection_name):
+        opened.append(collection_name)
+        raise RuntimeError("corrupt collection")
+
+    monkeypatch.setattr(retriever, "_open_vectorstore", fail)
+    retriever.set_active_collection("shadow_2")
+    bump_pointer(10)
+    assert retriever.get_retriever() is current
+    # Nothing was deleted, and the next call tries the new collection again
+    assert (tmp_path / retriever.ACTIVE_COLLECTION_FILE).exists()
+    assert retriever.get_retriever() is current
+    assert opened == ["shadow_1", "shadow_2", "shadow_2"]
+
+
+def test_first_open_falls_back_to_the_previous_collection(opened, monkeypatch):
+    retriever.set_active_collection("shadow_1")
+
+    def open_only_default(persist_directory, collection_name):
+        opened.append(collection_name)
+        if collection_name != retriever.DEFAULT_COLLECTION_NAME:
+            raise RuntimeError("corrupt collection")
+        return FakeVectorStore(collection_name)
+
+    monkeypatch.setattr(retriever, "_open_vectorstore", open_only_default)
+    assert retriever.get_retriever() == ("retriever", retriever.DEFAULT_COLLECTION_NAME)
+    assert opened == ["shadow_1", retriever.DEFAULT_COLLECTION_NAME]
+
+
+class QueryEmbeddings:
+    def __init__(self, vector):
+        self.vector = vector
+
+    def embed_query(self, text):
+        return self.vector
+
+
+@pytest.fixture
+def mmr_store(opened, monkeypatch, vectorstore):
+    """A live store of 40 random chunks, searched without BM25."""
+    pytest.importorskip("langchain_core")
+    np = pytest.importorskip("numpy")
+    rng = np.random.default_rng(18)
+    ids = [f"id{i}" for i in range(40)]
+    vectorstore._collection.upsert(ids, rng.normal(size=(40, 8)).tolist(),
+                                   [f"chunk {i}" for i in ids], [{"source": "a.pdf"}] * 40)
+    monkeypatch.setattr(retriever, "_vectorstore", vectorstore)
+    monkeypatch.setattr(retriever, "_retriever", ("retriever", "live"))
+    monkeypatch.setattr(retriever, "HYBRID_SEARCH_ENABLED", False)
+    monkeypatch.setattr(retriever, "VECTOR_SEARCH_BACKEND", "chroma")
+    monkeypatch.setattr(retriever, "_mmr_cache", retriever.OrderedDict())
+    query_vector = rng.normal(size=8).tolist()
+    monkeypatch.setattr(retriever, "get_embeddings", lambda: QueryEmbeddings(query_vector))
+    return vectorstore
+
+
+def retrieved_ids(**kwargs):
+    return [doc.page_content for doc, _ in retriever.get_relevant_documents_with_embeddings("q", **kwargs)]
+
+
+def test_cached_pool_of_a_larger_fetch_gives_the_same_documents(mmr_store):
+    fresh = retrieved_ids(k=4, fetch_k=6)
+    retriever._mmr_cache.clear()
+
+    retrieved_ids(k=4, fetch_k=30)
+    assert retrieved_ids(k=4, fetch_k=6) == fresh
+    assert len(retriever._mmr_cache) == 1
+
+
+def test_larger_k_reuses_the_cached_pool(mmr_store, monkeypatch):
+    first = retrieved_ids(k=3, fetch_k=20)
+    searches = []
+    query = mmr_store._collection.query
+    monkeypatch.setattr(mmr_store._collection, "query", lambda *args, **kwargs: searches.append(1) or query(*args, **kwargs))
+    assert retrieved_ids(k=6, fetch_k=20)[:3] == first
+    assert searches == []
+
+
+def return_numpy_embeddings(monkeypatch, collection):
+    """Make the collection return query embeddings as numpy arrays, like recent chromadb releases."""
+    query = collection.query
+
+    def numpy_query(*args, **kwargs):
+        results = query(*args, **kwargs)
+        results["embeddings"] = [np.array(vectors, dtype=np.float32) for vectors in results["embeddings"]]
+        return results
+
+    monkeypatch.setattr(collection, "query", numpy_query)
+    return collection
+
+
+class NoEncoder:
+    def encode(self, texts, batch_size=None):
+        raise AssertionError(f"re-encoded {texts}")
+
+
+def test_chroma_candidates_accept_numpy_embeddings(monkeypatch, vectorstore):
+    collection = return_numpy_embeddings(monkeypatch, vectorstore._collection)
+    assert retriever._chroma_candidates(collection, [1.0, 0.0], 5) == ([], [], [], [])
+
+    collection.upsert(["a", "b"], [[1.0, 0.0], [0.0, 1.0]], ["chunk a", "chunk b"], [{}, {}])
+    ids, documents, _, embeddings = retriever._chroma_candidates(collection, [1.0, 0.2], 5)
+
+    assert ids == ["a", "b"]
+    assert documents == ["chunk a", "chunk b"]
+    np.testing.assert_array_equal(embeddings, [[1.0, 0.0], [0.0, 1.0]])
+
+
+def test_returned_vectors_are_the_stored_ones_and_are_not_encoded_again(mmr_store, monkeypatch):
+    collection = return_numpy_embeddings(monkeypatch, mmr_store._collection)
+
+    results = retriever.get_relevant_documents_with_embeddings("q", k=5, fetch_k=10)
+    assert len(results) == 5
+    stored = {doc.page_content: vector for doc, vector in results}
+    for text, vector in stored.items():
+        np.testing.assert_allclose(vector, collection.rows[text[len("chunk "):]][0], rtol=1e-6)
+
+    chunks = [f" {text} " for text in stored]
+    matrix = resolve_chunk_embeddings(chunks, stored, NoEncoder())
+    np.testing.assert_array_equal(matrix, np.array(list(stored.values()), dtype=np.float32))
@@ -0,0 +1,40 @@
+import pytest
+
+pytest.importorskip("langchain")
+pytest.importorskip("dotenv")
+
+from src import embedding_writer, ingestion, split_document
+from src.ingestion import IncrementalIndexer
+from src.split_document import ingest_dataset, is_dataset_source
+
+
+class Doc:
+    def __init__(self, page_content, **metadata):
+        self.page_content = page_content
+        self.metadata = metadata
+
+
+@pytest.fixture
+def indexer(vectorstore, fake_encoder, monkeypatch, tmp_path):
+    for module in (ingestion, embedding_writer):
+        monkeypatch.setattr(module, "get_bm25_index_for", lambda store: None)
+        monkeypatch.setattr(module, "get_near_duplicate_index_for", lambda store: None)
+    monkeypatch.setattr(split_document, "iter_pdf_files", lambda paths: iter(()))
+    monkeypatch.setattr(split_document, "invalidate_answer_cache", lambda: None)
+    return IncrementalIndexer(vectorstore, manifest_path=str(tmp_path / "manifest.json"))
+
+
+def test_dataset_sources_are_bare_pdf_names():
+    assert is_dataset_source("Kurikulum.pdf")
+    assert not is_dataset_source("docs/Kurikulum.pdf")
+    assert not is_dataset_source("web_content")
+
+
+def test_ingest_dataset_leaves_the_docs_pdfs_alone(indexer, tmp_path):
+    indexer.sync_source("Kurikulum.pdf", "v1", [Doc("dataset chunk")])
+    indexer.sync_source("docs/Kurikulum.pdf", "v1", [Doc("docs chunk")])
+    dataset_dir = tmp_path / "dataset"
+    dataset_dir.mkdir()
+
+    ingest_dataset(str(dataset_dir), crawl_web=False, indexer=indexer)
+    assert set(indexer.sources) == {"docs/Kurikulum.pdf"}
@@ -0,0 +1,112 @@
+import asyncio
+import json
+
+from src.progress import ANN_SEARCH, CONDENSE_QUESTION_TAG, StageCallbackHandler, emit_stage
+from src.streaming import STREAMING_CURSOR, PlaceholderWriter, TokenCallbackHandler, astream_events, format_sse
+
+
+class Placeholder:
+    def __init__(self):
+        self.rendered = []
+
+    def markdown(self, text):
+        self.rendered.append(text)
+
+
+def parse_sse(chunk):
+    event, data = chunk.rstrip("\n").split("\n")
+    return event[len("event: "):], json.loads(data[len("data: "):])
+
+
+def collect(arun):
+    async def run():
+        return [parse_sse(chunk) async for chunk in astream_events(arun)]
+    return asyncio.run(run())
+
+
+def test_token_handler_passes_answer_tokens_in_order():
+    tokens = []
+    handler = TokenCallbackHandler(tokens.append)
+    for token in ["Pendaftaran", "", " KKN", " dibuka"]:
+        handler.on_llm_new_token(token)
+    handler.on_llm_new_token("Kapan", tags=[CONDENSE_QUESTION_TAG])
+
+    assert tokens == ["Pendaftaran", " KKN", " dibuka"]
+
+
+def test_placeholder_writer_shows_the_draft_with_a_cursor():
+    placeholder = Placeholder()
+    writer = PlaceholderWriter(placeholder)
+    writer.write("Jadwal")
+    writer.write(" KKN")
+
+    assert writer.text == "Jadwal KKN"
+    assert placeholder.rendered == ["Jadwal" + STREAMING_CURSOR, "Jadwal KKN" + STREAMING_CURSOR]
+
+
+def test_format_sse_keeps_non_ascii_text():
+    assert format_sse("token", {"token": "é"}) == 'event: token\ndata: {"token": "é"}\n\n'
+
+
+def test_stream_sends_stages_tokens_then_the_post_processed_answer():
+    async def arun(on_token):
+        emit_stage(ANN_SEARCH, documents=4)
+        handler = TokenCallbackHandler(on_token)
+        for token in ["Pendaftaran", " KKN", " dibuka"]:
+            handler.on_llm_new_token(token)
+            await asyncio.sleep(0)
+        StageCallbackHandler().on_llm_end(None)
+        return {"answer": "Pendaftaran KKN dibuka bulan Mei.", "session_id": "s1"}
+
+    events = collect(arun)
+
+    assert [event for event, _ in events] == ["stage", "token", "token", "token", "stage", "stage", "answer"]
+    assert events[0][1]["details"] == {"documents": 4}
+    assert "".join(data["token"] for event, data in events if event == "token") == "Pendaftaran KKN dibuka"
+    assert events[-1] == ("answer", {"answer": "Pendaftaran KKN dibuka bulan Mei.", "session_id": "s1"})
+
+
+def test_tokens_from_executor_threads_keep_their_order():
+    async def arun(on_token):
+        def generate():
+            for i in range(50):
+                on_token(str(i))
+        await asyncio.get_running_loop().run_in_executor(None, generate)
+        return "selesai"
+
+    events = collect(arun)
+
+    assert [data["token"] for event, data in events if event == "token"] == [str(i) for i in range(50)]
+    assert events[-1] == ("answer", {"answer": "selesai"})
+
+
+def test_failure_ends_the_stream_with_an_error_event():
+    async def arun(on_token):
+        on_token("Pendaftaran")
+        raise ValueError("RAG chain did not return an answer")
+
+    assert collect(arun) == [("token", {"token": "Pendaftaran"}),
+                             ("error", {"detail": "RAG chain did not return an answer"})]
+
+
+def test_client_disconnect_cancels_the_answer():
+    state = {}
+
+    async def arun(on_token):
+        try:
+            on_token("Pendaftaran")
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+
+    async def run():
+        stream = astream_events(arun)
+        first = await stream.__anext__()
+        # The server closes the generator when the client goes away
+        await stream.aclose()
+        await asyncio.sleep(0)
+        return first
+
+    assert parse_sse(asyncio.run(run())) == ("token", {"token": "Pendaftaran"})
+    assert state == {"cancelled": True}
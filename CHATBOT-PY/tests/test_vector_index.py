@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from src.vector_index import ExactVectorIndex
+
+SOURCES = ["a.pdf", "b.pdf", "a.pdf", "web", "b.pdf", "a.pdf", "web", "a.pdf"]
+
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(7).normal(size=(len(SOURCES), 6)).astype(np.float32)
+
+
+@pytest.fixture
+def index(vectors):
+    matrix = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids = [f"id{i}" for i in range(len(SOURCES))]
+    return ExactVectorIndex(ids, matrix, [f"chunk {i}" for i in range(len(SOURCES))],
+                            [{"source": source} for source in SOURCES])
+
+
+def brute_force(vectors, query, k, allowed=None):
+    """Rows ranked by cosine similarity with a full sort."""
+    scores = vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query))
+    rows = [row for row in np.argsort(-scores, kind="stable") if allowed is None or allowed[row]]
+    return rows[:k], scores[rows[:k]]
+
+
+@pytest.mark.parametrize("k", [1, 3, 8, 20])
+@pytest.mark.parametrize("where", [None, {"source": "a.pdf"}, {"source": "web"}, {"source": "missing"}])
+def test_search_matches_brute_force(index, vectors, k, where):
+    query = np.random.default_rng(k).normal(size=6)
+    allowed = None if where is None else [source == where["source"] for source in SOURCES]
+    expected_rows, expected_scores = brute_force(vectors, query, k, allowed)
+
+    rows, scores = index.search(query, k=k, where=where)
+    assert list(rows) == expected_rows
+    np.testing.assert_allclose(scores, expected_scores, rtol=1e-5)
+
+
+@pytest.mark.parametrize("where", [None, {"source": "b.pdf"}])
+def test_search_many_matches_search(index, where):
+    queries = np.random.default_rng(3).normal(size=(4, 6))
+    for (rows, scores), query in zip(index.search_many(queries, k=3, where=where), queries):
+        expected_rows, expected_scores = index.search(query, k=3, where=where)
+        np.testing.assert_array_equal(rows, expected_rows)
+        np.testing.assert_allclose(scores, expected_scores, rtol=1e-5)
+
+
+def test_empty_searches(index):
+    assert len(index.search(np.ones(6), k=0)[0]) == 0
+    assert index.search_many(np.zeros((0, 6))) == []
+    empty = ExactVectorIndex([], np.zeros((0, 0), dtype=np.float32), [], [])
+    assert len(empty.search(np.ones(6))[0]) == 0
+    assert [len(rows) for rows, _ in empty.search_many(np.ones((2, 6)))] == [0, 0]
+
+
+def test_rows_for_skips_unknown_ids(index):
+    assert index.rows_for(["id3", "nope", "id0"]) == [3, 0]
+
+
+def test_snapshot_round_trip(index, tmp_path):
+    path = str(tmp_path / "vectors.npy")
+    index.source_version = [1, 2]
+    index.save(path)
+
+    loaded = ExactVectorIndex.load(path)
+    assert loaded.ids == index.ids
+    assert loaded.metadatas == index.metadatas
+    assert loaded.source_version == [1, 2]
+    query = np.arange(6.0)
+    np.testing.assert_array_equal(loaded.search(query, k=4, where={"source": "a.pdf"})[0],
+                                  index.search(query, k=4, where={"source": "a.pdf"})[0])
+    assert ExactVectorIndex.load(str(tmp_path / "missing.npy")) is None
+
+
+def test_from_collection_normalizes_every_batch(vectorstore, vectors):
+    ids = [f"id{i}" for i in range(len(SOURCES))]
+    vectorstore._collection.upsert(ids, vectors.tolist(), [""] * len(ids), [{"source": s} for s in SOURCES])
+    index = ExactVectorIndex.from_collection(vectorstore._collection, batch_size=3)
+    assert index.ids == ids
+    np.testing.assert_allclose(np.linalg.norm(index.matrix, axis=1), 1.0, rtol=1e-5)